@@ -1,50 +1,369 @@
 
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+import os
+import tempfile
+import time
 
-from transformers.price import transform_price
-from transformers.stone import transform_stone
-from transformers.catalog import transform_catalog
+from transformers.workflows import WORKFLOWS, dataset_index, detect_workflows, transform_options
+from transformers.multi import combined_errors, convert_all
+from transformers.streaming import DEFAULT_BATCH_SIZE, stream_transform
+from transformers.cache import ResultCache, file_digest
+from transformers.images import MANIFEST_FILENAME, check_images, image_index
+from transformers.ingest import columnar_format, read_erp, read_reference_skus
+from transformers.merge import list_sheets, merge_sources, source_name
+from transformers.jobs import DONE, FAILED, JobQueue
+from transformers.delta import commit_snapshot, delta_rows
+from transformers.profiling import Profiler, stage
+from transformers.rulesets import BY_COLLECTION, DEFAULT_RULES, RULE_ERRORS, load_rule_sets, rule_set_names
+from transformers.rollup import ROLLUP_FILENAME, catalog_with_stones
+from transformers.templates import (DEFAULT_VERSION, TEMPLATE_ERRORS, load_templates, meta_frame, template_notes,
+                                   write_output)
+from transformers.validation import merge_errors
 
 st.set_page_config(page_title="Garnet Template Transformer", page_icon="💎", layout="wide")
 st.title("💎 Garnet Template Transformer (v3)")
 st.caption("Seller Price • Product Stone • Catalog Creation — all with embedded templates and validations.")
 
-option = st.selectbox("Select output workflow", ["Seller Price", "Product Stone", "Catalog Creation"], index=2)
+@st.cache_resource
+def result_cache() -> ResultCache:
+    # Shared by all sessions; set CKC_CACHE_DIR to also keep results on disk (Parquet)
+    return ResultCache(max_entries=16, spill_dir=os.environ.get("CKC_CACHE_DIR"))
 
-uploaded = st.file_uploader("Upload ERP Excel (.xlsx)", type=["xlsx"], key="erp_v3")
-if uploaded is not None:
+@st.cache_resource
+def job_queue() -> JobQueue:
+    # One worker pool per server, shared by all sessions; job status lives in SQLite
+    job_dir = os.environ.get("CKC_JOB_DIR", os.path.join(tempfile.gettempdir(), "ckc_jobs"))
+    return JobQueue(job_dir, max_workers=int(os.environ.get("CKC_JOB_WORKERS", "2")),
+                    processes=os.environ.get("CKC_JOB_PROCESSES") == "1")
+
+SNAPSHOT_DIR = os.environ.get("CKC_SNAPSHOT_DIR", ".snapshots")
+PROFILE_LOG = os.environ.get("CKC_PROFILE_LOG")
+
+def preview(key: str, data: pd.DataFrame, n: int = 20) -> pd.DataFrame:
+    # results are kept as typed data rows; show them under the template rows as in the CSV
+    return pd.concat([meta_frame(key), data.head(n)], ignore_index=True)
+
+@st.cache_resource(max_entries=8)
+def reference_skus(digests: str, _uploads):
+    # keyed by the uploads' digests; Streamlit does not hash the _uploads argument
+    return read_reference_skus(_uploads)
+
+def output_file(data: pd.DataFrame, key: str, gz: bool) -> str:
+    # Written straight to a temp file (header block + data rows in chunks), so no
+    # CSV string is built. st.download_button still reads the file into
+    # Streamlit's in-memory media store: one copy per download (see README).
+    with tempfile.NamedTemporaryFile(suffix=".csv.gz" if gz else ".csv", delete=False) as tmp:
+        path = tmp.name
+    write_output(data, key, path)
+    return path
+
+def show_profile(prof: Profiler) -> None:
+    # Per-stage timings for this run; appended to CKC_PROFILE_LOG (JSON lines) when set
+    with st.expander("⏱ Stage timings"):
+        st.dataframe(prof.to_frame())
+    if PROFILE_LOG:
+        prof.write_jsonl(PROFILE_LOG)
+
+def show_image_scan(index, manifest: pd.DataFrame, img_err: pd.DataFrame) -> None:
+    st.caption(f"Image directory: {len(index)} images (scanned in {index.seconds:.1f}s); "
+               f"{len(manifest)} PDP images found, {len(img_err)} SKUs without a primary image.")
+    st.download_button("⬇️ Download image manifest", manifest.to_csv(index=False),
+                       file_name=MANIFEST_FILENAME, mime="text/csv")
+
+# Header/metadata blocks: builtin by default, or a templates/ version via CKC_TEMPLATE_VERSION
+load_templates()
+for problem in TEMPLATE_ERRORS:
+    st.warning(f"Template skipped: {problem}")
+if DEFAULT_VERSION != "builtin":
+    st.caption(f"Template version: {DEFAULT_VERSION}")
+    for note in template_notes():
+        # e.g. metadata rows that differ from the builtin ones end up in every output
+        st.caption(f"Template note: {note}")
+load_rule_sets()
+for problem in RULE_ERRORS:
+    st.warning(f"Catalog rule file skipped: {problem}")
+
+ALL_WORKFLOWS = "All detected workflows (one ZIP)"
+option = st.selectbox("Select output workflow", ["Seller Price", "Product Stone", "Catalog Creation", ALL_WORKFLOWS], index=2)
+
+# Merge mode: an export split across sheets and/or workbooks becomes one output
+merging = option != ALL_WORKFLOWS and st.checkbox(
+    "Merge mode (several sheets or workbooks of one export → one output)", value=False)
+# .parquet / .arrow uploads are imports made with `python -m transformers --columnar`
+uploaded = st.file_uploader("Upload ERP Excel (.xlsx) or an imported .parquet/.arrow file",
+                            type=["xlsx", "parquet", "arrow", "feather"], key="erp_v3",
+                            accept_multiple_files=merging)
+merge_uploads = []
+if merging:
+    merge_uploads, uploaded = uploaded or [], None
+streaming = st.checkbox("Streaming mode for very large workbooks (reads and writes in row batches)", value=False)
+compress = st.checkbox("Compress CSV downloads (gzip)", value=False)
+background = not merging and st.checkbox("Run in the background (job queue; keeps working while you use the app)",
+                                         value=False)
+# delta needs the whole converted file and a snapshot of one workflow: single mode only (as the CLI)
+delta = (option != ALL_WORKFLOWS and not merging and not streaming and not background
+         and st.checkbox("Delta mode (only rows changed since the last confirmed upload of this file)",
+                         value=False))
+stone_upload = None
+rules = None
+if option in ("Catalog Creation", ALL_WORKFLOWS):
+    # rule sets from rules/*.json; by-collection picks one per row from its Collection
+    rule_choices = rule_set_names() + [BY_COLLECTION]
+    rules = st.selectbox("Catalog rule set", rule_choices,
+                         index=rule_choices.index(DEFAULT_RULES) if DEFAULT_RULES in rule_choices else 0)
+if option == "Catalog Creation" and not streaming and not merging:
+    stone_upload = st.file_uploader("Optional: Stone ERP (.xlsx) to fill Attribute 1-4 with per-SKU stone totals",
+                                    type=["xlsx"], key="stone_rollup")
+reference_uploads = []
+if option in ("Seller Price", "Product Stone") and not background:
+    # stone rows must exist in the catalog/price exports, price rows in the catalog
+    reference_uploads = st.file_uploader("Optional: catalog/price exports to check this file's SKUs against",
+                                         type=["xlsx", "parquet", "arrow", "feather"], key="references",
+                                         accept_multiple_files=True) or []
+image_dir = ""
+rescan = False
+if option in ("Catalog Creation", ALL_WORKFLOWS) and not streaming and not background and not merging:
+    # a directory on the machine running the app; scanned once and remembered until "Rescan"
+    image_dir = st.text_input("Optional: image directory to check PDP images against",
+                              value=os.environ.get("CKC_IMAGE_DIR", "")).strip()
+    rescan = bool(image_dir) and st.button("Rescan image directory")
+
+def references():
+    # {workflow key: SKU codes} of the reference uploads (None without any), and the cache variant
+    if not reference_uploads:
+        return None, ""
+    digests = ",".join(file_digest(f.getvalue()) for f in reference_uploads)
+    return reference_skus(digests, reference_uploads), digests
+
+if merge_uploads:
     try:
-        df = pd.read_excel(uploaded)
-        st.subheader("Input preview")
-        st.dataframe(df.head(20))
-
-        if option == "Seller Price":
-            out_df, err_df = transform_price(df)
-            filename = "SellerPriceBulkUpload.csv"
-        elif option == "Product Stone":
-            out_df, err_df = transform_stone(df)
-            filename = "ProductStoneBulkUpload.csv"
-        else:
-            out_df, err_df = transform_catalog(df)
-            filename = "CatalogUpload.csv"
-
-        st.subheader("Output preview (first 20 rows)")
-        st.dataframe(out_df.head(20))
-
-        if not err_df.empty:
-            st.warning("Validation issues found. Expand to review.")
-            with st.expander("Row-level validation issues"):
-                st.dataframe(err_df)
-
-        buf = BytesIO()
-        out_df.to_csv(buf, index=False)
-        st.download_button("⬇️ Download " + filename, buf.getvalue(),
-                           file_name=filename, mime="text/csv")
+        # every sheet whose columns fit the workflow is preselected; sheets are read one at a time
+        sheet_lists = {source_name(f): list(list_sheets(f)) for f in merge_uploads}
+        choices = [f"{name} / {sheet}" for name, sheets in sheet_lists.items() for sheet in sheets]
+        picked = st.multiselect("Sheets to merge", choices, default=choices)
+        selection = {name: [s for s in sheets if f"{name} / {s}" in picked] for name, sheets in sheet_lists.items()}
+        prof = Profiler(file=", ".join(sheet_lists), workflow=WORKFLOWS[option]["key"], mode="merge")
+        with prof.activate():
+            wf = WORKFLOWS[option]
+            with tempfile.NamedTemporaryFile(suffix=".csv.gz" if compress else ".csv", delete=False) as tmp:
+                path = tmp.name
+            with stage("merge"):
+                n_rows, err_df, report = merge_sources(merge_uploads, option, path, selection,
+                                                       DEFAULT_BATCH_SIZE if streaming else None, rules=rules,
+                                                       references=references()[0])
+            st.success(f"Merged {n_rows} rows from {sum(r['status'] == 'merged' for r in report)} sheets.")
+            st.dataframe(pd.DataFrame(report))
+
+            st.subheader("Output preview (first 20 rows)")
+            st.dataframe(pd.read_csv(path, nrows=20, dtype=str, keep_default_na=False))
+
+            if not err_df.empty:
+                st.warning("Validation issues found. Expand to review.")
+                with st.expander("Row-level validation issues (with source file and sheet)"):
+                    st.dataframe(err_df)
+                st.download_button("⬇️ Download validation issues", err_df.to_csv(index=False),
+                                   file_name=wf["filename"][:-4] + "_errors.csv", mime="text/csv")
+
+            with open(path, "rb") as fh:
+                st.download_button("⬇️ Download " + wf["filename"], fh,
+                                   file_name=wf["filename"] + (".gz" if compress else ""),
+                                   mime="application/gzip" if compress else "text/csv")
+            os.remove(path)
+
+        show_profile(prof)
 
     except Exception as e:
         st.error(f"Error: {e}")
+elif uploaded is not None and option == ALL_WORKFLOWS:
+    try:
+        # Parse once, run every workflow the columns satisfy in parallel on the shared frame
+        prof = Profiler(file=uploaded.name, workflow="all")
+        with prof.activate():
+            cache = result_cache()
+            digest = file_digest(uploaded.getvalue())
+            with stage("read"):
+                df = cache.frame(digest, lambda: read_erp(uploaded)[0], variant="all")
+            detected = detect_workflows(df.columns)
+            if not detected:
+                st.error("The uploaded columns do not satisfy any workflow.")
+            else:
+                st.info("Detected: " + ", ".join(detected))
+                index = None
+                if image_dir and "Catalog Creation" in detected:
+                    index = image_index(image_dir, refresh=rescan)
+                results, manifest, payload = convert_all(df, detected, cache=cache, digest=digest,
+                                                         rules=rules, images=index)
+                if manifest is not None:
+                    st.caption(f"Image directory: {len(index)} images (scanned in {index.seconds:.1f}s); "
+                               f"{len(manifest)} PDP images found — see {MANIFEST_FILENAME} in the ZIP.")
+                for name, (data, _) in results.items():
+                    with st.expander(f"{name} — output preview (first 20 rows)"):
+                        st.dataframe(preview(WORKFLOWS[name]["key"], data))
+
+                err_df = combined_errors(results)
+                if not err_df.empty:
+                    st.warning("Validation issues found. Expand to review.")
+                    with st.expander("Row-level validation issues"):
+                        st.dataframe(err_df)
+
+                st.download_button("⬇️ Download all outputs (ZIP)", payload,
+                                   file_name="ERP_Outputs.zip", mime="application/zip")
+
+        show_profile(prof)
+
+    except Exception as e:
+        st.error(f"Error: {e}")
+elif uploaded is not None and background:
+    # Submitting is idempotent: a rerun with the same file and options returns the same job
+    job_id = job_queue().submit(uploaded.getvalue(), uploaded.name, option,
+                                {"stream": streaming, "gzip": compress, "rules": rules})
+    session_jobs = st.session_state.setdefault("jobs", [])
+    if job_id not in session_jobs:
+        session_jobs.append(job_id)
+    st.info("Submitted — see Background jobs below. (The stone rollup upload is not used for background jobs.)"
+            if stone_upload is not None else "Submitted — see Background jobs below.")
+elif uploaded is not None and streaming and columnar_format(uploaded):
+    st.error("Streaming mode reads .xlsx workbooks; columnar files are already fast to load — untick it.")
+elif uploaded is not None and streaming:
+    try:
+        prof = Profiler(file=uploaded.name, workflow=WORKFLOWS[option]["key"], mode="stream")
+        with prof.activate():
+            wf = WORKFLOWS[option]
+            with tempfile.NamedTemporaryFile(suffix=".csv.gz" if compress else ".csv", delete=False) as tmp:
+                path = tmp.name
+            with stage("stream"):
+                n_rows, err_df = stream_transform(uploaded, option, path, rules=rules,
+                                                  references=references()[0])
+            st.success(f"Converted {n_rows} rows.")
+
+            st.subheader("Output preview (first 20 rows)")
+            st.dataframe(pd.read_csv(path, nrows=20, dtype=str, keep_default_na=False))
+
+            if not err_df.empty:
+                st.warning("Validation issues found. Expand to review.")
+                with st.expander("Row-level validation issues"):
+                    st.dataframe(err_df)
+
+            with open(path, "rb") as fh:
+                st.download_button("⬇️ Download " + wf["filename"], fh,
+                                   file_name=wf["filename"] + (".gz" if compress else ""),
+                                   mime="application/gzip" if compress else "text/csv")
+            os.remove(path)
+
+        show_profile(prof)
+
+    except Exception as e:
+        st.error(f"Error: {e}")
+elif uploaded is not None:
+    try:
+        prof = Profiler(file=uploaded.name, workflow=WORKFLOWS[option]["key"])
+        with prof.activate():
+            # Same bytes + workflow + transformer/template version → served from cache
+            cache = result_cache()
+            digest = file_digest(uploaded.getvalue())
+            wf = WORKFLOWS[option]
+            reports = []
+
+            def parse():
+                frame, report = read_erp(uploaded, option)
+                reports.append(report)
+                return frame
+
+            with stage("read"):
+                df = cache.frame(digest, parse, variant=wf["key"])
+            if reports:
+                st.caption(" • ".join(f"{s['sheet']}: {s['rows']} rows parsed in {s['seconds']:.2f}s"
+                                      for s in reports[0]["sheets"]) + f" ({reports[0]['engine']})")
+            st.subheader("Input preview")
+            st.dataframe(df.head(20))
+
+            ref_skus, ref_variant = references()
+            with stage("transform", len(df)):
+                data, err_df = cache.result(digest, option,
+                                            lambda: wf["transform"](df, include_template=False,
+                                                                    index=dataset_index(option, ref_skus),
+                                                                    **transform_options(option, rules)),
+                                            rules, ref_variant)
+            filename = wf["filename"]
+
+            if stone_upload is not None:
+                with stage("rollup"):
+                    stone_df = cache.frame(file_digest(stone_upload.getvalue()),
+                                           lambda: read_erp(stone_upload, "stone")[0], variant="stone")
+                    data, rollup = catalog_with_stones(data, stone_df)
+                st.caption(f"Stone rollup: {len(rollup)} SKUs with stones.")
+                orphans = int((~rollup["SKU Code"].isin(data["SKU Code"])).sum())
+                if orphans:
+                    st.warning(f"{orphans} SKUs in the stone file are not in this catalog.")
+                st.download_button("⬇️ Download stone rollup", rollup.to_csv(index=False),
+                                   file_name=ROLLUP_FILENAME, mime="text/csv")
+
+            if image_dir and wf["key"] == "catalog":
+                # only PDP slots whose file exists are kept; a missing primary image is an error
+                with stage("images", len(data)):
+                    index = image_index(image_dir, refresh=rescan)
+                    data, img_err, manifest = check_images(data, index)
+                err_df = merge_errors(err_df, img_err)
+                show_image_scan(index, manifest, img_err)
+
+            st.subheader("Output preview (first 20 rows)")
+            st.dataframe(preview(wf["key"], data))
+
+            if not err_df.empty:
+                st.warning("Validation issues found. Expand to review.")
+                with st.expander("Row-level validation issues"):
+                    st.dataframe(err_df)
+
+            if delta:
+                # Only rows whose SKU is new or changed since the last confirmed upload
+                scope = os.path.splitext(uploaded.name)[0]
+                full_data = data
+                with stage("delta", len(full_data)):
+                    data, removed, stats = delta_rows(full_data, option, SNAPSHOT_DIR, scope=scope)
+                if stats["first_run"]:
+                    st.info("No previous snapshot for this file — the delta contains every row.")
+                st.success(f"Delta: {stats['changed']} new/changed of {stats['rows']} rows, "
+                           f"{stats['removed']} removed SKUs.")
+                if removed:
+                    st.download_button("⬇️ Download removed SKUs", pd.DataFrame({"key": removed}).to_csv(index=False),
+                                       file_name=filename[:-4] + "_removed.csv", mime="text/csv")
+                if st.button("✅ Mark this delta as uploaded (update snapshot)"):
+                    commit_snapshot(full_data, option, SNAPSHOT_DIR, scope=scope)
+                    st.success("Snapshot updated.")
+
+            with stage("serialize", len(data)):
+                path = output_file(data, wf["key"], compress)
+            with open(path, "rb") as fh:
+                st.download_button("⬇️ Download " + filename, fh,
+                                   file_name=filename + (".gz" if compress else ""),
+                                   mime="application/gzip" if compress else "text/csv")
+            os.remove(path)
+
+        show_profile(prof)
+
+    except Exception as e:
+        st.error(f"Error: {e}")
+
+if st.session_state.get("jobs"):
+    st.subheader("Background jobs")
+    jobs = job_queue().jobs(st.session_state["jobs"])
+    for job in jobs:
+        out_name = os.path.basename(job["output"])
+        st.write(f"**{job['filename']}** → {out_name} — {job['status']}: {job['message']}")
+        if job["status"] == DONE:
+            with open(job["output"], "rb") as fh:
+                st.download_button("⬇️ Download " + out_name, fh, file_name=out_name, key=f"dl_{job['id']}")
+            if job["errors"]:
+                with open(job["errors_csv"], "rb") as fh:
+                    st.download_button(f"⬇️ {job['errors']} validation issues", fh,
+                                       file_name="ValidationErrors.csv", key=f"err_{job['id']}")
+        elif job["status"] != FAILED:
+            st.progress(min(max(job["progress"] or 0.0, 0.0), 1.0))
+    if any(j["status"] not in (DONE, FAILED) for j in jobs):
+        # poll: rerun the script while any job of this session is still working
+        time.sleep(1)
+        st.rerun()
 
 st.divider()
 with st.expander("📘 Notes & Mappings"):
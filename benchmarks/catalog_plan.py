@@ -0,0 +1,163 @@
+"""Compare the compiled catalog plan with the column-by-column transform it replaced.
+
+    python -m benchmarks.catalog_plan                  # sample tiled to 10k/100k rows, best of 3
+    python -m benchmarks.catalog_plan -n 100000 -o benchmarks/results/catalog_plan.json
+
+baseline_transform_catalog below is transform_catalog as it was before the
+plan, kept as the reference: the run checks that both give byte-identical
+CSV before timing them (tests/test_catalog_plan.py does the same check).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import _git_commit, _timed  # noqa: E402
+from transformers.catalog import CATALOG_HEADERS, CATALOG_TEMPLATE_ROWS, transform_catalog  # noqa: E402
+from transformers.ingest import read_erp  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "samples", "Sample_ERP_Catalog.xlsx")
+DEFAULT_SIZES = [10_000, 100_000]
+
+# ---------------------------------------------------------------------
+# 1. Reference: transform_catalog before the plan
+# ---------------------------------------------------------------------
+BASELINE_MAP: Dict[str, str] = {
+    "Entity Identifier": "Entity", "SKU Code": "Bar Code", "Product Name": "Article Description",
+    "Product Subtitle": "Article Description", "Tax Applicable": "Tax Applicable",
+    "TaxOrHSN Code": "HSN Code", "Article Description": "Article Description",
+    "Article Code": "Article Number", "Article Type": "Article Type", "Vendor": "Vendor",
+    "Product Net weight": "Net Metal Weight", "Product Net weight Unit": "Net Metal Weight Units",
+    "Product Gross Weight": "Gross Item Weight", "Product Gross Weight Unit": "Gross Item Weight Unit",
+    "Collection": "Collection", "Purity": "Purity", "Metal Type": "Metal Type",
+    "Metal Name": "Metal Name", "Gender": "Gender Description", "Parent Theme": "Parent Theme",
+    "Child Theme": "Child Theme", "Segment": "Segment", "Jewel Type": "Jewel Type",
+    "Polish Type": "Polish Type Description", "Setting Type": "Setting Type Description",
+    "Bangle Sizes": "Bangle Size", "Bangle Shape": "Bangle Shape", "Hook Type": "Hook Type Description",
+    "Pieces": "Pieces", "Pieces UOM": "UOM", "Length": "Length",
+}
+
+BASELINE_KEYWORDS = ("gold ring, Rhodolite Garnet ring, diamond gold ring, elegant gemstone ring, "
+                     "luxury jewelry, garnet diamond ring, statement gold ring, precious gemstone jewelry, "
+                     "garnet and diamond ring, timeless gold ring")
+
+BASELINE_DEFAULTS: Dict[str, object] = {
+    "Tags Keyword": BASELINE_KEYWORDS, "Meta Keyword": BASELINE_KEYWORDS,
+    "Location Group": "India,America,Oceania,Asia", "Is Active(Y/N)": "Yes", "Is Publish(Y/N)": "Yes",
+    "Is customizable? (Y/N)": "Yes", "Is 'New Arrival'": "Yes", "Is Try at Store": "Yes",
+    "Is Try at Home": "Yes", "Is Free Shipping?": "Yes", "Product Net weight Unit": "Gms",
+    "Product Gross Weight Unit": "Gms", "Min Quantity allowed in shopping cart": 1,
+    "Max Quantity allowed in shopping cart": 1, "Delivery Type": "STANDARD", "Store Code": "S102",
+    "Is Gift Wrap": "Yes", "Is inscription": "Yes", "Is Pick Up at store": "Yes",
+    "Is EMI available": "No", "Is 'Trendy Fashion'": "Yes", "Is Returnable": "Yes", "Is Cancellable": "Yes",
+}
+
+BASELINE_HIGHLIGHT = (
+    "This product is made in {metal} gold verified by BIS hallmark, "
+    "Product dimensions mentioned are on approximation closest to the actual size. "
+    "The bill is your certificate, please produce the bill for future transactions "
+    "on all jewellery, silverware, giftware you purchase. "
+    "Diamond solitaires over quarter carat and certain rare gems may additionally "
+    "have an external laboratory certificate."
+)
+
+def _baseline_sku(barcode) -> str:
+    digits = "".join(ch for ch in str(barcode) if ch.isdigit())
+    return f"CKC_00{int(digits):08d}"
+
+def baseline_transform_catalog(input_df: pd.DataFrame) -> pd.DataFrame:
+    """The pre-plan transform: an empty frame filled and overwritten column by column (no validation)."""
+    df = input_df.copy()
+    out = pd.concat([pd.DataFrame(CATALOG_TEMPLATE_ROWS), pd.DataFrame(columns=CATALOG_HEADERS)],
+                    ignore_index=True)
+    mapped = pd.DataFrame(columns=CATALOG_HEADERS)
+    for col in CATALOG_HEADERS:
+        src = BASELINE_MAP.get(col)
+        mapped[col] = df[src] if src is not None and src in df.columns else ""
+    mapped["Brand Code"] = "CKC"
+    mapped["Is Price on Request"] = ""
+    if "Length" in df.columns:
+        mapped["Length"] = df["Length"]
+    if "Bar Code" in df.columns:
+        mapped["SKU Code"] = df["Bar Code"].apply(_baseline_sku)
+        raw_bar = df["Bar Code"].astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
+        mapped["_sku_exact"] = raw_bar.str.zfill(max(10, int(raw_bar.str.len().max() or 0)))
+    else:
+        mapped["_sku_exact"] = ""
+    for i in range(1, 16):
+        mapped[f"PDP Image {i}"] = mapped["_sku_exact"] + f"_{i}.jpg"
+    for i in range(1, 4):
+        col = f"PLP Preview Image {i} "
+        if col in mapped.columns:
+            mapped[col] = ""
+    for k, v in BASELINE_DEFAULTS.items():
+        mapped[k] = v
+    mapped["HighJewellery Flag "] = ""
+    if "Metal Name" in df.columns:
+        mapped["Metal Type"] = df["Metal Name"]
+    mapped["Metal Name"] = ""
+    if "Pieces" in df.columns:
+        mapped["pieces"] = df["Pieces"]
+    mapped["Bangle Sizes"] = ""
+    mapped["Product Highlights"] = df.get("Metal Name", "").fillna("").apply(
+        lambda m: BASELINE_HIGHLIGHT.format(metal=str(m).strip()) if str(m).strip() else "")
+    mapped = mapped.drop(columns=["_sku_exact"])
+    return pd.concat([out, mapped], ignore_index=True)
+
+# ---------------------------------------------------------------------
+# 2. Inputs, check and timing
+# ---------------------------------------------------------------------
+def tiled_sample(n: int) -> pd.DataFrame:
+    """The sample catalog repeated to n rows (what the numbers in the commit log were measured on)."""
+    df, _ = read_erp(SAMPLE, "catalog")
+    return pd.concat([df] * (n // len(df) + 1), ignore_index=True).iloc[:n]
+
+def csv_text(df: pd.DataFrame) -> str:
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+def compare(df: pd.DataFrame, repeat: int = 3) -> Dict:
+    """Checks byte-identical CSV, then times both transforms (best of repeat)."""
+    planned = transform_catalog(df)[0]
+    identical = csv_text(planned) == csv_text(baseline_transform_catalog(df))
+    baseline_s, _ = _timed(lambda: baseline_transform_catalog(df), repeat)
+    plan_s, _ = _timed(lambda: transform_catalog(df), repeat)
+    return {"rows": len(df), "identical": identical, "baseline_s": round(baseline_s, 4),
+            "plan_s": round(plan_s, 4), "speedup": round(baseline_s / plan_s, 2)}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.catalog_plan", description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("-n", "--rows", nargs="+", type=int, default=DEFAULT_SIZES)
+    p.add_argument("-r", "--repeat", type=int, default=3, help="timing repeats (best is kept)")
+    p.add_argument("-o", "--output", help="results JSON (default: print only)")
+    a = p.parse_args(argv)
+
+    results = []
+    for n in a.rows:
+        r = compare(tiled_sample(n), a.repeat)
+        results.append(r)
+        print(f"{r['rows']:>9,d} rows  identical={r['identical']}  "
+              f"baseline {r['baseline_s']:.3f}s -> plan {r['plan_s']:.3f}s  x{r['speedup']:.2f}")
+    if a.output:
+        os.makedirs(os.path.dirname(os.path.abspath(a.output)), exist_ok=True)
+        with open(a.output, "w") as fh:
+            json.dump({"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _git_commit(),
+                                "python": platform.python_version(), "pandas": pd.__version__,
+                                "platform": platform.platform()},
+                       "results": results}, fh, indent=2)
+        print(f"results written to {a.output}")
+    return 0 if all(r["identical"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Benchmark the three ERP transforms on synthetic data.
+
+    python -m benchmarks.run                       # all workflows, 1k/10k/100k/1M rows
+    python -m benchmarks.run -w catalog -n 1000 10000 -o results.json
+    python -m benchmarks.run compare old.json new.json
+
+Each stage (read → validate → transform → CSV serialize, plus the per-SKU
+rollup for stones) is timed on its own.
+Peak memory per stage is measured in a second pass under tracemalloc (which
+tracks Python and NumPy allocations); pass --no-memory to skip it.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synth  # noqa: E402
+from transformers.common import validate_catalog_input, validate_price_input, validate_stone_input  # noqa: E402
+from transformers.ingest import read_erp  # noqa: E402
+from transformers.rollup import rollup_stones  # noqa: E402
+from transformers.templates import write_output  # noqa: E402
+from transformers.workflows import get_workflow  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, ".data")
+RESULTS_DIR = os.path.join(HERE, "results")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+VALIDATORS = {"price": validate_price_input, "stone": validate_stone_input, "catalog": validate_catalog_input}
+
+# ---------------------------------------------------------------------
+# 1. Measurement helpers
+# ---------------------------------------------------------------------
+def _timed(fn: Callable, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+def _peak_mb(fn: Callable) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+def bench_workflow(workflow: str, n: int, repeat: int = 3, memory: bool = True,
+                   max_read_rows: int = 100_000) -> List[Dict]:
+    wf = get_workflow(workflow)
+    df = synth.make(workflow, n)
+    stages: Dict[str, Callable] = {}
+    if n <= max_read_rows:
+        # writing xlsx is slow, so generated workbooks are cached under benchmarks/.data
+        path = synth.write_xlsx(df, os.path.join(DATA_DIR, f"{workflow}_{n}.xlsx"))
+        stages["read"] = lambda: read_erp(path, workflow)
+    stages["validate"] = lambda: VALIDATORS[workflow](df)
+    stages["transform"] = lambda: wf["transform"](df)
+    data = wf["transform"](df, include_template=False)[0]
+    if workflow == "stone":
+        stages["rollup"] = lambda: rollup_stones(data)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "out.csv")
+        # the writers' path: header block + typed data rows
+        stages["serialize"] = lambda: write_output(data, wf["key"], csv_path)
+
+        rows = []
+        for stage, fn in stages.items():
+            seconds, _ = _timed(fn, repeat)
+            rec = {"workflow": workflow, "rows": n, "stage": stage,
+                   "seconds": round(seconds, 4),
+                   "rows_per_sec": round(n / seconds) if seconds else None,
+                   "peak_mb": _peak_mb(fn) if memory else None}
+            print(f"{workflow:8s} {n:>9,d}  {stage:9s} {seconds:9.3f}s  "
+                  f"{rec['rows_per_sec'] or 0:>12,d} rows/s  "
+                  f"{'' if rec['peak_mb'] is None else str(rec['peak_mb']) + ' MB'}", flush=True)
+            rows.append(rec)
+    return rows
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+# ---------------------------------------------------------------------
+# 2. Compare two result files
+# ---------------------------------------------------------------------
+def compare(old_path: str, new_path: str, threshold: float = 1.10) -> int:
+    """Prints per-stage time ratios; returns 1 if any stage is slower than threshold."""
+    def load(p):
+        with open(p) as fh:
+            return {(r["workflow"], r["rows"], r["stage"]): r for r in json.load(fh)["results"]}
+    old, new = load(old_path), load(new_path)
+    regressed = 0
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key]["seconds"], new[key]["seconds"]
+        ratio = b / a if a else float("inf")
+        flag = "REGRESSION" if ratio > threshold else ""
+        regressed += bool(flag)
+        print(f"{key[0]:8s} {key[1]:>9,d}  {key[2]:9s} {a:9.3f}s -> {b:9.3f}s  x{ratio:5.2f} {flag}")
+    return 1 if regressed else 0
+
+# ---------------------------------------------------------------------
+# 3. CLI
+# ---------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        p = argparse.ArgumentParser(prog="python -m benchmarks.run compare")
+        p.add_argument("old")
+        p.add_argument("new")
+        p.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio that counts as a regression")
+        a = p.parse_args(argv[1:])
+        return compare(a.old, a.new, a.threshold)
+
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("-w", "--workflow", nargs="+", default=["price", "stone", "catalog"],
+                   choices=["price", "stone", "catalog"])
+    p.add_argument("-n", "--rows", nargs="+", type=int, default=DEFAULT_SIZES)
+    p.add_argument("-r", "--repeat", type=int, default=3, help="timing repeats (best is kept)")
+    p.add_argument("--max-read-rows", type=int, default=100_000,
+                   help="skip the xlsx read stage above this size (writing the workbook is slow)")
+    p.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    p.add_argument("-o", "--output", help="results JSON (default: benchmarks/results/bench-<timestamp>.json)")
+    a = p.parse_args(argv)
+
+    results = []
+    for wf in a.workflow:
+        for n in a.rows:
+            results.extend(bench_workflow(wf, n, a.repeat, not a.no_memory, a.max_read_rows))
+
+    out = a.output or os.path.join(RESULTS_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump({"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                            "commit": _git_commit(),
+                            "python": platform.python_version(),
+                            "pandas": pd.__version__,
+                            "platform": platform.platform()},
+                   "results": results}, fh, indent=2)
+    print(f"results written to {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+from typing import Optional
+import os
+import numpy as np
+import pandas as pd
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+# ---------------------------------------------------------------------
+# Synthetic ERP frames
+# ---------------------------------------------------------------------
+# Each generator resamples rows of the matching samples/ workbook (so the
+# column set and text values look like a real export) and then rewrites the
+# identifier and numeric columns with the awkward shapes seen in production:
+# barcodes with and without leading zeros, barcodes read as floats
+# ("12345678.0"), comma-formatted numbers and NaNs.
+
+def _sample(name: str) -> pd.DataFrame:
+    return pd.read_excel(os.path.join(SAMPLES_DIR, f"Sample_ERP_{name}.xlsx"))
+
+def _resample(base: pd.DataFrame, n: int, rng: np.random.Generator) -> pd.DataFrame:
+    return base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+def _barcodes(n: int, rng: np.random.Generator, nan_rate: float = 0.0) -> pd.Series:
+    codes = rng.integers(10_000_000, 99_999_999, n)
+    kind = rng.integers(0, 4, n)
+    out = np.empty(n, dtype=object)
+    out[kind == 0] = codes[kind == 0]                                          # plain int
+    out[kind == 1] = [f"00{c}" for c in codes[kind == 1]]                      # leading zeros
+    out[kind == 2] = codes[kind == 2].astype(float)                            # float read: 12345678.0
+    out[kind == 3] = [f"{c % 10_000_000:08d}" for c in codes[kind == 3]]       # 8 digits, leading zero kept
+    if nan_rate:
+        out[rng.random(n) < nan_rate] = np.nan
+    return pd.Series(out, dtype=object)
+
+def _messy_numbers(n: int, rng: np.random.Generator, scale: float = 50_000.0,
+                   comma_rate: float = 0.1, nan_rate: float = 0.05) -> pd.Series:
+    vals = np.round(rng.random(n) * scale, 2)
+    out = vals.astype(object)
+    commas = rng.random(n) < comma_rate
+    out[commas] = [f"{v:,.2f}" for v in vals[commas]]
+    out[rng.random(n) < nan_rate] = np.nan
+    return pd.Series(out, dtype=object)
+
+def make_price(n: int, seed: int = 0, barcode_nan_rate: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = _resample(_sample("Price"), n, rng)
+    df["Bar Code"] = _barcodes(n, rng, barcode_nan_rate)
+    for c in ["Diamond Cost", "Stone Cost", "Making", "Wastage", "Accessories Cost",
+              "Metal Cost", "GST", "Selling Price w/o Promotion", "Selling Price with Promotion"]:
+        df[c] = _messy_numbers(n, rng)
+    return df
+
+def make_stone(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = _resample(_sample("Stone"), n, rng)
+    # ~3 stones per product
+    skus = rng.integers(10_000_000, 99_999_999, max(1, n // 3))
+    df["Main Batch Number"] = [f"CKC_00{s}" for s in skus[rng.integers(0, len(skus), n)]]
+    df["Stone Batch Number"] = rng.integers(10_000_000, 99_999_999, n)
+    df["Stone  No. of Pieces"] = _messy_numbers(n, rng, scale=100, comma_rate=0.0, nan_rate=0.01)
+    df["Stone Weight"] = _messy_numbers(n, rng, scale=5, comma_rate=0.0)
+    df["Stone Units"] = np.where(rng.random(n) < 0.8, "CTS", "GMS")
+    df["Stone Amount"] = _messy_numbers(n, rng)
+    return df
+
+def make_catalog(n: int, seed: int = 0, barcode_nan_rate: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = _resample(_sample("Catalog"), n, rng)
+    df["Bar Code"] = _barcodes(n, rng, barcode_nan_rate)
+    df["Net Metal Weight"] = _messy_numbers(n, rng, scale=50, comma_rate=0.0)
+    df["Gross Item Weight"] = _messy_numbers(n, rng, scale=60, comma_rate=0.0)
+    df.loc[rng.random(n) < 0.1, "Metal Name"] = np.nan
+    return df
+
+GENERATORS = {"price": make_price, "stone": make_stone, "catalog": make_catalog}
+
+def make(workflow: str, n: int, seed: int = 0, **kwargs) -> pd.DataFrame:
+    return GENERATORS[workflow](n, seed=seed, **kwargs)
+
+def write_xlsx(df: pd.DataFrame, path: str, cache: Optional[bool] = True) -> str:
+    """Writes df to path (once — existing files are reused when cache is True)."""
+    if not (cache and os.path.exists(path)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        df.to_excel(path, index=False)
+    return path
@@ -0,0 +1,57 @@
+import csv
+import gzip
+import io
+import itertools
+import os
+import sys
+from typing import List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GOLDEN_DIR = os.path.join(ROOT, "tests", "golden")
+SAMPLES_DIR = os.path.join(ROOT, "samples")
+# CKC_UPDATE_GOLDEN=1 rewrites the golden files from the current output instead of comparing
+UPDATE_GOLDEN = os.environ.get("CKC_UPDATE_GOLDEN") == "1"
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: throughput thresholds (scale with CKC_PERF_SCALE, 0 skips)")
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        # mtime=0 so rewriting an unchanged golden gives the same bytes
+        return io.TextIOWrapper(gzip.GzipFile(path, mode + "b", mtime=0), encoding="utf-8", newline="")
+    return open(path, mode, newline="", encoding="utf-8")
+
+def read_golden(name: str) -> str:
+    with _open(os.path.join(GOLDEN_DIR, name), "r") as fh:
+        return fh.read()
+
+def csv_rows(text: str) -> List[List[str]]:
+    return list(csv.reader(io.StringIO(text)))
+
+def assert_matches_golden(text: str, name: str) -> None:
+    """Compares CSV text with tests/golden/<name> cell by cell, then byte for byte."""
+    path = os.path.join(GOLDEN_DIR, name)
+    if UPDATE_GOLDEN:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with _open(path, "w") as fh:
+            fh.write(text)
+        return
+    if not os.path.exists(path):
+        pytest.fail(f"No golden file {name}; run with CKC_UPDATE_GOLDEN=1 to create it")
+    golden = read_golden(name)
+    expected, got = csv_rows(golden), csv_rows(text)
+    header = expected[0] if expected else []
+    diffs = []
+    for line, (exp_row, got_row) in enumerate(itertools.zip_longest(expected, got, fillvalue=[]), start=1):
+        for col, (e, g) in enumerate(itertools.zip_longest(exp_row, got_row)):
+            if e != g:
+                diffs.append(f"line {line} [{header[col] if col < len(header) else col}]: "
+                             f"expected {e!r}, got {g!r}")
+    assert not diffs, (f"{name}: {len(diffs)} cells differ ({len(got)} lines, golden has {len(expected)}):\n"
+                       + "\n".join(diffs[:20]))
+    # same cells; quoting and line endings must match too
+    assert text == golden, f"{name}: same cells but different quoting or line endings"
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from test_golden import convert, output_text, sample_path
+from test_templates import write_template
+from transformers import rulesets, templates
+from transformers.cache import ResultCache, workflow_fingerprint
+from transformers.ingest import read_erp
+from transformers.workflows import get_workflow
+
+@pytest.fixture
+def catalog_input():
+    df, _ = read_erp(sample_path("catalog"), "catalog")
+    return df
+
+def counting(compute):
+    calls = []
+    def run():
+        calls.append(1)
+        return compute()
+    return run, calls
+
+def test_spilled_results_reload_after_clear_and_restart(tmp_path, catalog_input):
+    compute, calls = counting(lambda: get_workflow("catalog")["transform"](catalog_input, include_template=False))
+    cache = ResultCache(spill_dir=str(tmp_path))
+    out, err = cache.result("file", "catalog", compute)
+    (key,) = os.listdir(tmp_path)
+    assert sorted(os.listdir(tmp_path / key)) == ["err.parquet", "out.parquet"]
+
+    cache.clear()
+    again, again_err = cache.result("file", "catalog", compute)
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert output_text(again, "catalog") == output_text(out, "catalog") == convert(catalog_input, "catalog")
+    assert again_err.to_dict("records") == err.to_dict("records")
+    # a new cache on the same directory, e.g. after a restart
+    ResultCache(spill_dir=str(tmp_path)).result("file", "catalog", compute)
+    assert len(calls) == 1
+
+def test_bundles_parquet_cannot_hold_stay_in_memory(tmp_path):
+    mixed = pd.DataFrame({"Bar Code": [1001, "A-7"]}, dtype=object)
+    parse, calls = counting(lambda: mixed)
+    cache = ResultCache(spill_dir=str(tmp_path))
+    assert cache.frame("file", parse) is mixed
+    assert os.listdir(tmp_path) == []
+    assert cache.frame("file", parse) is mixed and len(calls) == 1
+    cache.clear()
+    cache.frame("file", parse)
+    assert len(calls) == 2
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    for key in "ab":
+        cache.put(key, {"out": pd.DataFrame({"k": [key]})})
+    assert cache.get("a") is not None
+    cache.put("c", {"out": pd.DataFrame({"k": ["c"]})})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+@pytest.fixture
+def rules_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rulesets, "RULES_DIR", str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    rulesets.load_rule_sets(force=True)
+
+def test_fingerprint_follows_the_rules(rules_dir):
+    def write_rules(title):
+        (rules_dir / "garnet.json").write_text(json.dumps(
+            {"collections": ["Garnet"], "columns": {"Meta Title": {"template": title}}}))
+        rulesets.load_rule_sets(force=True)
+
+    write_rules("{Article Description} | CKC")
+    builtin, price = workflow_fingerprint("catalog"), workflow_fingerprint("price")
+    garnet = workflow_fingerprint("catalog", "garnet")
+    assert garnet != builtin
+    assert workflow_fingerprint("catalog", "garnet") == garnet
+    write_rules("{Article Description} - CKC")
+    assert workflow_fingerprint("catalog", "garnet") != garnet
+    assert workflow_fingerprint("catalog") == builtin
+    # rules only belong to the catalog key
+    assert workflow_fingerprint("price", "garnet") == price
+
+@pytest.fixture
+def template_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(templates, "TEMPLATE_DIR", str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    templates.load_templates(force=True)
+
+def test_fingerprint_follows_the_template_version(template_dir, monkeypatch):
+    price = templates.get_template("price")
+    builtin = workflow_fingerprint("price")
+    # version "v2": the builtin headers with one changed metadata cell
+    rows = [dict(r) for r in price["rows"]]
+    rows[1][price["headers"][0]] = "changed"
+    write_template(template_dir / "v2" / price["filename"], price["headers"], rows)
+    templates.load_templates(force=True)
+    assert workflow_fingerprint("price") == builtin
+    monkeypatch.setattr(templates, "DEFAULT_VERSION", "v2")
+    v2 = workflow_fingerprint("price")
+    assert v2 != builtin
+    rows[1][price["headers"][0]] = "changed again"
+    write_template(template_dir / "v2" / price["filename"], price["headers"], rows)
+    templates.load_templates(force=True)
+    assert workflow_fingerprint("price") not in (builtin, v2)
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from benchmarks import synth
+from benchmarks.catalog_plan import baseline_transform_catalog, csv_text, tiled_sample
+from transformers.catalog import transform_catalog
+
+# The compiled plan must give the same CSV bytes as the column-by-column
+# transform it replaced (benchmarks/catalog_plan.py times the two).
+
+def assert_same_csv(df: pd.DataFrame) -> None:
+    assert csv_text(transform_catalog(df)[0]) == csv_text(baseline_transform_catalog(df))
+
+def test_sample_matches_baseline():
+    assert_same_csv(tiled_sample(10))
+
+def test_edge_barcodes_match_baseline():
+    # leading zeros, short and 12-digit codes, stray whitespace
+    df = tiled_sample(30)
+    df.loc[3, "Bar Code"] = "0000123"
+    df.loc[7, "Bar Code"] = "100016662650"
+    df.loc[9, "Bar Code"] = " 16944084 "
+    assert_same_csv(df)
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_generated_input_matches_baseline(seed):
+    # barcodes as text, the way ingestion reads them (the baseline mis-read float barcodes)
+    df = synth.make("catalog", 2000, seed=seed)
+    df["Bar Code"] = [str(int(v)) if isinstance(v, float) else str(v) for v in df["Bar Code"]]
+    assert_same_csv(df)
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from test_golden import sample_path
+from transformers.batch import convert_file
+from transformers.delta import commit_snapshot, delta_rows
+from transformers.ingest import read_erp
+from transformers.workflows import get_workflow
+
+def price_rows() -> pd.DataFrame:
+    df, _ = read_erp(sample_path("price"), "price")
+    return get_workflow("price")["transform"](df, include_template=False)[0]
+
+def test_snapshot_moves_only_when_committed(tmp_path):
+    data = price_rows()
+    first, _, stats = delta_rows(data, "price", str(tmp_path))
+    assert stats["first_run"] and len(first) == len(data)
+    # not committed yet: the same delta comes back
+    assert len(delta_rows(data, "price", str(tmp_path))[0]) == len(data)
+    commit_snapshot(data, "price", str(tmp_path))
+    changed = data.copy()
+    changed.iloc[0, changed.columns.get_loc("CR_MakingCharges")] = 12345.5
+    delta, removed, stats = delta_rows(changed.iloc[:-1], "price", str(tmp_path))
+    assert len(delta) == 1 and len(removed) == 1 and not stats["first_run"]
+
+def test_batch_delta_commits_after_writing(tmp_path):
+    src = tmp_path / "prices.xlsx"
+    read_erp(sample_path("price"), "price")[0].to_excel(src, index=False)
+    snapshots = tmp_path / "snapshots"
+    assert convert_file(str(src), "price", delta_dir=str(snapshots))["rows"] == len(price_rows())
+    assert convert_file(str(src), "price", delta_dir=str(snapshots))["rows"] == 0
@@ -0,0 +1,169 @@
+import io
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES_DIR, assert_matches_golden, csv_rows, read_golden
+from benchmarks import synth
+from transformers.ingest import read_erp
+from transformers.merge import merge_sources
+from transformers.streaming import stream_transform
+from transformers.templates import get_template, write_output
+from transformers.workflows import get_workflow
+
+WORKFLOW_KEYS = ["price", "stone", "catalog"]
+SAMPLES = {"price": "Price", "stone": "Stone", "catalog": "Catalog"}
+# generated inputs: the messy barcodes/numbers of benchmarks/synth.py, fixed seed
+SYNTHETIC_ROWS = 1000
+SYNTHETIC_SEED = 7
+TEMPLATE_ROWS = 4
+
+def sample_path(key: str) -> str:
+    return os.path.join(SAMPLES_DIR, f"Sample_ERP_{SAMPLES[key]}.xlsx")
+
+def sample_golden(key: str) -> str:
+    return get_workflow(key)["filename"]
+
+def synthetic_golden(key: str) -> str:
+    return f"synthetic_{key}_{SYNTHETIC_ROWS}.csv.gz"
+
+def output_text(data: pd.DataFrame, key: str) -> str:
+    buf = io.StringIO()
+    write_output(data, key, buf)
+    return buf.getvalue()
+
+def convert(df: pd.DataFrame, key: str) -> str:
+    data, _ = get_workflow(key)["transform"](df, include_template=False)
+    return output_text(data, key)
+
+# ---------------------------------------------------------------------
+# 1. Golden outputs
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_sample_matches_golden(key):
+    df, _ = read_erp(sample_path(key), key)
+    assert_matches_golden(convert(df, key), sample_golden(key))
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_generated_input_matches_golden(key):
+    df = synth.make(key, SYNTHETIC_ROWS, seed=SYNTHETIC_SEED)
+    assert_matches_golden(convert(df, key), synthetic_golden(key))
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_template_frame_matches_writer(key):
+    # transform(include_template=True) is the frame the app used to write directly
+    df, _ = read_erp(sample_path(key), key)
+    out, _ = get_workflow(key)["transform"](df)
+    assert_matches_golden(out.to_csv(index=False), sample_golden(key))
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_streaming_matches_golden(key):
+    out = io.StringIO()
+    n_rows, _ = stream_transform(sample_path(key), key, out, batch_size=3)
+    assert n_rows == len(csv_rows(read_golden(sample_golden(key)))) - 1 - TEMPLATE_ROWS
+    assert_matches_golden(out.getvalue(), sample_golden(key))
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_merged_sheets_match_golden(key, tmp_path):
+    # the sample split over two sheets and two workbooks gives the same single CSV
+    df, _ = read_erp(sample_path(key))
+    first, second = tmp_path / "part1.xlsx", tmp_path / "part2.xlsx"
+    with pd.ExcelWriter(first) as writer:
+        df.iloc[:3].to_excel(writer, sheet_name="A", index=False)
+        df.iloc[3:6].to_excel(writer, sheet_name="B", index=False)
+    df.iloc[6:].to_excel(second, index=False)
+    out = io.StringIO()
+    merge_sources([str(first), str(second)], key, out)
+    assert_matches_golden(out.getvalue(), sample_golden(key))
+
+# ---------------------------------------------------------------------
+# 2. Template rows and image names
+# ---------------------------------------------------------------------
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_golden_starts_with_template_rows(key):
+    tpl = get_template(key)
+    rows = csv_rows(read_golden(sample_golden(key)))
+    assert rows[0] == list(tpl["headers"])
+    assert len(tpl["rows"]) == TEMPLATE_ROWS
+    for got, meta in zip(rows[1:1 + TEMPLATE_ROWS], tpl["rows"]):
+        assert got == ["" if pd.isna(meta.get(h)) else str(meta.get(h, "")) for h in tpl["headers"]]
+
+@pytest.mark.parametrize("golden", [sample_golden("catalog"), synthetic_golden("catalog")])
+def test_pdp_image_names_are_zero_padded_bar_codes(golden):
+    rows = csv_rows(read_golden(golden))
+    header, data = rows[0], rows[1 + TEMPLATE_ROWS:]
+    sku = header.index("SKU Code")
+    slots = [(i, header.index(f"PDP Image {i}")) for i in range(1, 16)]
+    checked = 0
+    for row in data:
+        if not row[sku]:
+            assert all(row[col] == "" for _, col in slots)
+            continue
+        code = row[sku][len("CKC_"):]
+        assert re.fullmatch(r"\d{10}", code), row[sku]
+        for i, col in slots:
+            assert row[col] == f"{code}_{i}.jpg"
+        checked += 1
+    assert checked
+
+# ---------------------------------------------------------------------
+# 3. Batched reads match a whole-file conversion
+# ---------------------------------------------------------------------
+WIDE_BAR_CODE = "100016662650"
+
+def crafted_input(key: str, path) -> str:
+    # whole numbers only in the first batch of 3, decimals and a 12-digit barcode in the last
+    df, _ = read_erp(sample_path(key), key)
+    for c in df.columns:
+        if pd.api.types.is_float_dtype(df[c]):
+            df.loc[df.index[:3], c] = 1.0
+            df.loc[df.index[-1], c] = 2.5
+    if "Bar Code" in df.columns:
+        df.loc[df.index[-1], "Bar Code"] = WIDE_BAR_CODE
+    df.to_excel(path, index=False)
+    return str(path)
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_streaming_matches_whole_file(key, tmp_path):
+    path = crafted_input(key, tmp_path / "input.xlsx")
+    out = io.StringIO()
+    stream_transform(path, key, out, batch_size=3)
+    assert out.getvalue() == convert(read_erp(path, key)[0], key)
+    if key == "catalog":
+        assert f"{WIDE_BAR_CODE}_1.jpg" in out.getvalue()
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_merge_matches_whole_file(key, batch_size, tmp_path):
+    # integer-only first sheet, decimals and the wide barcode only in the second file
+    path = crafted_input(key, tmp_path / "input.xlsx")
+    df = pd.read_excel(path, dtype=object)
+    first, second = tmp_path / "part1.xlsx", tmp_path / "part2.xlsx"
+    with pd.ExcelWriter(first) as writer:
+        df.iloc[:3].to_excel(writer, sheet_name="A", index=False)
+        df.iloc[3:6].to_excel(writer, sheet_name="B", index=False)
+    df.iloc[6:].to_excel(second, index=False)
+    out = io.StringIO()
+    merge_sources([str(first), str(second)], key, out, batch_size=batch_size)
+    assert out.getvalue() == convert(read_erp(path, key)[0], key)
+
+# a column each workflow reads that gets date cells, and one that mixes text and numbers
+DATE_AND_MIXED = {"price": ("Making", "Wastage"), "stone": ("Stone Origin", "Stone Weight"),
+                  "catalog": ("Vendor", "Length")}
+
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_streaming_reads_dates_and_mixed_columns_like_the_whole_file(key, tmp_path):
+    # the first batch of 3 holds only dates; the others mix in a whole number
+    df, _ = read_erp(sample_path(key), key)
+    dates, mixed = DATE_AND_MIXED[key]
+    values = list(pd.date_range("2024-01-30", periods=len(df), freq="D").to_pydatetime())
+    values[3], values[7] = 4, 8
+    df[dates] = pd.Series(values, dtype=object).to_numpy()
+    df[mixed] = pd.Series([5, 2.5, 7] + ["12 mm", 3] * len(df), dtype=object).iloc[:len(df)].to_numpy()
+    path = tmp_path / "input.xlsx"
+    df.to_excel(path, index=False)
+    out = io.StringIO()
+    stream_transform(str(path), key, out, batch_size=3)
+    assert out.getvalue() == convert(read_erp(str(path), key)[0], key)
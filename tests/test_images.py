@@ -0,0 +1,39 @@
+from test_golden import sample_path
+from transformers.images import MANIFEST_COLUMNS, check_images, scan_images
+from transformers.ingest import read_erp
+from transformers.workflows import get_workflow
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+
+def test_check_images_finds_any_case_and_extension(tmp_path):
+    df, _ = read_erp(sample_path("catalog"), "catalog")
+    data, _ = get_workflow("catalog")["transform"](df.head(3), include_template=False)
+    first, second = (data["PDP Image 1"].iloc[i][:-len("_1.jpg")] for i in (0, 1))
+    touch(tmp_path / f"{first}_1.JPG")
+    touch(tmp_path / "a" / "b" / f"{first}_2.png")
+    touch(tmp_path / "c" / f"{first}_3.jpeg")
+    # an exact name wins over another extension scanned earlier
+    touch(tmp_path / f"{first}_4.jpeg")
+    touch(tmp_path / "d" / f"{first}_4.jpg")
+    # not images, or not the same stem
+    touch(tmp_path / "a" / f"{first}_5.txt")
+    touch(tmp_path / f"{first}_6.jpg.bak")
+    touch(tmp_path / f"{second}_10.jpg")
+
+    index = scan_images(str(tmp_path), max_workers=2)
+    assert len(index) == 6
+    checked, err, manifest = check_images(data, index)
+
+    row = checked.iloc[0]
+    assert [row[f"PDP Image {i}"] for i in range(1, 7)] == [
+        f"{first}_1.JPG", f"{first}_2.png", f"{first}_3.jpeg", f"{first}_4.jpg", "", ""]
+    assert list(manifest.columns) == MANIFEST_COLUMNS
+    assert manifest["Path"].tolist() == [
+        f"{first}_1.JPG", f"a/b/{first}_2.png", f"c/{first}_3.jpeg", f"d/{first}_4.jpg", f"{second}_10.jpg"]
+    assert manifest["Slot"].tolist() == [1, 2, 3, 4, 10]
+    # rows 1 and 2 have no primary image
+    assert err["row"].tolist() == data.index[1:].tolist()
+    assert checked.iloc[1]["PDP Image 10"] == f"{second}_10.jpg"
+    assert (checked.iloc[2][[f"PDP Image {i}" for i in range(1, 16)]] == "").all()
@@ -0,0 +1,15 @@
+import pytest
+
+from test_golden import WORKFLOW_KEYS, convert, crafted_input, sample_path
+from transformers.ingest import import_workbook, read_columnar, read_erp
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+@pytest.mark.parametrize("key", WORKFLOW_KEYS)
+def test_columnar_import_converts_like_the_workbook(key, fmt, tmp_path):
+    # the sample and a copy with whole numbers, decimals and a wide barcode in one column
+    for path in [sample_path(key), crafted_input(key, tmp_path / "crafted.xlsx")]:
+        dest = str(tmp_path / f"import.{fmt}")
+        import_workbook(path, dest)
+        df, report = read_columnar(dest, key)
+        assert report["engine"] == fmt
+        assert convert(df, key) == convert(read_erp(path, key)[0], key)
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from benchmarks import synth
+from test_golden import sample_path
+from transformers.batch import main
+from transformers.ingest import read_erp, read_reference_skus
+from transformers.integrity import DatasetIndex
+from transformers.workflows import dataset_index, get_workflow
+
+def test_batches_report_what_one_pass_reports():
+    # repeated rows and float-read barcodes give duplicates and collisions across batches
+    df = synth.make("price", 3000, seed=4)
+    df = pd.concat([df, df.sample(300, random_state=1)], ignore_index=True)
+    whole = DatasetIndex("price").add(df)
+    index = DatasetIndex("price")
+    batched = pd.concat([index.add(df.iloc[i:i + 250]) for i in range(0, len(df), 250)], ignore_index=True)
+    assert len(whole) >= 300
+    pd.testing.assert_frame_equal(batched.reset_index(drop=True), whole.reset_index(drop=True), check_dtype=False)
+
+def test_transform_checks_references():
+    stones, _ = read_erp(sample_path("stone"), "stone")
+    catalog = read_reference_skus([sample_path("catalog")])
+    first_sku = catalog["catalog"][0]
+    catalog["catalog"] = catalog["catalog"].drop(first_sku)
+    _, err = get_workflow("stone")["transform"](stones, include_template=False,
+                                                 index=dataset_index("stone", catalog))
+    missing = err[err["issue"].str.contains("not found in Catalog Creation input")]
+    assert len(missing) and missing["issue"].str.contains(first_sku).all()
+
+def test_cli_reference_flag(tmp_path):
+    src = tmp_path / "prices.xlsx"
+    read_erp(sample_path("price"), "price")[0].iloc[:5].to_excel(src, index=False)
+    ref = tmp_path / "catalog.xlsx"
+    read_erp(sample_path("catalog"), "catalog")[0].iloc[1:].to_excel(ref, index=False)
+    assert main([str(src), "-w", "price", "-j", "1", "--reference", str(ref)]) == 0
+    errors = pd.read_csv(tmp_path / "prices_SellerPriceBulkUpload_errors.csv")
+    assert errors["issue"].str.contains("not found in Catalog Creation input").sum() == 1
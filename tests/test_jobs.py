@@ -0,0 +1,50 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from test_golden import TEMPLATE_ROWS, sample_path
+from transformers import jobs
+from transformers.jobs import DONE, JobQueue
+from transformers.streaming import stream_transform
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs"), max_workers=1)
+    yield q
+    q.shutdown()
+
+def test_stream_job_reports_progress_and_output(queue, monkeypatch):
+    seen = []
+    update = jobs._update
+    monkeypatch.setattr(jobs, "_update", lambda db, job_id, **f: (seen.append(f.get("progress")),
+                                                                   update(db, job_id, **f)))
+    with open(sample_path("price"), "rb") as fh:
+        data = fh.read()
+    options = {"stream": True, "batch_size": 3}
+    # a rerun with the same bytes and options is the same job
+    job_id = queue.submit(data, "prices.xlsx", "Seller Price", options)
+    assert queue.submit(data, "prices.xlsx", "Seller Price", options) == job_id
+    queue.shutdown()
+
+    job = queue.get(job_id)
+    assert job["status"] == DONE and job["progress"] == 1.0 and job["rows"] == 10
+    assert job["output"] == os.path.join(queue.job_dir, job_id, "SellerPriceBulkUpload.csv")
+    expected = io.StringIO()
+    stream_transform(sample_path("price"), "price", expected)
+    with open(job["output"], newline="", encoding="utf-8") as fh:
+        assert fh.read() == expected.getvalue()
+    assert len(expected.getvalue().splitlines()) == 1 + TEMPLATE_ROWS + 10
+    # every batch of 3 of the 10 rows moved the bar
+    assert [p for p in seen if p is not None] == [0.0, 0.3, 0.6, 0.9, 1.0, 1.0]
+
+def test_concurrent_identical_submissions_make_one_job(queue):
+    with open(sample_path("stone"), "rb") as fh:
+        data = fh.read()
+    with ThreadPoolExecutor(8) as pool:
+        ids = set(pool.map(lambda _: queue.submit(data, "stones.xlsx", "Product Stone"), range(8)))
+    queue.shutdown()
+    assert len(ids) == 1
+    assert [j["id"] for j in queue.jobs()] == list(ids)
+    assert sorted(os.listdir(queue.job_dir)) == sorted(["jobs.sqlite", *ids])
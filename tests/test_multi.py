@@ -0,0 +1,47 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from test_golden import convert, sample_path
+from transformers.cache import ResultCache
+from transformers.ingest import read_erp
+from transformers.multi import ERRORS_FILENAME, convert_all
+from transformers.workflows import get_workflow
+
+def combined_export() -> pd.DataFrame:
+    # one export carrying the catalog and price columns for the same bar codes
+    catalog, _ = read_erp(sample_path("catalog"), "catalog")
+    price, _ = read_erp(sample_path("price"), "price")
+    return pd.concat([catalog, price.drop(columns=["Bar Code"])], axis=1)
+
+def test_convert_all_zips_every_detected_workflow():
+    df = combined_export()
+    results, manifest, payload = convert_all(df)
+    assert set(results) == {"Catalog Creation", "Seller Price"}
+    assert manifest is None
+    with zipfile.ZipFile(io.BytesIO(payload)) as zf:
+        names = set(zf.namelist())
+        assert names == {get_workflow("catalog")["filename"], get_workflow("price")["filename"], ERRORS_FILENAME}
+        catalog_csv = zf.read(get_workflow("catalog")["filename"]).decode("utf-8")
+    # the shared frame gives the same catalog CSV as a catalog-only conversion
+    assert catalog_csv == convert(df, "catalog")
+
+def test_cached_results_keep_their_reference_checks():
+    # stone rows whose Main Batch Number has no catalog Bar Code in the same export
+    catalog, _ = read_erp(sample_path("catalog"), "catalog")
+    stone, _ = read_erp(sample_path("stone"), "stone")
+    df = pd.concat([catalog, stone.drop(columns=[c for c in stone.columns if c in catalog.columns])], axis=1)
+    df.loc[0, "Bar Code"] = "999"
+    cache, digest = ResultCache(), "same-file"
+    # single mode without reference uploads runs first, then the all-workflows mode on the same file
+    _, single = cache.result(digest, "stone",
+                             lambda: get_workflow("stone")["transform"](df, include_template=False))
+    results, _, _ = convert_all(df, cache=cache, digest=digest)
+    combined = results["Product Stone"][1]
+    assert not single["issue"].str.contains("not found in Catalog Creation input").any()
+    assert combined["issue"].str.contains("not found in Catalog Creation input").any()
+    # and the single-mode entry is still the unchecked one
+    _, again = cache.result(digest, "stone", lambda: pytest.fail("single-mode result was not cached"))
+    pd.testing.assert_frame_equal(again, single)
@@ -0,0 +1,45 @@
+import json
+import threading
+
+from transformers.profiling import RECORD_COLUMNS, Profiler, stage
+
+def timed_elsewhere():
+    with stage("thread"):
+        pass
+
+def test_stages_record_under_the_active_profiler_only():
+    outer, inner = Profiler(), Profiler()
+    with stage("before"):
+        pass
+    with outer.activate():
+        with stage("read", 10):
+            with stage("read.parse"):
+                with inner.activate(), stage("nested run"):
+                    pass
+        # a new thread starts without an active profiler
+        worker = threading.Thread(target=timed_elsewhere)
+        worker.start()
+        worker.join()
+    with stage("after"):
+        pass
+    assert [r["stage"] for r in outer.records] == ["read.parse", "read"]
+    assert [r["stage"] for r in inner.records] == ["nested run"]
+    assert outer.records[1]["rows"] == 10
+    assert list(outer.to_frame().columns) == RECORD_COLUMNS
+
+def test_jsonl_lines_carry_run_id_and_stage(tmp_path):
+    path = tmp_path / "logs" / "timings.jsonl"
+    for name in ("a.xlsx", "b.xlsx"):
+        prof = Profiler(file=name, workflow="catalog")
+        with prof.activate():
+            with stage("transform", 5):
+                pass
+            with stage("serialize", 5):
+                pass
+        prof.write_jsonl(str(path))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["file"], r["stage"]) for r in lines] == [
+        ("a.xlsx", "transform"), ("a.xlsx", "serialize"), ("b.xlsx", "transform"), ("b.xlsx", "serialize")]
+    assert lines[0]["run_id"] == lines[1]["run_id"] != lines[2]["run_id"]
+    assert all(isinstance(r["seconds"], float) and r["seconds"] >= 0 and r["rows"] == 5 for r in lines)
+    assert all(r["workflow"] == "catalog" and set(RECORD_COLUMNS) <= set(r) for r in lines)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from transformers.common import normalize_barcodes
+from transformers.rollup import ROLLUP_COLUMNS, STONE_UNIT_TO_CTS, fill_attributes, rollup_stones
+
+def groupby_rollup(stones: pd.DataFrame) -> pd.DataFrame:
+    # the straightforward per-row groupby that rollup_stones' bincount version replaces
+    df = pd.DataFrame({
+        "SKU Code": normalize_barcodes(stones["SKU_Code_Bar_Code"])["sku"],
+        "weight": pd.to_numeric(stones["Stone Weight"], errors="coerce"),
+        "unit": stones["Stone Units"].astype(object).where(stones["Stone Units"].notna(), ""),
+        "pieces": pd.to_numeric(stones["Stone(No. of Pieces)"], errors="coerce"),
+        "amount": pd.to_numeric(stones["Stone Price"], errors="coerce"),
+        "type": stones["Stone Type"].astype(object).where(stones["Stone Type"].notna(), ""),
+    })
+    df = df[df["SKU Code"] != ""]
+    df["cts"] = df["weight"] * df["unit"].astype(str).str.strip().str.upper().map(STONE_UNIT_TO_CTS)
+    df["unconverted"] = df["weight"].notna() & df["cts"].isna()
+    df["type"] = df["type"].astype(str).str.strip().str.upper().replace("", np.nan)
+    g = df.groupby("SKU Code", sort=False)
+    return pd.DataFrame({
+        "Stone Lines": g.size(),
+        "Total Stone Pieces": g["pieces"].sum(min_count=1),
+        "Total Stone Weight (cts)": g["cts"].sum(min_count=1).round(4),
+        "Total Stone Amount": g["amount"].sum(min_count=1).round(2),
+        "Stone Types": g["type"].nunique(),
+        "Unconverted Weights": g["unconverted"].sum(),
+    }).reset_index()
+
+def test_rollup_matches_groupby():
+    stones = pd.DataFrame({
+        "SKU_Code_Bar_Code": ["1001", "1001", 1001.0, "1002", "1002", None, "n/a", "1003", "1001"],
+        "Stone Weight":      [0.5, "1.2", 0.01, 2, 3, 1, 1, None, 0.25],
+        "Stone Units":       ["CTS", " gms", "Mg", "ct", "bags", "CTS", "CTS", "CTS", None],
+        "Stone(No. of Pieces)": [2, 3, None, 1, 4, 9, 9, None, 1],
+        "Stone Price":       [100.5, 20, None, 7.125, 3, 5, 5, None, 1],
+        "Stone Type":        ["Diamond", "diamond ", "Ruby", None, "", "Pearl", "Pearl", None, "Emerald"],
+    })
+    rollup = rollup_stones(stones)
+    assert list(rollup.columns) == ROLLUP_COLUMNS
+    expected = groupby_rollup(stones)
+    assert rollup["SKU Code"].tolist() == expected["SKU Code"].tolist() == [
+        "CKC_0000001001", "CKC_0000001002", "CKC_0000001003"]
+    for col in ROLLUP_COLUMNS[1:]:
+        np.testing.assert_array_equal(rollup[col].astype(float), expected[col].astype(float), err_msg=col)
+    sku_1001 = rollup.iloc[0]
+    # 0.5 ct + 1.2 g + 0.01 mg in carats; the row without a unit is unconverted
+    assert sku_1001["Total Stone Weight (cts)"] == 6.5
+    assert sku_1001["Unconverted Weights"] == 1 and sku_1001["Stone Types"] == 3
+    # SKU 1003 has one line with no weight, pieces, amount or type
+    assert rollup.iloc[2][ROLLUP_COLUMNS[2:5]].isna().all() and rollup.iloc[2]["Stone Types"] == 0
+
+def test_skus_without_stones_get_blank_attributes():
+    rollup = rollup_stones(pd.DataFrame({
+        "SKU_Code_Bar_Code": ["1001"], "Stone Weight": [0.5], "Stone Units": ["CTS"],
+        "Stone(No. of Pieces)": [2], "Stone Price": [10], "Stone Type": ["Diamond"],
+    }))
+    data = pd.DataFrame({"SKU Code": ["CKC_0000001001", "CKC_0000009999"], "Attribute 1": ["x", "x"]})
+    filled = fill_attributes(data, rollup)
+    assert filled.loc[0, ["Attribute 1", "Attribute 2", "Attribute 3", "Attribute 4"]].tolist() == [2, 0.5, 10.0, 1]
+    assert filled.loc[1, ["Attribute 1", "Attribute 2", "Attribute 3", "Attribute 4"]].tolist() == ["", "", "", ""]
+    assert data["Attribute 1"].tolist() == ["x", "x"]
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from test_golden import convert, sample_path
+from transformers import rulesets
+from transformers.catalog import CATALOG_FUNCTIONS, CATALOG_HEADERS
+from transformers.ingest import read_erp
+
+@pytest.fixture
+def rules_dir(tmp_path, monkeypatch):
+    # what CKC_RULES_DIR does
+    monkeypatch.setattr(rulesets, "RULES_DIR", str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    rulesets.load_rule_sets(force=True)
+
+def test_builtin_set_is_the_shipped_file():
+    builtin = rulesets.get_rule_set(rulesets.BUILTIN)
+    with open(rulesets.BUILTIN_RULES_FILE, encoding="utf-8") as fh:
+        shipped = json.load(fh)["columns"]
+    assert builtin["source"] == rulesets.BUILTIN_RULES_FILE
+    assert builtin["columns"] == shipped
+    assert list(shipped) == CATALOG_HEADERS
+    assert {next(iter(rule)) for rule in shipped.values()} == set(rulesets.RULE_KINDS)
+    # the shipped dir is scanned for other sets without reading builtin.json twice
+    assert rulesets.rule_set_names()
+    assert not rulesets.RULE_ERRORS
+
+def test_rule_files_override_and_bad_files_are_reported(rules_dir):
+    (rules_dir / "garnet.json").write_text(json.dumps(
+        {"collections": ["Garnet"], "columns": {"Meta Title": {"template": "{Article Description} | CKC"}}}))
+    (rules_dir / "broken.json").write_text('{"columns": {')
+    (rules_dir / "typo.json").write_text(json.dumps({"columns": {"Meta Titel": {"const": "x"}}}))
+    rulesets.load_rule_sets(force=True)
+    garnet = rulesets.get_rule_set("garnet")
+    assert garnet["columns"]["Meta Title"] == {"template": "{Article Description} | CKC"}
+    assert garnet["columns"]["SKU Code"] == {"derived": "sku_code"}
+    assert "broken" not in rulesets.RULE_SETS and "typo" not in rulesets.RULE_SETS
+    assert len(rulesets.RULE_ERRORS) == 2
+    assert any("broken.json" in e for e in rulesets.RULE_ERRORS)
+    assert any("typo.json" in e and "'Meta Titel' is not a catalog column" in e for e in rulesets.RULE_ERRORS)
+    # the builtin set and its output are unaffected
+    df, _ = read_erp(sample_path("catalog"), "catalog")
+    assert rulesets.get_rule_set(rulesets.BUILTIN)["source"] == rulesets.BUILTIN_RULES_FILE
+    assert "| CKC" not in convert(df, "catalog")
+
+def test_bad_builtin_file_raises(tmp_path):
+    bad = tmp_path / "builtin.json"
+    bad.write_text(json.dumps({"columns": {"SKU Code": {"derived": "no_such_function"}}}))
+    try:
+        with pytest.raises(ValueError, match="unknown derived function 'no_such_function'"):
+            rulesets.register_builtin(CATALOG_HEADERS, CATALOG_FUNCTIONS, str(bad))
+    finally:
+        rulesets.register_builtin(CATALOG_HEADERS, CATALOG_FUNCTIONS)
@@ -0,0 +1,42 @@
+import csv
+
+import pytest
+
+from transformers import templates
+from transformers.templates import get_template, template_notes, template_versions
+
+@pytest.fixture
+def template_dir(tmp_path, monkeypatch):
+    # what CKC_TEMPLATE_DIR does
+    monkeypatch.setattr(templates, "TEMPLATE_DIR", str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    templates.load_templates(force=True)
+
+def write_template(path, headers, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(headers)
+        writer.writerows([[row.get(h, "") for h in headers] for row in rows])
+
+def test_disk_templates_are_checked_and_noted(template_dir):
+    price, catalog = get_template("price"), get_template("catalog")
+    # version "disk": the builtin catalog block with one changed metadata cell and a sample product
+    rows = [dict(r) for r in catalog["rows"]] + [{"SKU Code": "CKC_0000000001"}]
+    rows[1]["Product Name"] = "Name of the product"
+    write_template(template_dir / catalog["filename"], catalog["headers"], rows)
+    # version "v2": price headers out of order, so it is rejected
+    write_template(template_dir / "v2" / price["filename"], price["headers"][::-1], price["rows"])
+    templates.load_templates(force=True)
+
+    assert template_versions("catalog") == ["builtin", "disk"]
+    assert template_versions("price") == ["builtin"]
+    assert len(templates.TEMPLATE_ERRORS) == 1
+    assert "v2" in templates.TEMPLATE_ERRORS[0] and "headers differ" in templates.TEMPLATE_ERRORS[0]
+    notes = template_notes("disk")
+    assert len(notes) == 2 and all(n.startswith(str(template_dir / catalog["filename"])) for n in notes)
+    assert any("1 of 4 metadata rows differ from builtin" in n for n in notes)
+    assert any("1 row(s) after the 4 metadata rows ignored" in n for n in notes)
+    assert get_template("catalog", "disk")["rows"][1]["Product Name"] == "Name of the product"
+    assert template_notes("builtin") == []
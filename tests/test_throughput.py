@@ -0,0 +1,56 @@
+import io
+import os
+import time
+from typing import Callable
+
+import pytest
+
+from benchmarks import synth
+from transformers.templates import write_output
+from transformers.workflows import get_workflow
+
+PERF_ROWS = 50_000
+REPEAT = 3
+# Minimum rows/s per workflow and stage, about a quarter of what one core of a
+# plain Linux box does (measured: price 135k/80k, stone 120k/110k, catalog
+# 80k/14k rows/s for transform/write). CKC_PERF_SCALE scales them for slower
+# or faster machines; 0 skips these tests.
+MIN_ROWS_PER_SEC = {
+    ("price", "transform"): 30_000, ("price", "write"): 20_000,
+    ("stone", "transform"): 30_000, ("stone", "write"): 25_000,
+    ("catalog", "transform"): 20_000, ("catalog", "write"): 3_500,
+}
+PERF_SCALE = float(os.environ.get("CKC_PERF_SCALE", "1"))
+
+pytestmark = [pytest.mark.perf,
+              pytest.mark.skipif(PERF_SCALE <= 0, reason="throughput checks disabled (CKC_PERF_SCALE=0)")]
+
+def best_seconds(fn: Callable) -> float:
+    fn()  # warm up (imports, barcode cache, compiled plans)
+    best = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def assert_throughput(key: str, stage: str, seconds: float) -> None:
+    rate = PERF_ROWS / seconds
+    minimum = MIN_ROWS_PER_SEC[(key, stage)] * PERF_SCALE
+    assert rate >= minimum, f"{key} {stage}: {rate:,.0f} rows/s, minimum {minimum:,.0f}"
+
+@pytest.fixture(scope="module", params=["price", "stone", "catalog"])
+def generated(request):
+    key = request.param
+    return key, synth.make(key, PERF_ROWS, seed=0)
+
+def test_transform_throughput(generated):
+    key, df = generated
+    transform = get_workflow(key)["transform"]
+    assert_throughput(key, "transform", best_seconds(lambda: transform(df, include_template=False)))
+
+def test_write_throughput(generated):
+    key, df = generated
+    data, _ = get_workflow(key)["transform"](df, include_template=False)
+    assert_throughput(key, "write", best_seconds(lambda: write_output(data, key, io.StringIO())))
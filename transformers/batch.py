@@ -0,0 +1,265 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import pandas as pd
+
+from .delta import commit_snapshot, delta_rows
+from .images import check_images, image_index
+from .ingest import COLUMNAR_FORMATS, columnar_copy, columnar_format, read_columns, read_erp, read_reference_skus
+from .merge import merge_sources
+from .profiling import Profiler, stage
+from .rulesets import BY_COLLECTION, RULE_ERRORS, rule_set_names
+from .templates import TEMPLATE_ERRORS, template_notes, template_versions, write_output
+from .validation import merge_errors
+from .workflows import (WORKFLOWS, dataset_index, detect_workflows, get_workflow, transform_options,
+                        workflow_label)
+from .streaming import DEFAULT_BATCH_SIZE, stream_transform
+
+# ---------------------------------------------------------------------
+# 1. Single-file conversion (runs inside a worker process)
+# ---------------------------------------------------------------------
+def output_paths(path: str, workflow: str, gz: bool = False) -> Dict[str, str]:
+    base, _ = os.path.splitext(path)
+    fname = get_workflow(workflow)["filename"]
+    return {"csv": f"{base}_{fname}" + (".gz" if gz else ""), "errors": f"{base}_{fname[:-4]}_errors.csv",
+            "removed": f"{base}_{fname[:-4]}_removed.csv", "manifest": f"{base}_ImageManifest.csv"}
+
+def convert_file(path: str, workflow: Optional[str] = None, stream: bool = False,
+                 delta_dir: Optional[str] = None, profile_log: Optional[str] = None,
+                 template_version: Optional[str] = None, gz: bool = False,
+                 columnar: Optional[str] = None, rules: Optional[str] = None,
+                 image_dir: Optional[str] = None,
+                 references: Optional[Dict[str, pd.Index]] = None) -> Dict:
+    """Converts one ERP workbook and writes the CSV + error report next to it.
+
+    With delta_dir only new/changed rows are written (plus a _removed.csv of
+    SKU keys gone since the last run) and the file's snapshot there is updated;
+    snapshots are kept per input file name so store files don't mix.
+    With profile_log, per-stage timings are appended there as JSON lines.
+    template_version picks the header/metadata block (default: builtin); with
+    gz the upload CSV is written gzip-compressed (.csv.gz). With columnar
+    ("parquet"/"arrow") a workbook is imported once into .columnar/ next to
+    it and later runs read only the needed columns from that file. rules
+    picks the catalog rule set (a rules/ file name or "by-collection").
+    With image_dir, catalog PDP Image slots keep only files that exist there
+    (scanned once per worker), missing primary images are reported and an
+    _ImageManifest.csv is written. references ({workflow key: SKU codes},
+    see ingest.read_reference_skus) adds the cross-file SKU checks.
+    """
+    t0 = time.perf_counter()
+    result = {"file": path, "workflow": workflow, "rows": 0, "errors": 0, "seconds": 0.0, "error": ""}
+    paths = {}
+    prof = Profiler(file=path)
+    try:
+        source = path
+        if columnar and not columnar_format(path):
+            with prof.activate(), stage("import"):
+                source = columnar_copy(path, columnar)
+        if stream and columnar_format(source):
+            raise ValueError("--stream reads .xlsx workbooks only")
+        if stream and image_dir:
+            raise ValueError("--images cannot be combined with --stream")
+        if workflow is None:
+            found = detect_workflows(read_columns(source))
+            if len(found) != 1:
+                raise ValueError(f"Cannot detect workflow (matches: {found or 'none'}); pass --workflow")
+            workflow = found[0]
+        wf = get_workflow(workflow)
+        result["workflow"] = workflow_label(workflow)
+        paths = output_paths(path, workflow, gz)
+        prof.context["workflow"] = wf["key"]
+        with prof.activate():
+            if stream:
+                with stage("stream"):
+                    n_rows, err_df = stream_transform(path, workflow, paths["csv"],
+                                                      template_version=template_version, rules=rules,
+                                                      references=references)
+            else:
+                with stage("read"):
+                    df, report = read_erp(source, workflow)
+                result["parse_seconds"] = round(report["open_seconds"] + report["sheets"][0]["seconds"], 3)
+                # data rows only; the template header block is prepended when writing
+                with stage("transform", len(df)):
+                    data, err_df = wf["transform"](df, include_template=False,
+                                                   index=dataset_index(workflow, references),
+                                                   **transform_options(workflow, rules))
+                if image_dir and wf["key"] == "catalog":
+                    with stage("images", len(data)):
+                        data, img_err, manifest = check_images(data, image_index(image_dir))
+                    err_df = merge_errors(err_df, img_err)
+                    manifest.to_csv(paths["manifest"], index=False)
+                    result["images"] = len(manifest)
+                full_data = data
+                if delta_dir:
+                    scope = os.path.splitext(os.path.basename(path))[0]
+                    with stage("delta", len(df)):
+                        data, removed, stats = delta_rows(full_data, workflow, delta_dir, scope=scope)
+                    pd.DataFrame({"key": removed}).to_csv(paths["removed"], index=False)
+                    result["removed"] = stats["removed"]
+                with stage("serialize", len(data)):
+                    write_output(data, wf["key"], paths["csv"], template_version)
+                if delta_dir:
+                    # the snapshot moves on only once the delta CSV is written
+                    commit_snapshot(full_data, workflow, delta_dir, scope)
+                n_rows = len(data)
+        err_df.to_csv(paths["errors"], index=False)
+        result.update(rows=n_rows, errors=len(err_df), csv=paths["csv"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        # don't leave a half-written CSV next to the input
+        if paths.get("csv") and os.path.exists(paths["csv"]):
+            os.remove(paths["csv"])
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    if profile_log:
+        prof.write_jsonl(profile_log)
+    return result
+
+# ---------------------------------------------------------------------
+# 2. Directory / file-list batch runner
+# ---------------------------------------------------------------------
+def collect_inputs(paths: List[str]) -> List[str]:
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(sorted(os.path.join(p, f) for f in os.listdir(p)
+                                if f.lower().endswith((".xlsx",) + tuple(COLUMNAR_FORMATS))
+                                and not f.startswith("~$")))
+        else:
+            files.append(p)
+    return files
+
+def run_batch(files: List[str], workflow: Optional[str] = None, jobs: Optional[int] = None,
+              stream: bool = False, delta_dir: Optional[str] = None,
+              profile_log: Optional[str] = None, template_version: Optional[str] = None,
+              gz: bool = False, columnar: Optional[str] = None,
+              rules: Optional[str] = None, image_dir: Optional[str] = None,
+              references: Optional[Dict[str, pd.Index]] = None) -> List[Dict]:
+    """Converts files in a process pool, one file per worker task."""
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(convert_file, f, workflow, stream, delta_dir, profile_log, template_version,
+                               gz, columnar, rules, image_dir, references) for f in files]
+        for fut in as_completed(futures):
+            res = fut.result()
+            _print_result(res)
+            results.append(res)
+    return results
+
+def merge_files(files: List[str], out: str, workflow: Optional[str] = None,
+                sheets: Optional[List[str]] = None, stream: bool = False,
+                template_version: Optional[str] = None, rules: Optional[str] = None,
+                references: Optional[Dict[str, pd.Index]] = None) -> Dict:
+    """Converts every sheet (or the named sheets) of files as one dataset into the CSV at out.
+
+    Errors go to <out>_errors.csv with the file and sheet of each row; with
+    stream the sheets are read in row batches instead of one sheet at a time.
+    """
+    t0 = time.perf_counter()
+    result = {"file": out, "workflow": workflow, "rows": 0, "errors": 0, "seconds": 0.0, "error": ""}
+    try:
+        if workflow is None:
+            found = detect_workflows(read_columns(files[0]))
+            if len(found) != 1:
+                raise ValueError(f"Cannot detect workflow (matches: {found or 'none'}); pass --workflow")
+            workflow = found[0]
+        result["workflow"] = workflow_label(workflow)
+        n_rows, err_df, report = merge_sources(files, workflow, out, sheets,
+                                               DEFAULT_BATCH_SIZE if stream else None,
+                                               template_version, rules=rules, references=references)
+        base = out[:-3] if out.endswith(".gz") else out
+        err_df.to_csv(os.path.splitext(base)[0] + "_errors.csv", index=False)
+        result.update(rows=n_rows, errors=len(err_df), csv=out, sheets=report)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        if os.path.exists(out):
+            os.remove(out)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+def _print_result(res: Dict) -> None:
+    if res["error"]:
+        print(f"FAIL  {res['file']}  ({res['seconds']:.2f}s)  {res['error']}", flush=True)
+    else:
+        parse = f" (parse {res['parse_seconds']:.2f}s)" if "parse_seconds" in res else ""
+        removed = f"  removed={res['removed']}" if "removed" in res else ""
+        removed += f"  images={res['images']}" if "images" in res else ""
+        print(f"OK    {res['file']}  [{res['workflow']}]  rows={res['rows']}{removed}  "
+              f"issues={res['errors']}  {res['seconds']:.2f}s{parse}", flush=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m transformers",
+        description="Convert ERP .xlsx workbooks to upload-ready CSVs in parallel.")
+    parser.add_argument("inputs", nargs="+",
+                        help=".xlsx (or imported .parquet/.arrow) files or directories containing them")
+    parser.add_argument("-w", "--workflow", choices=list(WORKFLOWS) + [wf["key"] for wf in WORKFLOWS.values()],
+                        help="workflow to run (default: detect from the columns of each file)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--stream", action="store_true", help="read and write in row batches (bounded memory)")
+    parser.add_argument("--delta", metavar="SNAPSHOT_DIR",
+                        help="write only rows changed since the snapshot in SNAPSHOT_DIR, then update it")
+    parser.add_argument("--profile", metavar="LOG",
+                        help="append per-stage timings (JSON lines) for every file to LOG")
+    parser.add_argument("--template", metavar="VERSION", choices=template_versions(),
+                        help="template version for the header block (default: CKC_TEMPLATE_VERSION or builtin)")
+    parser.add_argument("--gzip", action="store_true", help="write the upload CSVs gzip-compressed (.csv.gz)")
+    parser.add_argument("--columnar", choices=["parquet", "arrow"],
+                        help="import each workbook once to .columnar/<name>.<fmt> and read column subsets from it")
+    parser.add_argument("--rules", metavar="NAME", choices=rule_set_names() + [BY_COLLECTION],
+                        help="catalog rule set from rules/, or by-collection to pick one per row "
+                             "(default: CKC_CATALOG_RULES or builtin)")
+    parser.add_argument("--images", metavar="DIR",
+                        help="keep only catalog PDP images that exist under DIR; report missing primary "
+                             "images and write <name>_ImageManifest.csv")
+    parser.add_argument("--merge", metavar="OUT",
+                        help="treat all inputs as one dataset: convert every sheet of every file into the "
+                             "single CSV OUT (errors name the file and sheet of each row)")
+    parser.add_argument("--reference", metavar="FILE", action="append",
+                        help="catalog/price export whose SKUs stone and price rows must exist in "
+                             "(repeatable; missing SKUs go to the error report)")
+    parser.add_argument("--sheets", metavar="NAMES",
+                        help="with --merge: comma-separated sheet names to read from each file (default: all)")
+    args = parser.parse_args(argv)
+    for problem in RULE_ERRORS:
+        print(f"Rule file skipped: {problem}", file=sys.stderr)
+    for problem in TEMPLATE_ERRORS:
+        print(f"Template skipped: {problem}", file=sys.stderr)
+    for note in template_notes(args.template):
+        print(f"Template note: {note}", file=sys.stderr)
+    if args.delta and args.stream:
+        parser.error("--delta cannot be combined with --stream")
+    if args.images and args.stream:
+        parser.error("--images cannot be combined with --stream")
+    if args.sheets and not args.merge:
+        parser.error("--sheets needs --merge")
+    if args.merge and (args.delta or args.images or args.columnar):
+        parser.error("--merge cannot be combined with --delta, --images or --columnar")
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        parser.error("no .xlsx/.parquet/.arrow inputs found")
+    try:
+        # read once here; every worker checks against the same SKU sets
+        references = read_reference_skus(args.reference) if args.reference else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    t0 = time.perf_counter()
+    if args.merge:
+        sheets = [s.strip() for s in args.sheets.split(",")] if args.sheets else None
+        out = args.merge + (".gz" if args.gzip and not args.merge.endswith(".gz") else "")
+        res = merge_files(files, out, args.workflow, sheets, args.stream, args.template, args.rules,
+                          references)
+        for entry in res.get("sheets", []):
+            print(f"      {entry['file']} / {entry['sheet']}: {entry['rows']} rows, {entry['status']}")
+        _print_result(res)
+        return 1 if res["error"] else 0
+    results = run_batch(files, args.workflow, args.jobs, args.stream, args.delta, args.profile, args.template,
+                        args.gzip, args.columnar, args.rules, args.images, references)
+    failed = sum(1 for r in results if r["error"])
+    total_rows = sum(r["rows"] for r in results)
+    print(f"{len(results) - failed}/{len(results)} files converted, {total_rows} rows, "
+          f"{time.perf_counter() - t0:.2f}s total")
+    return 1 if failed else 0
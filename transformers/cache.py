@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import pandas as pd
+
+from .ingest import pin_text_columns
+from .rulesets import rules_fingerprint
+from .templates import get_template
+from .workflows import get_workflow
+
+# Bump when output semantics change in a way the code fingerprint cannot see
+TRANSFORMER_VERSION = "3"
+
+_PKG_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ---------------------------------------------------------------------
+# 1. Keys
+# ---------------------------------------------------------------------
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _code_fingerprint() -> str:
+    # Any edit to the transformers package invalidates cached results
+    h = hashlib.sha256(TRANSFORMER_VERSION.encode())
+    for name in sorted(os.listdir(_PKG_DIR)):
+        if name.endswith(".py"):
+            with open(os.path.join(_PKG_DIR, name), "rb") as fh:
+                h.update(name.encode() + fh.read())
+    return h.hexdigest()[:16]
+
+CODE_FINGERPRINT = _code_fingerprint()
+
+def workflow_fingerprint(workflow: str, rules: Optional[str] = None) -> str:
+    """Code fingerprint + the active template version's headers and metadata rows
+    (+ the catalog rule set's rules)."""
+    wf = get_workflow(workflow)
+    tpl = get_template(wf["key"])
+    parts = [CODE_FINGERPRINT, tpl["version"], tpl["headers"], tpl["rows"]]
+    if wf["key"] == "catalog":
+        parts.append(rules_fingerprint(rules))
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+# ---------------------------------------------------------------------
+# 2. Parquet spill helpers
+# ---------------------------------------------------------------------
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# ---------------------------------------------------------------------
+# 3. LRU result cache
+# ---------------------------------------------------------------------
+class ResultCache:
+    """In-memory LRU of DataFrame bundles, optionally spilled to Parquet on disk.
+
+    A bundle is a dict of name → DataFrame, e.g. {"input": df} for a parsed
+    workbook or {"out": out_df, "err": err_df} for a transform result. With a
+    spill_dir every bundle is also written to <spill_dir>/<key>/<name>.parquet
+    and read back on a memory miss, so results survive evictions and restarts.
+    Bundles that Parquet cannot hold are simply kept in memory only.
+    """
+
+    def __init__(self, max_entries: int = 16, spill_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir if spill_dir and _parquet_available() else None
+        self._mem: "OrderedDict[str, Dict[str, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, pd.DataFrame]]:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+        bundle = self._load(key)
+        with self._lock:
+            if bundle is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, bundle)
+        return bundle
+
+    def put(self, key: str, bundle: Dict[str, pd.DataFrame]) -> None:
+        with self._lock:
+            self._remember(key, bundle)
+        self._spill(key, bundle)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+
+    def _remember(self, key: str, bundle: Dict[str, pd.DataFrame]) -> None:
+        self._mem[key] = bundle
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _spill(self, key: str, bundle: Dict[str, pd.DataFrame]) -> None:
+        if not self.spill_dir:
+            return
+        path = os.path.join(self.spill_dir, key)
+        tmp = path + ".tmp"
+        try:
+            os.makedirs(tmp, exist_ok=True)
+            for name, df in bundle.items():
+                data = df if name == "input" else pin_text_columns(df)
+                data.to_parquet(os.path.join(tmp, f"{name}.parquet"), index=False)
+            os.replace(tmp, path)
+        except Exception:
+            # e.g. mixed-type input columns pyarrow can't store; memory copy still serves hits
+            for f in os.listdir(tmp) if os.path.isdir(tmp) else []:
+                os.remove(os.path.join(tmp, f))
+            if os.path.isdir(tmp):
+                os.rmdir(tmp)
+
+    def _load(self, key: str) -> Optional[Dict[str, pd.DataFrame]]:
+        if not self.spill_dir:
+            return None
+        path = os.path.join(self.spill_dir, key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            return {f[:-8]: pd.read_parquet(os.path.join(path, f))
+                    for f in os.listdir(path) if f.endswith(".parquet")}
+        except Exception:
+            return None
+
+    # -----------------------------------------------------------------
+    # Convenience wrappers used by the app and batch paths
+    # -----------------------------------------------------------------
+    def frame(self, digest: str, parse: Callable[[], pd.DataFrame], variant: str = "all") -> pd.DataFrame:
+        """Parsed input for a file digest; variant names the column subset that was read."""
+        key = f"{digest}-input-{variant}-{CODE_FINGERPRINT}"
+        bundle = self.get(key)
+        if bundle is None:
+            bundle = {"input": parse()}
+            self.put(key, bundle)
+        return bundle["input"]
+
+    def result(self, digest: str, workflow: str,
+               compute: Callable[[], Tuple[pd.DataFrame, pd.DataFrame]],
+               rules: Optional[str] = None, variant: str = "") -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(rows, err_df) for a file digest + workflow + transformer/template version
+        (+ catalog rule set, + variant: anything else the result depends on, e.g.
+        the digests of the reference files it was checked against).
+
+        Callers store the data rows without template rows (include_template=False)."""
+        key = f"{digest}-{get_workflow(workflow)['key']}-{workflow_fingerprint(workflow, rules)}"
+        if variant:
+            key += "-" + hashlib.sha256(variant.encode()).hexdigest()[:16]
+        bundle = self.get(key)
+        if bundle is None:
+            out_df, err_df = compute()
+            bundle = {"out": out_df, "err": err_df}
+            self.put(key, bundle)
+        return bundle["out"], bundle["err"]
@@ -1,6 +1,13 @@
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 import pandas as pd
-from .common import barcode_to_ecomm_sku, validate_catalog_input
+from .common import normalize_barcodes, validate_catalog_input
+from .integrity import DatasetIndex, integrity_errors
+from .profiling import stage
+from .rulesets import (BUILTIN, BY_COLLECTION, DEFAULT_RULES, collection_routing, compile_rule_set,
+                       plan_inputs, register_builtin, rule_set_names, text_constant)
+from .templates import meta_frame, register_template
+from .validation import merge_errors
 
 # ---------------------------------------------------------------------
 # 1. Catalog Template Headers
@@ -43,180 +50,157 @@ CATALOG_TEMPLATE_ROWS: List[Dict[str, str]] = [
     {h: "" for h in CATALOG_HEADERS},
 ]
 
+register_template("catalog", "CatalogUpload.csv", CATALOG_HEADERS, CATALOG_TEMPLATE_ROWS)
+
 # ---------------------------------------------------------------------
-# 3. ERP → Catalog Mapping
+# 3. Derived Columns
 # ---------------------------------------------------------------------
-ERP_TO_CATALOG_MAP: Dict[str, str] = {
-    "Entity Identifier": "Entity",
-    "SKU Code": "Bar Code",
-    "Product Name": "Article Description",
-    "Product Subtitle": "Article Description",
-    "Tax Applicable": "Tax Applicable",
-    "TaxOrHSN Code": "HSN Code",
-    "Article Description": "Article Description",
-    "Article Code": "Article Number",
-    "Article Type": "Article Type",
-    "Vendor": "Vendor",
-    "Product Net weight": "Net Metal Weight",
-    "Product Net weight Unit": "Net Metal Weight Units",
-    "Product Gross Weight": "Gross Item Weight",
-    "Product Gross Weight Unit": "Gross Item Weight Unit",
-    "Collection": "Collection",
-    "Purity": "Purity",
-    "Metal Type": "Metal Type",
-    "Metal Name": "Metal Name",
-    "Gender": "Gender Description",
-    "Parent Theme": "Parent Theme",
-    "Child Theme": "Child Theme",
-    "Segment": "Segment",
-    "Jewel Type": "Jewel Type",
-    "Polish Type": "Polish Type Description",
-    "Setting Type": "Setting Type Description",
-    "Bangle Sizes": "Bangle Size",
-    "Bangle Shape": "Bangle Shape",
-    "Hook Type": "Hook Type Description",
-    "Pieces": "Pieces",
-    "Pieces UOM": "UOM",
-    "Length": "Length"
+# Each derived function takes the validated input and a per-call context
+# dict (for values shared between columns) and returns a Series or scalar.
+
+def _barcodes(df: pd.DataFrame, ctx: Dict) -> pd.DataFrame:
+    """Normalized Bar Code (digits / sku / exact), computed once per call and shared."""
+    if "_barcodes" not in ctx:
+        # a width fixed for the whole dataset (streaming/merge) keeps image names equal across batches
+        ctx["_barcodes"] = normalize_barcodes(df["Bar Code"], ctx.get("barcode_width"))
+    return ctx["_barcodes"]
+
+def _sku_code(df: pd.DataFrame, ctx: Dict):
+    if "Bar Code" not in df.columns:
+        return ""
+    # invalid barcodes get a blank SKU; validation reports them
+    return _barcodes(df, ctx)["sku"]
+
+def _pdp_image(i: int) -> Callable[[pd.DataFrame, Dict], object]:
+    def derive(df: pd.DataFrame, ctx: Dict):
+        if "Bar Code" not in df.columns:
+            return ""
+        # exact zero-padded Bar Code (leading zeros kept); blank when unusable
+        exact = _barcodes(df, ctx)["exact"]
+        return (exact + f"_{i}.jpg").where(exact != "", "")
+    return derive
+
+def _metal_type(df: pd.DataFrame, ctx: Dict):
+    # Metal Type comes from the input Metal Name (falls back to a Metal Type column)
+    for src in ("Metal Name", "Metal Type"):
+        if src in df.columns:
+            return df[src]
+    return ""
+
+def _pieces(df: pd.DataFrame, ctx: Dict):
+    return df["Pieces"] if "Pieces" in df.columns else ""
+
+# ERP columns read by the derived functions above (used to limit what ingestion loads)
+CATALOG_DERIVED_INPUTS: List[str] = ["Bar Code", "Metal Name", "Metal Type", "Pieces"]
+
+# Named derived functions that rule files can refer to ({"derived": "sku_code"})
+CATALOG_FUNCTIONS: Dict[str, Callable[[pd.DataFrame, Dict], object]] = {
+    "sku_code": _sku_code,
+    **{f"pdp_image_{i}": _pdp_image(i) for i in range(1, 16)},
+    "metal_type": _metal_type,
+    "pieces": _pieces,
 }
 
 # ---------------------------------------------------------------------
-# 4. Transformer Function
+# 4. Column Plan
+# ---------------------------------------------------------------------
+# the column rules themselves (source / const / template / derived) are in rules/builtin.json
+register_builtin(CATALOG_HEADERS, CATALOG_FUNCTIONS)
+
+def compile_catalog_plan(rules: Optional[str] = None) -> List[Tuple[str, str, object]]:
+    """Resolves every output header to exactly one (header, kind, arg) step.
+
+    kind is "derived" (arg = function), "const" (arg = value) or "source"
+    (arg = ERP column), for the builtin or a named rule set.
+    """
+    return compile_rule_set(rules or BUILTIN)
+
+CATALOG_PLAN = compile_catalog_plan()
+
+def catalog_inputs() -> List[str]:
+    """ERP columns any loaded rule set reads (used to limit what ingestion loads)."""
+    cols = [c for name in rule_set_names() for c in plan_inputs(compile_rule_set(name))]
+    return list(dict.fromkeys(cols + CATALOG_DERIVED_INPUTS))
+
+def _column_values(value, index: pd.Index):
+    # Series → labelled with the output index by position (no alignment); scalars broadcast in the
+    # DataFrame constructor. A Series keeps its dtype: a bare object array would be re-inferred
+    # (all-datetime batches as datetime64, printed differently from the same rows in a mixed column).
+    if isinstance(value, pd.Series):
+        return value if value.index is index else value.set_axis(index)
+    return value
+
+def _step_values(df: pd.DataFrame, ctx: Dict, kind: str, arg):
+    if kind == "source":
+        return _column_values(df[arg], df.index) if arg in df.columns else ""
+    if kind == "const":
+        return _column_values(text_constant(arg, df.index), df.index)
+    return _column_values(arg(df, ctx), df.index)
+
+def build_catalog_rows(df: pd.DataFrame, plan: List[Tuple[str, str, object]] = None,
+                       barcode_width: Optional[int] = None) -> pd.DataFrame:
+    """Builds the catalog data rows in one pass: every column is computed once
+    into a dict and turned into a single DataFrame (no per-column inserts)."""
+    plan = CATALOG_PLAN if plan is None else plan
+    ctx: Dict = {"barcode_width": barcode_width}
+    cols = {col: _step_values(df, ctx, kind, arg) for col, kind, arg in plan}
+    return pd.DataFrame(cols, index=df.index, columns=[c for c, _, _ in plan])
+
+def build_routed_rows(df: pd.DataFrame, plans: List[List[Tuple[str, str, object]]],
+                      choice: np.ndarray, barcode_width: Optional[int] = None) -> pd.DataFrame:
+    """Catalog rows where row i follows plans[choice[i]], in one pass over df.
+
+    Columns on which all plans agree are computed once; the others are
+    computed once per distinct step over the whole frame and picked per row.
+    """
+    if len(plans) == 1:
+        return build_catalog_rows(df, plans[0], barcode_width)
+    ctx: Dict = {"barcode_width": barcode_width}
+    cols: Dict[str, object] = {}
+    masks = [choice == j for j in range(len(plans))]
+    for steps in zip(*plans):
+        distinct = list(dict.fromkeys((kind, arg) for _, kind, arg in steps))
+        if len(distinct) == 1:
+            cols[steps[0][0]] = _step_values(df, ctx, *distinct[0])
+            continue
+        values = {step: _step_values(df, ctx, *step) for step in distinct}
+        out = np.empty(len(df), dtype=object)
+        for mask, (_, kind, arg) in zip(masks, steps):
+            v = values[(kind, arg)]
+            out[mask] = np.asarray(v, dtype=object)[mask] if np.ndim(v) else v
+        cols[steps[0][0]] = out
+    return pd.DataFrame(cols, index=df.index, columns=[c for c, _, _ in plans[0]])
+
+# ---------------------------------------------------------------------
+# 5. Transformer Function
 # ---------------------------------------------------------------------
-def transform_catalog(input_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Transforms ERP catalog input to upload-ready catalog format with defaults, images & highlights."""
-    df, err = validate_catalog_input(input_df.copy())
-
-    # Base setup
-    out = pd.DataFrame(columns=CATALOG_HEADERS)
-    meta = pd.DataFrame(CATALOG_TEMPLATE_ROWS)
-    out = pd.concat([meta, out], ignore_index=True)
-
-    # Map ERP fields
-    mapped = pd.DataFrame(columns=CATALOG_HEADERS)
-    for col in CATALOG_HEADERS:
-        if col in ERP_TO_CATALOG_MAP:
-            src = ERP_TO_CATALOG_MAP[col]
-            mapped[col] = df[src] if src in df.columns else ""
+def transform_catalog(input_df: pd.DataFrame, include_template: bool = True,
+                      index: Optional[DatasetIndex] = None,
+                      rules: Optional[str] = None,
+                      barcode_width: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Transforms ERP catalog input to upload-ready catalog format with defaults, images & highlights.
+
+    With include_template=False only the data rows are returned (no 4 metadata rows),
+    which is what the streaming writer uses for every batch. rules names the
+    rule set (default CKC_CATALOG_RULES / builtin); "by-collection" picks one
+    per row from its Collection. barcode_width fixes the image-name zero
+    padding when input_df is one batch of a larger dataset.
+    """
+    n = len(input_df)
+    # the builder only reads from the input, so no defensive copy is needed
+    with stage("catalog.validate", n):
+        df, err = validate_catalog_input(input_df)
+        # duplicate / colliding SKUs (index carries keys across streaming batches)
+        err = merge_errors(err, integrity_errors(df, "catalog", index))
+    with stage("catalog.build", n):
+        rules = rules or DEFAULT_RULES
+        if rules == BY_COLLECTION:
+            names, choice = collection_routing(df)
+            mapped = build_routed_rows(df, [compile_rule_set(name) for name in names], choice, barcode_width)
         else:
-            mapped[col] = ""
-
-    # -----------------------------------------------------------------
-    # Field-level Overrides and Custom Logic
-    # -----------------------------------------------------------------
-
-    # (1) Brand Code constant
-    if "Brand Code" in mapped.columns:
-        mapped["Brand Code"] = "CKC"
-
-    # (2) Is Price on Request empty
-    if "Is Price on Request" in mapped.columns:
-        mapped["Is Price on Request"] = ""
-
-    # (3) Length direct mapping (already mapped; keep explicit)
-    if "Length" in df.columns:
-        mapped["Length"] = df["Length"]
-
-    # (4) SKU exact — preserve all digits, including leading zeros (for images)
-    #     We keep SKU Code via barcode_to_ecomm_sku for the template,
-    #     but image names must reflect the original Bar Code with leading zeros.
-    if "SKU Code" in mapped.columns and "Bar Code" in df.columns:
-        mapped["SKU Code"] = df["Bar Code"].apply(barcode_to_ecomm_sku)
-
-    # Create a zero-padded, exact Bar Code string for image naming
-    if "Bar Code" in df.columns:
-        # Convert to string, strip, drop any trailing .0 (from floaty CSV reads)
-        raw_bar = df["Bar Code"].astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
-        # Determine target length: longest seen, minimum 10
-        target_len = max(10, int(raw_bar.str.len().max() or 0))
-        mapped["_sku_exact"] = raw_bar.str.zfill(target_len)
-    else:
-        mapped["_sku_exact"] = ""
-
-    # PDP image placeholders using exact zero-padded SKU
-    for i in range(1, 16):
-        col = f"PDP Image {i}"
-        if col in mapped.columns:
-            mapped[col] = mapped["_sku_exact"] + f"_{i}.jpg"
-
-    # (5) PLP preview images blank
-    for i in range(1, 4):
-        col = f"PLP Preview Image {i} "
-        if col in mapped.columns:
-            mapped[col] = ""
-
-    # -----------------------------------------------------------------
-    # Default Field Values
-    # -----------------------------------------------------------------
-    defaults = {
-        "Tags Keyword": "gold ring, Rhodolite Garnet ring, diamond gold ring, elegant gemstone ring, luxury jewelry, garnet diamond ring, statement gold ring, precious gemstone jewelry, garnet and diamond ring, timeless gold ring",
-        "Meta Keyword": "gold ring, Rhodolite Garnet ring, diamond gold ring, elegant gemstone ring, luxury jewelry, garnet diamond ring, statement gold ring, precious gemstone jewelry, garnet and diamond ring, timeless gold ring",
-        "Location Group": "India,America,Oceania,Asia",
-        "Is Active(Y/N)": "Yes",
-        "Is Publish(Y/N)": "Yes",
-        "Is customizable? (Y/N)": "Yes",
-        "Is 'New Arrival'": "Yes",
-        "Is Try at Store": "Yes",
-        "Is Try at Home": "Yes",
-        "Is Free Shipping?": "Yes",
-        "Product Net weight Unit": "Gms",
-        "Product Gross Weight Unit": "Gms",
-        "Min Quantity allowed in shopping cart": 1,
-        "Max Quantity allowed in shopping cart": 1,
-        "Delivery Type": "STANDARD",
-        "Store Code": "S102",
-        "Is Gift Wrap": "Yes",
-        "Is inscription": "Yes",
-        "Is Pick Up at store": "Yes",
-        "Is EMI available": "No",
-        "Is 'Trendy Fashion'": "Yes",
-        "Is Returnable": "Yes",
-        "Is Cancellable": "Yes"
-    }
-    for k, v in defaults.items():
-        if k in mapped.columns:
-            mapped[k] = v
-
-    # (6) HighJewellery Flag empty
-    if "HighJewellery Flag " in mapped.columns:
-        mapped["HighJewellery Flag "] = ""
-
-    # (7) Metal Type from Metal Name (input)
-    if "Metal Type" in mapped.columns and "Metal Name" in df.columns:
-        mapped["Metal Type"] = df["Metal Name"]
-
-    # (8) Metal Name cleared
-    if "Metal Name" in mapped.columns:
-        mapped["Metal Name"] = ""
-
-    # (9) pieces from input Pieces
-    if "pieces" in mapped.columns and "Pieces" in df.columns:
-        mapped["pieces"] = df["Pieces"]
-
-    # NEW: Bangle Sizes must be blank regardless of input
-    if "Bangle Sizes" in mapped.columns:
-        mapped["Bangle Sizes"] = ""
-
-    # -----------------------------------------------------------------
-    # Product Highlights (based on Metal Name)
-    # -----------------------------------------------------------------
-    highlight_template = (
-        "This product is made in {metal} gold verified by BIS hallmark, "
-        "Product dimensions mentioned are on approximation closest to the actual size. "
-        "The bill is your certificate, please produce the bill for future transactions "
-        "on all jewellery, silverware, giftware you purchase. "
-        "Diamond solitaires over quarter carat and certain rare gems may additionally "
-        "have an external laboratory certificate."
-    )
-
-    if "Product Highlights" in mapped.columns:
-        mapped["Product Highlights"] = df.get("Metal Name", "").fillna("").apply(
-            lambda m: highlight_template.format(metal=str(m).strip()) if str(m).strip() else ""
-        )
-
-    # -----------------------------------------------------------------
-    # Final Cleanup and Combine
-    # -----------------------------------------------------------------
-    mapped = mapped.drop(columns=["_sku_exact"], errors="ignore")
-    final = pd.concat([out, mapped], ignore_index=True)
+            mapped = build_catalog_rows(df, compile_rule_set(rules), barcode_width)
+    if not include_template:
+        return mapped, err
+    with stage("catalog.assemble", n):
+        final = pd.concat([meta_frame("catalog"), mapped], ignore_index=True)
     return final, err
@@ -1,51 +1,116 @@
 
-from typing import List, Dict, Tuple
-import pandas as pd
+from typing import List, Dict, Optional, Tuple
 import re
+import threading
+import numpy as np
+import pandas as pd
+from .validation import register_rules, validate
 
 def barcode_to_ecomm_sku(barcode: str) -> str:
-    digits = ''.join(ch for ch in str(barcode) if ch.isdigit())
+    # drop a trailing .0 from float reads first, as normalize_barcodes does
+    digits = ''.join(ch for ch in re.sub(r"\.0+$", "", str(barcode).strip()) if ch.isdigit())
     return f"CKC_00{int(digits):08d}"
 
+# ---------------------------------------------------------------------
+# Vectorized barcode normalization
+# ---------------------------------------------------------------------
+# Cross-call cache: normalized barcode text -> digits / sku. Kept as a Series
+# pair so lookups are one vectorized reindex; reset when it grows too large.
+_BARCODE_CACHE = pd.DataFrame({'digits': pd.Series(dtype=object), 'sku': pd.Series(dtype=object)})
+_BARCODE_CACHE_MAX = 1_000_000
+# lookups read whichever cache frame is current; updates (which replace it) are serialized
+_BARCODE_LOCK = threading.Lock()
+
+def _lookup_barcodes(text: pd.Series) -> pd.DataFrame:
+    global _BARCODE_CACHE
+    found = _BARCODE_CACHE.reindex(text.to_numpy())
+    miss = found['digits'].isna().to_numpy()
+    if miss.any():
+        t = pd.Series(text.to_numpy()[miss], dtype=object)
+        digits = t.str.replace(r"\D", "", regex=True)
+        sku = ("CKC_00" + digits.str.lstrip("0").str.zfill(8)).where(digits != "", "")
+        new = pd.DataFrame({'digits': digits.to_numpy(), 'sku': sku.to_numpy()}, index=t.to_numpy())
+        found.iloc[miss] = new.to_numpy()
+        new = new[~new.index.duplicated()]
+        with _BARCODE_LOCK:
+            if len(_BARCODE_CACHE) + len(new) > _BARCODE_CACHE_MAX:
+                _BARCODE_CACHE = new
+            else:
+                # workflows running in parallel may have added some of these since the lookup
+                new = new[~new.index.isin(_BARCODE_CACHE.index)]
+                _BARCODE_CACHE = pd.concat([_BARCODE_CACHE, new])
+    return found
+
+def _barcode_text(uniques) -> pd.Series:
+    # the text each barcode is normalized from: stripped, float-read trailing .0 dropped
+    return (pd.Series(uniques, dtype=object).astype(str).str.strip()
+            .str.replace(r"\.0+$", "", regex=True))
+
+def barcode_width(barcodes: pd.Series) -> int:
+    """Zero-pad width for exact codes (image names): max(10, longest barcode text).
+
+    It depends on every barcode in the dataset, so callers that see the data
+    in pieces (streaming, merge) compute it over all pieces first and pass it
+    to normalize_barcodes.
+    """
+    text = _barcode_text(pd.unique(barcodes.dropna()))
+    return max(10, int(text.str.len().max() or 0)) if len(text) else 10
+
+def normalize_barcodes(barcodes: pd.Series, width: Optional[int] = None) -> pd.DataFrame:
+    """Normalizes a Bar Code column in one vectorized pass.
+
+    Returns a frame aligned to barcodes with:
+      digits — digit-only string (after dropping a float-read trailing .0)
+      sku    — CKC_00 + at-least-8-digit code, "" when there are no digits
+      exact  — the code zero-padded to width (default barcode_width of this
+               column) for image names
+      valid  — False for missing barcodes or ones without any digit
+    Work is done once per distinct value; repeated barcodes across calls are
+    served from a module-level cache.
+    """
+    codes, uniques = pd.factorize(barcodes)
+    text = _barcode_text(uniques)
+    norm = _lookup_barcodes(text)
+    if width is not None:
+        target_len = width
+    else:
+        target_len = max(10, int(text.str.len().max() or 0)) if len(text) else 10
+    exact = text.str.zfill(target_len).where(norm['digits'].to_numpy() != "", "")
+
+    # code -1 (missing) → an extra blank slot at the end of each lookup array
+    take = np.where(codes < 0, len(text), codes)
+    cols = {name: np.append(values.to_numpy(dtype=object), "")[take]
+            for name, values in (('digits', norm['digits']), ('sku', norm['sku']), ('exact', exact))}
+    out = pd.DataFrame(cols, index=barcodes.index)
+    out['valid'] = out['digits'] != ""
+    return out
+
+PRICE_REQUIRED: List[str] = ['Bar Code','Diamond Cost','Stone Cost','Making','Wastage',
+                            'Accessories Cost','Metal Cost','GST','Selling Price w/o Promotion','Selling Price with Promotion']
+STONE_REQUIRED: List[str] = ['Main Batch Number','Stone Batch Number','Article Type','Article Code','Article Description',
+                            'Stone  No. of Pieces','Stone Origin','Stone Appearance','Stone Shape','Stone Weight',
+                            'Stone Units','Stone Cut','Stone Clarity','Stone Color','Stone Amount']
+
+# Declarative validation rules per workflow (see validation.py for the checks)
+register_rules('price', [
+    {'field': 'Bar Code', 'check': 'barcode8', 'issue': 'Bar Code should resolve to 8 digits'},
+])
+register_rules('stone', [
+    {'field': f, 'check': 'numeric', 'issue': 'Should be numeric'}
+    for f in ['Stone  No. of Pieces','Stone Weight','Stone Amount']
+])
+register_rules('catalog', [
+    {'field': 'Bar Code', 'check': 'missing', 'issue': 'Missing', 'optional': True},
+    {'field': 'Bar Code', 'check': 'no_digits', 'issue': 'Bar Code has no digits', 'optional': True},
+    {'field': 'Net Metal Weight', 'check': 'numeric', 'issue': 'Should be numeric', 'optional': True},
+    {'field': 'Gross Item Weight', 'check': 'numeric', 'issue': 'Should be numeric', 'optional': True},
+])
+
 def validate_price_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    required = ['Bar Code','Diamond Cost','Stone Cost','Making','Wastage',
-                'Accessories Cost','Metal Cost','GST','Selling Price w/o Promotion','Selling Price with Promotion']
-    missing_cols = [c for c in required if c not in df.columns]
-    if missing_cols:
-        raise ValueError(f"Missing required columns: {missing_cols}")
-    errors = []
-    for idx, row in df.iterrows():
-        bc = str(row['Bar Code'])
-        if not re.fullmatch(r"\d{8}", ''.join(ch for ch in bc if ch.isdigit())[-8:]):
-            errors.append({'row': idx, 'field': 'Bar Code', 'issue': 'Bar Code should resolve to 8 digits'})
-    err_df = pd.DataFrame(errors) if errors else pd.DataFrame(columns=['row','field','issue'])
-    return df, err_df
+    return validate(df, 'price', PRICE_REQUIRED)
 
 def validate_stone_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    required = ['Main Batch Number','Stone Batch Number','Article Type','Article Code','Article Description',
-                'Stone  No. of Pieces','Stone Origin','Stone Appearance','Stone Shape','Stone Weight',
-                'Stone Units','Stone Cut','Stone Clarity','Stone Color','Stone Amount']
-    missing_cols = [c for c in required if c not in df.columns]
-    if missing_cols:
-        raise ValueError(f"Missing required columns: {missing_cols}")
-    errors = []
-    for idx, row in df.iterrows():
-        for f in ['Stone  No. of Pieces','Stone Weight','Stone Amount']:
-            val = row[f]
-            try:
-                float(str(val).replace(',',''))
-            except Exception:
-                errors.append({'row': idx, 'field': f, 'issue': 'Should be numeric'})
-    err_df = pd.DataFrame(errors) if errors else pd.DataFrame(columns=['row','field','issue'])
-    return df, err_df
+    return validate(df, 'stone', STONE_REQUIRED)
 
 def validate_catalog_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    # Minimal checks; we will add specific checks as needed
-    errors = []
-    # Example: Bar Code presence if exists
-    if 'Bar Code' in df.columns:
-        for idx, bc in enumerate(df['Bar Code']):
-            if pd.isna(bc): 
-                errors.append({'row': idx, 'field': 'Bar Code', 'issue': 'Missing'})
-    err_df = pd.DataFrame(errors) if errors else pd.DataFrame(columns=['row','field','issue'])
-    return df, err_df
+    return validate(df, 'catalog')
@@ -0,0 +1,102 @@
+import os
+from typing import Dict, List, Tuple
+import pandas as pd
+
+from .workflows import get_workflow
+
+# Output columns that identify a row per workflow (the derived SKU code)
+DELTA_KEYS: Dict[str, List[str]] = {
+    "price": ["CR_EcommSKUCode"],
+    "stone": ["SKU_Code_Bar_Code", "Stone Number"],
+    "catalog": ["SKU Code"],
+}
+
+# ---------------------------------------------------------------------
+# 1. Row keys and hashes
+# ---------------------------------------------------------------------
+def row_keys(data: pd.DataFrame, workflow: str) -> pd.Series:
+    cols = DELTA_KEYS[get_workflow(workflow)["key"]]
+    keys = data[cols[0]].fillna("").astype(str)
+    for c in cols[1:]:
+        keys = keys + "|" + data[c].fillna("").astype(str)
+    return keys
+
+def row_hashes(data: pd.DataFrame) -> pd.Series:
+    # Hash the text each cell is written as, so dtype drift between runs
+    # (int vs float vs object) doesn't mark unchanged rows as changed.
+    text = data.astype(object).where(data.notna(), "").astype(str)
+    return pd.util.hash_pandas_object(text, index=False)
+
+# ---------------------------------------------------------------------
+# 2. Snapshot store: one compact key → hash file per workflow
+# ---------------------------------------------------------------------
+def snapshot_path(snapshot_dir: str, workflow: str, scope: str = "") -> str:
+    # scope separates independent feeds (e.g. one per store file) sharing a directory
+    prefix = f"{scope}_" if scope else ""
+    return os.path.join(snapshot_dir, f"{prefix}{get_workflow(workflow)['key']}_snapshot.csv.gz")
+
+def load_snapshot(snapshot_dir: str, workflow: str, scope: str = "") -> pd.Series:
+    path = snapshot_path(snapshot_dir, workflow, scope)
+    if not os.path.exists(path):
+        return pd.Series(dtype="uint64")
+    snap = pd.read_csv(path, dtype={"key": str, "hash": "uint64"}, keep_default_na=False)
+    return pd.Series(snap["hash"].to_numpy(), index=snap["key"].to_numpy())
+
+def save_snapshot(snapshot_dir: str, workflow: str, snapshot: pd.Series, scope: str = "") -> str:
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = snapshot_path(snapshot_dir, workflow, scope)
+    tmp = path + ".tmp"
+    pd.DataFrame({"key": snapshot.index, "hash": snapshot.to_numpy()}).to_csv(
+        tmp, index=False, compression="gzip")
+    os.replace(tmp, path)
+    return path
+
+# ---------------------------------------------------------------------
+# 3. Delta computation
+# ---------------------------------------------------------------------
+def compute_delta(data: pd.DataFrame, workflow: str,
+                  previous: pd.Series) -> Tuple[pd.DataFrame, List[str], pd.Series]:
+    """Compares data rows against the previous snapshot.
+
+    Returns (new or changed rows, removed keys, snapshot of this run). Rows
+    with a blank key (e.g. invalid barcodes) cannot be tracked and are
+    always emitted. When a key repeats, its last row defines the snapshot.
+    """
+    keys = row_keys(data, workflow)
+    hashes = row_hashes(data)
+    # positional lookup keeps the uint64 hashes exact (reindex would go via float)
+    pos = previous.index.get_indexer(keys.to_numpy())
+    seen = pos >= 0
+    changed = ~seen | (keys == "").to_numpy()
+    changed[seen] |= previous.to_numpy()[pos[seen]] != hashes.to_numpy()[seen]
+
+    tracked = keys != ""
+    current = pd.Series(hashes[tracked].to_numpy(), index=keys[tracked].to_numpy())
+    current = current[~current.index.duplicated(keep="last")]
+    removed = previous.index.difference(current.index).tolist()
+    return data[changed], removed, current
+
+def delta_rows(data: pd.DataFrame, workflow: str, snapshot_dir: str,
+               update: bool = False, scope: str = "") -> Tuple[pd.DataFrame, List[str], Dict]:
+    """Data rows only (no template rows) → (changed rows, removed keys, stats).
+
+    The snapshot is only overwritten when update=True, i.e. once the delta has
+    actually been delivered (or later, with commit_snapshot); until then
+    repeated runs keep returning the same delta.
+    """
+    previous = load_snapshot(snapshot_dir, workflow, scope)
+    changed, removed, current = compute_delta(data, workflow, previous)
+    if update:
+        save_snapshot(snapshot_dir, workflow, current, scope)
+    stats = {"rows": len(data), "changed": len(changed), "removed": len(removed),
+             "first_run": previous.empty}
+    return changed, removed, stats
+
+def commit_snapshot(data: pd.DataFrame, workflow: str, snapshot_dir: str, scope: str = "") -> str:
+    """Records data rows (no template rows) as the last delivered state for workflow.
+
+    This is the confirm step of delta mode: call it with the full data rows
+    the delta was computed from once the delta has been uploaded.
+    """
+    _, _, current = compute_delta(data, workflow, pd.Series(dtype="uint64"))
+    return save_snapshot(snapshot_dir, workflow, current, scope)
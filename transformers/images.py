@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .validation import ERROR_COLUMNS, empty_errors
+
+IMAGE_EXTENSIONS: Tuple[str, ...] = (".jpg", ".jpeg", ".png", ".webp")
+PDP_COLUMNS: List[str] = [f"PDP Image {i}" for i in range(1, 16)]
+PRIMARY_COLUMN = PDP_COLUMNS[0]
+MANIFEST_FILENAME = "ImageManifest.csv"
+MANIFEST_COLUMNS: List[str] = ["SKU Code", "Slot", "File", "Path"]
+
+# ---------------------------------------------------------------------
+# 1. Directory scan
+# ---------------------------------------------------------------------
+def _scan_tree(path: str, rel: str) -> List[Tuple[str, str]]:
+    """(file name, path relative to the scan root) of every image below path."""
+    found = []
+    stack = [(path, rel)]
+    while stack:
+        current, prefix = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, prefix + entry.name + "/"))
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        found.append((entry.name, prefix + entry.name))
+        except (PermissionError, FileNotFoundError):
+            continue
+    return found
+
+_EXTENSION = r"\.(?:" + "|".join(e[1:] for e in IMAGE_EXTENSIONS) + r")$"
+
+def _stems(names: pd.Series) -> pd.Series:
+    # lowercased file names without their image extension ("X_1.JPG" → "x_1")
+    return names.str.lower().str.replace(_EXTENSION, "", regex=True)
+
+class ImageIndex:
+    """Image file names under a directory, looked up case-insensitively.
+
+    Built once per scan: names are lowercased and hashed into a pandas Index,
+    so looking up a whole column of file names is one vectorized get_indexer.
+    A name without an exact match falls back to a file with the same stem
+    and another image extension (X_1.jpg → X_1.png). When the same name
+    appears in several subdirectories the first one scanned (root, then
+    subdirectories in name order) wins.
+    """
+
+    def __init__(self, root: str, files: List[Tuple[str, str]], seconds: float = 0.0):
+        self.root = root
+        self.seconds = seconds
+        names = pd.Series([n for n, _ in files], dtype=object)
+        keep = ~names.str.lower().duplicated().to_numpy()
+        self.names = names.to_numpy(dtype=object)[keep]
+        self.paths = np.asarray([p for _, p in files], dtype=object)[keep]
+        self._index = pd.Index(names.str.lower()[keep].to_numpy(dtype=object))
+        stems = _stems(pd.Series(self.names, dtype=object))
+        first = ~stems.duplicated().to_numpy()
+        self._stems = pd.Index(stems[first].to_numpy(dtype=object))
+        self._stem_pos = np.flatnonzero(first)
+        self.scanned = time.time()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, names: pd.Series) -> np.ndarray:
+        """Position of each name in the index (exact name, else same stem), -1 where there is no such file."""
+        query = names.fillna("").astype(str)
+        pos = self._index.get_indexer(query.str.lower().to_numpy(dtype=object))
+        miss = np.flatnonzero((pos < 0) & (query != "").to_numpy())
+        if len(miss):
+            by_stem = self._stems.get_indexer(_stems(query.iloc[miss]).to_numpy(dtype=object))
+            pos[miss] = np.where(by_stem >= 0, self._stem_pos[np.maximum(by_stem, 0)], -1)
+        return pos
+
+def scan_images(root: str, max_workers: Optional[int] = None) -> ImageIndex:
+    """Scans root once with os.scandir; top-level subdirectories are walked in parallel."""
+    if not os.path.isdir(root):
+        raise ValueError(f"Image directory not found: {root}")
+    t0 = time.perf_counter()
+    files, subdirs = [], []
+    with os.scandir(root) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, entry.name + "/"))
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                files.append((entry.name, entry.name))
+    if subdirs:
+        # scandir releases the GIL, so threads overlap the directory reads
+        with ThreadPoolExecutor(max_workers=max_workers or min(32, len(subdirs))) as pool:
+            for found in pool.map(lambda d: _scan_tree(*d), subdirs):
+                files.extend(found)
+    return ImageIndex(root, files, time.perf_counter() - t0)
+
+_scans: Dict[str, ImageIndex] = {}
+_lock = threading.Lock()
+
+def image_index(root: str, refresh: bool = False) -> ImageIndex:
+    """scan_images, remembered per directory for this process until refresh=True."""
+    root = os.path.abspath(root)
+    with _lock:
+        if refresh or root not in _scans:
+            _scans[root] = scan_images(root)
+        return _scans[root]
+
+# ---------------------------------------------------------------------
+# 2. Catalog check and manifest
+# ---------------------------------------------------------------------
+def check_images(data: pd.DataFrame, index: ImageIndex) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Keeps only the PDP Image slots whose file exists under the image directory.
+
+    data are catalog data rows. Each slot holds the file name as found on
+    disk (any case and image extension, see ImageIndex), or "" when there is
+    no such file. Returns (data, errors, manifest): errors flag rows whose
+    primary image (PDP Image 1) is missing; the manifest lists every image
+    used (SKU Code, Slot, File, Path relative to the image directory).
+    """
+    cols = [c for c in PDP_COLUMNS if c in data.columns]
+    if not cols:
+        return data, empty_errors(), pd.DataFrame(columns=MANIFEST_COLUMNS)
+    updates, parts = {}, []
+    err = empty_errors()
+    sku = data["SKU Code"].to_numpy(dtype=object) if "SKU Code" in data.columns else np.full(len(data), "")
+    for col in cols:
+        wanted = data[col]
+        pos = index.lookup(wanted)
+        found = pos >= 0
+        updates[col] = pd.Series(np.where(found, index.names[np.maximum(pos, 0)], ""),
+                                 index=data.index, dtype=object)
+        if col == PRIMARY_COLUMN:
+            missing = np.flatnonzero(~found & (wanted.fillna("") != "").to_numpy())
+            if len(missing):
+                names = wanted.to_numpy(dtype=object)[missing]
+                err = pd.DataFrame({"row": data.index[missing], "field": col,
+                                    "issue": [f"Primary image {n} not found in the image directory" for n in names]},
+                                   columns=ERROR_COLUMNS)
+        rows = np.flatnonzero(found)
+        if len(rows):
+            parts.append(pd.DataFrame({"_row": rows, "SKU Code": sku[rows], "Slot": int(col.rsplit(" ", 1)[1]),
+                                       "File": index.names[pos[rows]], "Path": index.paths[pos[rows]]}))
+    manifest = (pd.concat(parts, ignore_index=True).sort_values(["_row", "Slot"], kind="stable")[MANIFEST_COLUMNS]
+                .reset_index(drop=True) if parts else pd.DataFrame(columns=MANIFEST_COLUMNS))
+    return data.assign(**updates), err, manifest
@@ -0,0 +1,243 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Union
+import pandas as pd
+
+from .catalog import catalog_inputs
+from .integrity import KEY_FIELDS, reference_skus
+from .validation import RULES
+from .workflows import detect_workflows, get_workflow
+
+# Identifier columns are read as text so barcodes keep leading zeros and never
+# come back as floats ("12345678.0").
+IDENTIFIER_COLUMNS: List[str] = ["Bar Code", "Main Batch Number", "Stone Batch Number"]
+
+# Columnar intermediates written by import_workbook (and accepted by read_erp)
+COLUMNAR_FORMATS: Dict[str, str] = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+# ---------------------------------------------------------------------
+# 1. Engine selection
+# ---------------------------------------------------------------------
+def available_engine() -> str:
+    """Fastest installed Excel engine: calamine (Rust) if present, else openpyxl."""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+# ---------------------------------------------------------------------
+# 2. Columns each workflow needs
+# ---------------------------------------------------------------------
+def required_columns(workflow: str) -> List[str]:
+    """ERP columns the workflow's validation and transform actually read."""
+    wf = get_workflow(workflow)
+    cols = list(wf["signature"])
+    cols += [r["field"] for r in RULES.get(wf["key"], [])]
+    if wf["key"] == "catalog":
+        cols += catalog_inputs()
+    return list(dict.fromkeys(cols))
+
+def column_dtypes(columns: Optional[List[str]] = None) -> Dict[str, type]:
+    return {c: str for c in IDENTIFIER_COLUMNS if columns is None or c in columns}
+
+# ---------------------------------------------------------------------
+# 3. Readers
+# ---------------------------------------------------------------------
+def read_workbook(source, workflow: Optional[str] = None,
+                  sheets: Union[None, str, int, List] = None,
+                  engine: Optional[str] = None) -> Tuple[Dict[str, pd.DataFrame], Dict]:
+    """Reads the selected sheets (default: first) with only the workflow's columns.
+
+    Returns ({sheet name: DataFrame}, report). The report holds the engine,
+    the workbook open time and per-sheet rows, columns and parse seconds.
+    Without a workflow every column is read (identifiers are still pinned).
+    """
+    engine = engine or available_engine()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    t0 = time.perf_counter()
+    try:
+        book = pd.ExcelFile(source, engine=engine)
+    except Exception:
+        if engine == "openpyxl":
+            raise
+        # e.g. an engine that can't open this file — fall back to openpyxl
+        engine = "openpyxl"
+        if hasattr(source, "seek"):
+            source.seek(0)
+        book = pd.ExcelFile(source, engine=engine)
+    report = {"engine": engine, "open_seconds": round(time.perf_counter() - t0, 4), "sheets": []}
+
+    if sheets is None:
+        names = book.sheet_names[:1]
+    elif sheets == "all":
+        names = book.sheet_names
+    elif isinstance(sheets, (str, int)):
+        names = [sheets]
+    else:
+        names = list(sheets)
+    names = [book.sheet_names[n] if isinstance(n, int) else n for n in names]
+
+    needed = set(required_columns(workflow)) if workflow else None
+    frames: Dict[str, pd.DataFrame] = {}
+    with book:
+        for name in names:
+            t0 = time.perf_counter()
+            df = book.parse(name,
+                            usecols=(lambda c: c in needed) if needed else None,
+                            dtype=column_dtypes())
+            frames[name] = df
+            report["sheets"].append({"sheet": name, "rows": len(df), "columns": df.shape[1],
+                                     "seconds": round(time.perf_counter() - t0, 4)})
+    return frames, report
+
+def read_erp(source, workflow: Optional[str] = None, sheet: Union[str, int] = 0,
+             engine: Optional[str] = None) -> Tuple[pd.DataFrame, Dict]:
+    """Single-sheet reader: .xlsx via read_workbook, .parquet/.arrow via read_columnar."""
+    if columnar_format(source):
+        return read_columnar(source, workflow)
+    frames, report = read_workbook(source, workflow, sheets=sheet, engine=engine)
+    return next(iter(frames.values())), report
+
+def read_columns(source, engine: Optional[str] = None) -> List[str]:
+    """Header row of the first sheet (for workflow detection)."""
+    fmt = columnar_format(source)
+    if fmt:
+        return _arrow_schema(source, fmt).names
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return list(pd.read_excel(source, nrows=0, engine=engine or available_engine()).columns)
+
+# ---------------------------------------------------------------------
+# 4. Columnar import (Parquet / Arrow IPC)
+# ---------------------------------------------------------------------
+# A workbook is parsed once and stored with pinned dtypes; later runs read
+# just the columns a workflow needs (Arrow IPC files are memory-mapped).
+
+def columnar_format(source) -> Optional[str]:
+    """"parquet" / "arrow" for a columnar path or upload (by file name), else None."""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return COLUMNAR_FORMATS.get(os.path.splitext(str(name))[1].lower())
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Columnar import needs pyarrow (pip install pyarrow)") from None
+
+def pin_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df that Arrow / Parquet can store (imports and the result cache's spill).
+
+    Object columns can mix numbers and text, which Arrow can't store in one
+    column, so they are kept as text: the same text the CSV writer prints
+    (numeric checks parse it back). Column names become strings.
+    """
+    out = df.copy()
+    for c in out.columns:
+        if out[c].dtype == object:
+            col = out[c]
+            out[c] = col.where(col.isna(), col.astype(str))
+    out.columns = [str(c) for c in out.columns]
+    return out
+
+def _arrow_schema(source, fmt: str):
+    _require_pyarrow()
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "parquet":
+        return pq.read_schema(source)
+    return ipc.open_file(source).schema
+
+def import_workbook(source, dest: str, sheet: Union[str, int] = 0,
+                    engine: Optional[str] = None) -> Dict:
+    """Parses one sheet of an ERP workbook (all columns) and writes it to dest.
+
+    dest ends in .parquet or .arrow/.feather (Arrow IPC, uncompressed so it
+    can be memory-mapped). Returns the read report plus the write time.
+    """
+    fmt = columnar_format(dest)
+    if fmt is None:
+        raise ValueError(f"Unsupported columnar file: {dest} (use .parquet or .arrow)")
+    _require_pyarrow()
+    df, report = read_erp(source, None, sheet, engine)
+    t0 = time.perf_counter()
+    table = pin_text_columns(df)
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    tmp = dest + ".tmp"
+    if fmt == "parquet":
+        table.to_parquet(tmp, index=False)
+    else:
+        table.to_feather(tmp, compression="uncompressed")
+    os.replace(tmp, dest)
+    report["write_seconds"] = round(time.perf_counter() - t0, 4)
+    return report
+
+def read_columnar(source, workflow: Optional[str] = None,
+                  columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """Reads a .parquet / .arrow import, loading only the workflow's columns.
+
+    columns, if given, names the columns to load instead. Returns
+    (DataFrame, report) in the same shape as read_erp's report.
+    """
+    fmt = columnar_format(source)
+    schema = _arrow_schema(source, fmt)
+    needed = set(columns) if columns is not None else set(required_columns(workflow)) if workflow else None
+    columns = [c for c in schema.names if needed is None or c in needed]
+    t0 = time.perf_counter()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "parquet":
+        df = pd.read_parquet(source, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        df = feather.read_table(source, columns=columns,
+                                memory_map=isinstance(source, str)).to_pandas()
+    name = os.path.basename(source if isinstance(source, str) else getattr(source, "name", "")) or fmt
+    report = {"engine": fmt, "open_seconds": 0.0,
+              "sheets": [{"sheet": name, "rows": len(df), "columns": df.shape[1],
+                          "seconds": round(time.perf_counter() - t0, 4)}]}
+    return df, report
+
+def columnar_copy(path: str, fmt: str = "parquet", cache_dir: Optional[str] = None) -> str:
+    """Path of an up-to-date columnar import of the workbook at path.
+
+    The import lives in cache_dir (default: .columnar/ next to the workbook)
+    and is rebuilt only when the workbook is newer than it.
+    """
+    ext = {"parquet": ".parquet", "arrow": ".arrow"}[fmt]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), ".columnar")
+    dest = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + ext)
+    if not os.path.exists(dest) or os.path.getmtime(dest) < os.path.getmtime(path):
+        import_workbook(path, dest)
+    return dest
+
+# ---------------------------------------------------------------------
+# 5. Reference exports for the cross-file checks
+# ---------------------------------------------------------------------
+def read_reference_skus(sources: List) -> Dict[str, pd.Index]:
+    """{workflow key: SKU codes} of reference exports, e.g. the catalog a stone
+    or price file is checked against (see workflows.dataset_index).
+
+    Each source's workflows are detected from its header and only their key
+    columns are read; several sources of one workflow are combined.
+    """
+    parts: Dict[str, List[pd.Index]] = {}
+    for source in sources:
+        keys = [get_workflow(w)["key"] for w in detect_workflows(read_columns(source))]
+        if not keys:
+            name = source if isinstance(source, str) else getattr(source, "name", "upload")
+            raise ValueError(f"Reference file {name}: its columns match no workflow")
+        fields = list(dict.fromkeys(KEY_FIELDS[k] for k in keys))
+        if columnar_format(source):
+            df, _ = read_columnar(source, columns=fields)
+        else:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            df = pd.read_excel(source, usecols=fields, dtype=column_dtypes(fields), engine=available_engine())
+        for k in keys:
+            parts.setdefault(k, []).append(reference_skus(df, k))
+    return {k: pd.Index(pd.concat([p.to_series() for p in ps]).unique(), dtype=object)
+            for k, ps in parts.items()}
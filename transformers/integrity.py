@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .common import normalize_barcodes
+from .validation import ERROR_COLUMNS, empty_errors, merge_errors
+
+# workflow key → ERP column its SKU is derived from
+KEY_FIELDS: Dict[str, str] = {"price": "Bar Code", "stone": "Main Batch Number", "catalog": "Bar Code"}
+# workflow key → workflow keys whose SKUs its rows must exist in (checked when both are present)
+REFERENCES: Dict[str, List[str]] = {"stone": ["catalog", "price"], "price": ["catalog"]}
+
+# ---------------------------------------------------------------------
+# 1. Key index (duplicates and SKU collisions)
+# ---------------------------------------------------------------------
+def _errors(rows, field: str, issues: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({"row": rows, "field": field, "issue": issues}, columns=ERROR_COLUMNS)
+
+class KeyIndex:
+    """Hash index of derived key → (first row, source value), fed batch by batch.
+
+    add() reports every row whose key was already seen, earlier in the batch
+    or in an earlier batch: the same source value is a duplicate, a different
+    one that derives the same key is a collision (e.g. Bar Codes 16944084 and
+    0016944084 both give CKC_0016944084). With unique=False only collisions
+    are reported (many stone lines share one SKU). Keys seen so far are kept
+    in a few pd.Index chunks of geometrically decreasing size, so a batch is
+    looked up in O(log n) hash tables and the cost stays linear-ish in rows.
+    """
+
+    def __init__(self, field: str, label: str, unique: bool = True):
+        self.field = field
+        self.label = label
+        self.unique = unique
+        # (distinct keys, first row of each, its source value) per chunk
+        self._chunks: List[Tuple[pd.Index, np.ndarray, np.ndarray]] = []
+
+    def _lookup(self, keys: pd.Index) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        found = np.zeros(len(keys), dtype=bool)
+        rows = np.empty(len(keys), dtype=object)
+        vals = np.empty(len(keys), dtype=object)
+        for chunk, chunk_rows, chunk_vals in self._chunks:
+            pos = chunk.get_indexer(keys)
+            hit = pos >= 0
+            rows[hit], vals[hit] = chunk_rows[pos[hit]], chunk_vals[pos[hit]]
+            found |= hit
+        return found, rows, vals
+
+    def _remember(self, keys: pd.Index, rows: np.ndarray, vals: np.ndarray) -> None:
+        self._chunks.append((keys, rows, vals))
+        # merge while the previous chunk is not more than twice the last one
+        while len(self._chunks) > 1 and len(self._chunks[-2][0]) <= 2 * len(self._chunks[-1][0]):
+            (k1, r1, v1), (k2, r2, v2) = self._chunks[-2:]
+            keys = pd.Index(np.concatenate([k1.to_numpy(), k2.to_numpy()]), dtype=object)
+            self._chunks[-2:] = [(keys, np.concatenate([r1, r2]), np.concatenate([v1, v2]))]
+
+    def add(self, keys: pd.Series, values: pd.Series) -> pd.DataFrame:
+        """keys: derived key per row ("" = not indexed); values: the source value it came from."""
+        use = (keys != "").to_numpy()
+        if not use.any():
+            return empty_errors()
+        rows = keys.index[use].to_numpy(dtype=object)
+        vals = values.to_numpy(dtype=object)[use]
+        idx = pd.Index(keys.to_numpy(dtype=object)[use], dtype=object)
+        first = ~idx.duplicated(keep="first")
+        distinct = idx[first]
+        # per row: position of its key among the batch's distinct keys, and that key's first row
+        code = distinct.get_indexer(idx)
+        first_row, first_val = rows[first], vals[first]
+        # keys seen in an earlier batch point back to their first row there
+        old, prev_row, prev_val = self._lookup(distinct)
+        first_row[old], first_val[old] = prev_row[old], prev_val[old]
+        new = ~old
+        if new.any():
+            self._remember(distinct[new], first_row[new], first_val[new])
+
+        flagged = np.flatnonzero(~first | old[code])
+        same = vals[flagged] == first_val[code[flagged]]
+        if not self.unique:
+            flagged, same = flagged[~same], same[~same]
+        if not len(flagged):
+            return empty_errors()
+        ref_row, ref_val = first_row[code[flagged]], first_val[code[flagged]]
+        issues = [f"Duplicate {self.label} (first in row {r})" if sm else
+                  f"{self.label} {v} gives SKU {k}, same as {rv} in row {r}"
+                  for sm, v, k, r, rv in zip(same, vals[flagged], idx[flagged], ref_row, ref_val)]
+        return _errors(rows[flagged], self.field, issues)
+
+    def keys(self) -> pd.Index:
+        if not self._chunks:
+            return pd.Index([], dtype=object)
+        return pd.Index(np.concatenate([c[0].to_numpy() for c in self._chunks]), dtype=object)
+
+class DatasetIndex:
+    """The key indexes of one workflow's input, fed with the whole frame or batch by batch.
+
+    Price and catalog rows must each have their own SKU (Bar Code). Stone rows
+    share the SKU of their Main Batch Number, so there only collisions are
+    flagged, plus repeated Stone Batch Numbers under one SKU. references
+    ({display name: SKUs}, see reference_skus) adds the cross-file check:
+    rows whose SKU is missing from one of those datasets.
+    """
+
+    def __init__(self, workflow: str, references: Optional[Dict[str, pd.Index]] = None):
+        self.workflow = workflow
+        self.references = references or {}
+        field = KEY_FIELDS[workflow]
+        self.skus = KeyIndex(field, field, unique=workflow != "stone")
+        self.lines = (KeyIndex("Stone Batch Number", "Stone Batch Number for this SKU")
+                      if workflow == "stone" else None)
+
+    def add(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Indexes df's rows; returns the duplicate/collision errors (row/field/issue)."""
+        if self.skus.field not in df.columns:
+            return empty_errors()
+        norm = normalize_barcodes(df[self.skus.field])
+        err = self.skus.add(norm["sku"], norm["digits"])
+        if self.references:
+            err = merge_errors(err, missing_references(norm["sku"], self.skus.field, self.references))
+        if self.lines is None or "Stone Batch Number" not in df.columns:
+            return err
+        # stone line key = SKU + stone number text, built from the distinct stone numbers only
+        codes, uniques = pd.factorize(df["Stone Batch Number"])
+        text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        stone_no = np.append(text.to_numpy(dtype=object), "")[codes]
+        ok = (norm["sku"] != "").to_numpy() & (codes >= 0)
+        line = pd.Series(np.where(ok, norm["sku"].to_numpy(dtype=object) + "|" + stone_no, ""),
+                         index=df.index, dtype=object)
+        return merge_errors(err, self.lines.add(line, line))
+
+def integrity_errors(df: pd.DataFrame, workflow: str, index: Optional[DatasetIndex] = None) -> pd.DataFrame:
+    """Duplicate and collision errors for df; pass a DatasetIndex to carry keys across batches."""
+    return (index if index is not None else DatasetIndex(workflow)).add(df)
+
+# ---------------------------------------------------------------------
+# 2. Referential integrity between Price, Stone and Catalog
+# ---------------------------------------------------------------------
+def reference_skus(df: pd.DataFrame, workflow: str) -> pd.Index:
+    """Distinct SKU codes of one workflow's ERP input, derived from its key column."""
+    sku = normalize_barcodes(df[KEY_FIELDS[workflow]])["sku"]
+    return pd.Index(sku[sku != ""].unique(), dtype=object)
+
+def missing_references(skus: pd.Series, field: str, targets: Dict[str, pd.Index]) -> pd.DataFrame:
+    """Rows whose SKU is missing from each target's SKU set.
+
+    targets maps a display name (e.g. "Catalog Creation") to the SKUs of that
+    dataset. Membership is one vectorized isin per target; blank SKUs are
+    left to validation.
+    """
+    present = (skus != "").to_numpy()
+    parts = []
+    for name, keys in targets.items():
+        missing = np.flatnonzero(present & ~skus.isin(keys).to_numpy())
+        if len(missing):
+            parts.append(_errors(skus.index[missing], field,
+                                 [f"SKU {s} not found in {name} input" for s in skus.to_numpy()[missing]]))
+    return merge_errors(*parts)
@@ -0,0 +1,210 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from .cache import file_digest, workflow_fingerprint
+from .ingest import read_erp
+from .streaming import DEFAULT_BATCH_SIZE, stream_transform
+from .templates import DEFAULT_CHUNK_ROWS, iter_output
+from .workflows import get_workflow, transform_options
+
+# Job states, in order
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    dedup_key TEXT,
+    filename TEXT,
+    workflow TEXT,
+    options TEXT,
+    status TEXT,
+    progress REAL,
+    message TEXT,
+    rows INTEGER,
+    errors INTEGER,
+    output TEXT,
+    errors_csv TEXT,
+    created REAL,
+    updated REAL
+);
+DROP INDEX IF EXISTS jobs_dedup;
+"""
+# one live job per submission (failed jobs keep their rows and may be retried)
+_DEDUP_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedup_live ON jobs (dedup_key) WHERE status != 'failed'"
+
+# ---------------------------------------------------------------------
+# 1. SQLite status store (shared by sessions, threads and worker processes)
+# ---------------------------------------------------------------------
+@contextmanager
+def _connect(db_path: str) -> Iterator[sqlite3.Connection]:
+    # one short-lived connection per call: safe across threads and processes.
+    # sqlite3's own context manager only commits, so the connection is closed here.
+    con = sqlite3.connect(db_path, timeout=30)
+    con.row_factory = sqlite3.Row
+    try:
+        with con:
+            yield con
+    finally:
+        con.close()
+
+def _update(db_path: str, job_id: str, **fields) -> None:
+    fields["updated"] = time.time()
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _connect(db_path) as con:
+        con.execute(f"UPDATE jobs SET {cols} WHERE id = ?", [*fields.values(), job_id])
+
+def _fetch(db_path: str, where: str = "", args: tuple = ()) -> List[Dict]:
+    with _connect(db_path) as con:
+        rows = con.execute(f"SELECT * FROM jobs {where} ORDER BY created DESC", args).fetchall()
+    jobs = [dict(r) for r in rows]
+    for job in jobs:
+        job["options"] = json.loads(job["options"] or "{}")
+    return jobs
+
+# ---------------------------------------------------------------------
+# 2. Worker entry point (top-level so a process pool can pickle it)
+# ---------------------------------------------------------------------
+def run_job(db_path: str, job_id: str) -> None:
+    """Converts one queued job's input, reporting progress to the store per chunk.
+
+    Progress: parsing → 20%, transform → 40%, then every written chunk of
+    data rows up to 100%. Streaming jobs report rows converted per batch out
+    of the total the pre-pass counted.
+    """
+    job = _fetch(db_path, "WHERE id = ?", (job_id,))[0]
+    wf = get_workflow(job["workflow"])
+    opts = job["options"]
+    job_dir = os.path.dirname(job["output"])
+    source = os.path.join(job_dir, job["filename"])
+    _update(db_path, job_id, status=RUNNING, progress=0.0, message="parsing")
+    try:
+        if opts.get("stream"):
+            def report(n_rows: int, total: int) -> None:
+                _update(db_path, job_id, progress=n_rows / total if total else 0.0,
+                        message=f"{n_rows} of {total} rows converted", rows=n_rows)
+            n_rows, err_df = stream_transform(source, job["workflow"], job["output"],
+                                              batch_size=opts.get("batch_size", DEFAULT_BATCH_SIZE),
+                                              template_version=opts.get("template"), progress=report,
+                                              rules=opts.get("rules"))
+        else:
+            df, _ = read_erp(source, job["workflow"])
+            _update(db_path, job_id, progress=0.2, message=f"transforming {len(df)} rows")
+            data, err_df = wf["transform"](df, include_template=False,
+                                           **transform_options(job["workflow"], opts.get("rules")))
+            _update(db_path, job_id, progress=0.4, message="writing")
+            n_rows = len(data)
+            chunk_rows = opts.get("chunk_rows", DEFAULT_CHUNK_ROWS)
+            chunks = max(1, -(-n_rows // chunk_rows))
+            with open(job["output"], "wb") as fh:
+                # header block first, then one chunk of rows per iteration
+                for i, chunk in enumerate(iter_output(data, wf["key"], opts.get("template"),
+                                                      "gzip" if opts.get("gzip") else None, chunk_rows)):
+                    fh.write(chunk)
+                    if i:
+                        done = min(i, chunks)
+                        _update(db_path, job_id, progress=0.4 + 0.6 * done / chunks,
+                                message=f"written {min(done * chunk_rows, n_rows)} of {n_rows} rows")
+        err_df.to_csv(job["errors_csv"], index=False)
+        _update(db_path, job_id, status=DONE, progress=1.0, message="done",
+                rows=n_rows, errors=len(err_df))
+    except Exception as e:
+        if os.path.exists(job["output"]):
+            os.remove(job["output"])
+        _update(db_path, job_id, status=FAILED, message=f"{type(e).__name__}: {e}")
+
+# ---------------------------------------------------------------------
+# 3. Queue
+# ---------------------------------------------------------------------
+class JobQueue:
+    """Local worker pool + SQLite job table under job_dir.
+
+    Uploads are copied into job_dir/<id>/ and converted by max_workers
+    threads (or processes). Identical submissions (same bytes, workflow,
+    options and template version) reuse the existing job instead of
+    converting again. Finished outputs stay on disk for retention_seconds.
+    """
+
+    def __init__(self, job_dir: str, max_workers: int = 2, processes: bool = False,
+                 retention_seconds: float = 24 * 3600):
+        self.job_dir = job_dir
+        self.db_path = os.path.join(job_dir, "jobs.sqlite")
+        self.retention_seconds = retention_seconds
+        os.makedirs(job_dir, exist_ok=True)
+        with _connect(self.db_path) as con:
+            con.executescript(_SCHEMA)
+            # jobs that were queued/running when the previous pool died never finish
+            con.execute("UPDATE jobs SET status = ?, message = ? WHERE status IN (?, ?)",
+                        (FAILED, "interrupted (server restarted)", QUEUED, RUNNING))
+            # stores from before the unique index may hold several finished copies of a job
+            con.execute("UPDATE jobs SET status = ?, message = ? WHERE status != ? AND rowid NOT IN "
+                        "(SELECT MAX(rowid) FROM jobs WHERE status != ? GROUP BY dedup_key)",
+                        (FAILED, "superseded", FAILED, FAILED))
+            con.execute(_DEDUP_INDEX)
+        self._pool: Executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=max_workers)
+
+    def submit(self, data: bytes, filename: str, workflow: str, options: Optional[Dict] = None) -> str:
+        """Queues a conversion of the uploaded bytes; returns the job id."""
+        options = dict(options or {})
+        wf = get_workflow(workflow)
+        dedup_key = "-".join([file_digest(data), wf["key"], workflow_fingerprint(workflow, options.get("rules")),
+                              json.dumps(options, sort_keys=True)])
+        for job in _fetch(self.db_path, "WHERE dedup_key = ? AND status != ?", (dedup_key, FAILED)):
+            if job["status"] != DONE or os.path.exists(job["output"]):
+                return job["id"]
+            # finished, but its output is gone: retire it so the submission runs again
+            _update(self.db_path, job["id"], status=FAILED, message="output removed")
+
+        self.purge()
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.job_dir, job_id)
+        os.makedirs(job_dir)
+        filename = os.path.basename(filename)
+        with open(os.path.join(job_dir, filename), "wb") as fh:
+            fh.write(data)
+        output = os.path.join(job_dir, wf["filename"] + (".gz" if options.get("gzip") else ""))
+        now = time.time()
+        with _connect(self.db_path) as con:
+            # the unique index makes this atomic: of two identical submissions racing here, one inserts
+            inserted = con.execute(
+                "INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, dedup_key, filename, wf["key"], json.dumps(options), QUEUED, 0.0,
+                 "queued", None, None, output, os.path.join(job_dir, "errors.csv"), now, now)).rowcount
+        if not inserted:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return _fetch(self.db_path, "WHERE dedup_key = ? AND status != ?", (dedup_key, FAILED))[0]["id"]
+        self._pool.submit(run_job, self.db_path, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        found = _fetch(self.db_path, "WHERE id = ?", (job_id,))
+        return found[0] if found else None
+
+    def jobs(self, job_ids: Optional[List[str]] = None) -> List[Dict]:
+        """All jobs (newest first), or only the given ids."""
+        if job_ids is None:
+            return _fetch(self.db_path)
+        if not job_ids:
+            return []
+        marks = ", ".join("?" * len(job_ids))
+        return _fetch(self.db_path, f"WHERE id IN ({marks})", tuple(job_ids))
+
+    def purge(self) -> int:
+        """Deletes finished jobs (and their files) older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        old = _fetch(self.db_path, "WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, cutoff))
+        for job in old:
+            shutil.rmtree(os.path.join(self.job_dir, job["id"]), ignore_errors=True)
+        if old:
+            with _connect(self.db_path) as con:
+                con.executemany("DELETE FROM jobs WHERE id = ?", [(j["id"],) for j in old])
+        return len(old)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
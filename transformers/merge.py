@@ -0,0 +1,212 @@
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import pandas as pd
+
+from .ingest import (IDENTIFIER_COLUMNS, available_engine, columnar_format, read_columnar, read_columns,
+                     required_columns)
+from .streaming import DEFAULT_BATCH_SIZE, DatasetProfile, iter_excel_batches, profile_sheet, read_headers
+from .templates import header_text, open_output
+from .validation import ERROR_COLUMNS
+from .workflows import dataset_index, get_workflow, transform_options
+
+# Merged error reports say where each row came from: file, sheet and the row
+# within that sheet, next to the row number in the merged dataset.
+SOURCE_COLUMNS: List[str] = ["file", "sheet", "sheet_row"]
+MERGE_ERROR_COLUMNS: List[str] = SOURCE_COLUMNS + ERROR_COLUMNS
+
+# sheet selection: None = every sheet, a list = those sheet names in every
+# file, a dict = {file name: sheet names} per file
+SheetSelection = Union[None, List[str], Dict[str, List[str]]]
+
+# ---------------------------------------------------------------------
+# 1. Sources and column alignment
+# ---------------------------------------------------------------------
+def source_name(source) -> str:
+    """File name of a path or upload (what error rows report as "file")."""
+    return os.path.basename(source if isinstance(source, str) else getattr(source, "name", "")) or "upload"
+
+def _key(name) -> str:
+    return " ".join(str(name).split()).casefold()
+
+def align_columns(header: Sequence, workflow: str) -> Tuple[Dict[str, str], List[str]]:
+    """Matches a sheet's header against the columns the workflow reads.
+
+    Names match ignoring case and extra whitespace ("BAR CODE " → "Bar Code");
+    an exact match wins over a loose one. Returns ({sheet column: workflow
+    column}, signature columns the sheet lacks). Other columns are dropped.
+    """
+    wanted = {_key(c): c for c in required_columns(workflow)}
+    rename: Dict[str, str] = {}
+    for col in sorted(header, key=lambda c: c not in wanted.values()):
+        target = wanted.get(_key(col))
+        if target is not None and target not in rename.values():
+            rename[col] = target
+    missing = [c for c in get_workflow(workflow)["signature"] if c not in rename.values()]
+    return rename, missing
+
+def list_sheets(source) -> Dict[str, List]:
+    """{sheet name: header row}; a .parquet/.arrow import is one "sheet" named after the file."""
+    if columnar_format(source):
+        return {source_name(source): read_columns(source)}
+    return read_headers(source)
+
+def _selected(sheets: SheetSelection, name: str, available: List[str]) -> List[str]:
+    if sheets is None:
+        return available
+    chosen = sheets.get(name, []) if isinstance(sheets, dict) else sheets
+    return [s for s in available if s in chosen]
+
+def _sheet_columns(source, workflow: str, sheets: SheetSelection) -> List[Tuple[str, Dict[str, str], List[str]]]:
+    """(sheet, {sheet column: workflow column}, missing signature columns) per selected sheet."""
+    headers = list_sheets(source)
+    return [(sheet, *align_columns(headers[sheet], workflow))
+            for sheet in _selected(sheets, source_name(source), list(headers))]
+
+def _sheet_dtypes(rename: Dict[str, str]) -> Dict[str, type]:
+    # identifiers stay text as in ingest
+    return {c: str for c, target in rename.items() if target in IDENTIFIER_COLUMNS}
+
+# ---------------------------------------------------------------------
+# 2. Reading sheet by sheet
+# ---------------------------------------------------------------------
+def _read_sheet(source, sheet: str, rename: Dict[str, str], book,
+                batch_size: Optional[int]) -> Iterator[pd.DataFrame]:
+    # only the aligned columns are parsed
+    raw = list(rename)
+    dtype = _sheet_dtypes(rename)
+    if columnar_format(source):
+        frames = [read_columnar(source, columns=raw)[0]]
+    elif batch_size:
+        frames = iter_excel_batches(source, sheet, batch_size, columns=raw, dtype=dtype)
+    else:
+        frames = [book.parse(sheet, usecols=lambda c: c in rename, dtype=dtype)]
+    for df in frames:
+        yield df.rename(columns=rename)
+
+def iter_sources(sources: List, workflow: str, sheets: SheetSelection = None,
+                 batch_size: Optional[int] = None,
+                 report: Optional[List[Dict]] = None) -> Iterator[Tuple[str, str, Optional[pd.DataFrame], List[str]]]:
+    """Yields (file, sheet, frame, missing columns) for every selected sheet, in order.
+
+    Each sheet is read on its own (or in batch_size row batches from the
+    read-only openpyxl reader), so at most one sheet is held in memory. A
+    sheet missing some of the workflow's signature columns is yielded once
+    with frame None and the missing columns; a sheet with none of them (a
+    notes or summary tab) is skipped. report, if given, receives one entry
+    per sheet (file, sheet, rows, seconds, status).
+    """
+    report = report if report is not None else []
+    signature = get_workflow(workflow)["signature"]
+    for source in sources:
+        name = source_name(source)
+        selected = _sheet_columns(source, workflow, sheets)
+        book = None
+        if not columnar_format(source) and not batch_size:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            book = pd.ExcelFile(source, engine=available_engine())
+        try:
+            for sheet, rename, missing in selected:
+                entry = {"file": name, "sheet": sheet, "rows": 0, "seconds": 0.0, "status": "merged"}
+                report.append(entry)
+                if len(missing) == len(signature):
+                    entry["status"] = "skipped (not a workflow sheet)"
+                    continue
+                if missing:
+                    entry["status"] = "skipped (missing columns)"
+                    yield name, sheet, None, missing
+                    continue
+                t0 = time.perf_counter()
+                for df in _read_sheet(source, sheet, rename, book, batch_size):
+                    entry["rows"] += len(df)
+                    entry["seconds"] = round(entry["seconds"] + time.perf_counter() - t0, 4)
+                    yield name, sheet, df, []
+                    t0 = time.perf_counter()
+        finally:
+            if book is not None:
+                book.close()
+
+def profile_sources(sources: List, workflow: str, sheets: SheetSelection = None,
+                    batch_size: Optional[int] = None) -> DatasetProfile:
+    """Pre-pass over every sheet iter_sources reads, as one dataset.
+
+    The profile holds the dtypes and barcode pad width one read of all the
+    sheets stacked together would give, so each sheet is converted as part
+    of the whole merge rather than on its own (streaming.DatasetProfile).
+    """
+    profile = DatasetProfile()
+    for source in sources:
+        for sheet, rename, missing in _sheet_columns(source, workflow, sheets):
+            if missing:
+                continue
+            if columnar_format(source):
+                df = read_columnar(source, columns=list(rename))[0]
+                profile.add(df.rename(columns=rename))
+                profile.rows += len(df)
+            else:
+                profile_sheet(source, sheet, batch_size or DEFAULT_BATCH_SIZE, list(rename),
+                              _sheet_dtypes(rename), profile=profile, rename=rename)
+    return profile
+
+# ---------------------------------------------------------------------
+# 3. Merged transform → one CSV
+# ---------------------------------------------------------------------
+def _source_errors(err: pd.DataFrame, name: str, sheet: str, offset: int) -> pd.DataFrame:
+    out = err.assign(file=name, sheet=sheet, sheet_row=err["row"] - offset)
+    return out[MERGE_ERROR_COLUMNS]
+
+def merge_sources(sources: List, workflow: str, out, sheets: SheetSelection = None,
+                  batch_size: Optional[int] = None, template_version: Optional[str] = None,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  rules: Optional[str] = None,
+                  references: Optional[Dict[str, pd.Index]] = None) -> Tuple[int, pd.DataFrame, List[Dict]]:
+    """Transforms every selected sheet of every source as one dataset into one CSV.
+
+    out is a path (gzip when it ends in .gz) or a text file object; the
+    template header block is written once and each sheet (or batch) appends
+    its data rows. Rows are numbered across the whole merge, so duplicate
+    and collision checks span files and sheets. Returns (data rows written,
+    errors with file/sheet/sheet_row, per-sheet report); sheets missing
+    signature columns are reported as error rows and left out. references
+    ({workflow key: SKU codes}) adds the cross-file checks as in streaming;
+    progress gets (rows written, total rows) after every sheet or batch.
+
+    A pre-pass (profile_sources) fixes column dtypes and the barcode pad
+    width over all the sheets first, so the CSV equals converting one input
+    holding every row.
+    """
+    wf = get_workflow(workflow)
+    profile = profile_sources(sources, workflow, sheets, batch_size)
+    options = transform_options(workflow, rules, profile.barcode_width)
+    close = False
+    if isinstance(out, str):
+        out = open_output(out)
+        close = True
+    errors, report = [], []
+    n_rows = offset = 0
+    try:
+        out.write(header_text(wf["key"], template_version))
+        index = dataset_index(workflow, references)
+        for name, sheet, df, missing in iter_sources(sources, workflow, sheets, batch_size, report):
+            if df is None:
+                errors.append(pd.DataFrame({"file": [name], "sheet": [sheet], "sheet_row": [None], "row": [None],
+                                            "field": [", ".join(missing)],
+                                            "issue": [f"Sheet skipped: missing required columns {missing}"]}))
+                continue
+            sheet_start = offset - df.index[0] if len(df) else offset
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            mapped, err = wf["transform"](profile.apply(df), include_template=False, index=index, **options)
+            mapped.to_csv(out, index=False, header=False)
+            n_rows += len(mapped)
+            offset += len(df)
+            if progress is not None:
+                progress(n_rows, profile.rows)
+            if not err.empty:
+                errors.append(_source_errors(err, name, sheet, sheet_start))
+    finally:
+        if close:
+            out.close()
+    err_df = (pd.concat(errors, ignore_index=True)[MERGE_ERROR_COLUMNS] if errors
+              else pd.DataFrame(columns=MERGE_ERROR_COLUMNS))
+    return n_rows, err_df, report
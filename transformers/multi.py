@@ -0,0 +1,138 @@
+import contextvars
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+
+from .images import MANIFEST_FILENAME, ImageIndex, check_images
+from .integrity import REFERENCES, reference_skus
+from .profiling import stage
+from .rollup import ROLLUP_FILENAME, fill_attributes, rollup_stones
+from .templates import iter_output
+from .validation import ERROR_COLUMNS, merge_errors
+from .workflows import dataset_index, detect_workflows, get_workflow, transform_options, workflow_label
+
+ERRORS_FILENAME = "ValidationErrors.csv"
+
+# ---------------------------------------------------------------------
+# 1. Run every satisfied workflow on one parsed frame
+# ---------------------------------------------------------------------
+def run_workflows(df: pd.DataFrame, workflows: Optional[List[str]] = None,
+                  max_workers: Optional[int] = None, cache=None,
+                  digest: Optional[str] = None,
+                  rules: Optional[str] = None) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Runs the given (default: all detected) workflows concurrently on df.
+
+    The transforms only read their input, so all threads share the one frame;
+    nothing is copied up front. Results are typed data rows without the
+    template rows (build_zip prepends each header block). With a ResultCache
+    and the file digest, each workflow's result is looked up / stored per
+    workflow as in single mode. rules picks the catalog rule set. Returns
+    {workflow label: (data rows, err_df)}.
+
+    The cross-file SKU checks (integrity.REFERENCES) run inside each
+    transform, against the SKU sets of the other workflows the frame carries.
+    """
+    detected = [get_workflow(w)["key"] for w in detect_workflows(df.columns)]
+    if workflows is None:
+        workflows = detected
+    if not workflows:
+        raise ValueError("No workflow matches the uploaded columns")
+    labels = [workflow_label(w) for w in workflows]
+    # from every detected workflow, not just the selected ones, so cached results stay valid
+    targets = {t for ts in REFERENCES.values() for t in ts}
+    skus = {k: reference_skus(df, k) for k in detected if k in targets}
+
+    def run(w):
+        wf = get_workflow(w)
+        options = transform_options(w, rules)
+        # the cache key names the references this result was checked against, so it never
+        # collides with a single-mode result (no references, or uploaded ones keyed by digest)
+        used = sorted(k for k in skus if k in REFERENCES.get(wf["key"], []))
+        variant = "refs:" + ",".join(used) if used else ""
+
+        def compute():
+            return wf["transform"](df, include_template=False, index=dataset_index(w, skus), **options)
+        return compute() if cache is None else cache.result(digest, w, compute, rules, variant)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(labels)) as pool:
+        # each thread runs in a copy of the caller's context so an active Profiler sees its stages
+        futures = {w: pool.submit(contextvars.copy_context().run, run, w) for w in labels}
+        return {w: f.result() for w, f in futures.items()}
+
+def combined_errors(results: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]) -> pd.DataFrame:
+    """One row/field/issue report with the workflow each issue came from."""
+    parts = [err.assign(workflow=w) for w, (_, err) in results.items() if not err.empty]
+    if not parts:
+        return pd.DataFrame(columns=["workflow"] + ERROR_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[["workflow"] + ERROR_COLUMNS]
+
+def attach_stone_rollup(results: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]) -> Optional[pd.DataFrame]:
+    """When both stone and catalog ran, joins the per-SKU stone totals into the
+    catalog rows (in place) and returns the rollup; otherwise returns None."""
+    stone, catalog = workflow_label("stone"), workflow_label("catalog")
+    if stone not in results or catalog not in results:
+        return None
+    rollup = rollup_stones(results[stone][0])
+    data, err_df = results[catalog]
+    results[catalog] = (fill_attributes(data, rollup), err_df)
+    return rollup
+
+def attach_image_check(results: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]],
+                       index: ImageIndex) -> Optional[pd.DataFrame]:
+    """Keeps only existing PDP images in the catalog rows (in place), adds
+    missing primary images to its errors and returns the image manifest;
+    None when no catalog ran."""
+    catalog = workflow_label("catalog")
+    if catalog not in results:
+        return None
+    data, err_df = results[catalog]
+    data, img_err, manifest = check_images(data, index)
+    results[catalog] = (data, merge_errors(err_df, img_err))
+    return manifest
+
+def build_zip(results: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]],
+              rollup: Optional[pd.DataFrame] = None,
+              manifest: Optional[pd.DataFrame] = None) -> bytes:
+    """ZIP with every generated CSV plus the combined error report (and the
+    stone rollup and image manifest, if any).
+
+    Each CSV is streamed into its archive member chunk by chunk (header block,
+    then data rows), so no full CSV string is held next to the archive.
+    """
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for w, (data, _) in results.items():
+            wf = get_workflow(w)
+            with zf.open(wf["filename"], "w") as member:
+                for chunk in iter_output(data, wf["key"]):
+                    member.write(chunk)
+        if rollup is not None:
+            zf.writestr(ROLLUP_FILENAME, rollup.to_csv(index=False))
+        if manifest is not None:
+            zf.writestr(MANIFEST_FILENAME, manifest.to_csv(index=False))
+        zf.writestr(ERRORS_FILENAME, combined_errors(results).to_csv(index=False))
+    return buf.getvalue()
+
+def convert_all(df: pd.DataFrame, workflows: Optional[List[str]] = None,
+                max_workers: Optional[int] = None, cache=None, digest: Optional[str] = None,
+                rules: Optional[str] = None, images: Optional[ImageIndex] = None
+                ) -> Tuple[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]], Optional[pd.DataFrame], bytes]:
+    """All-workflows mode on one parsed frame: every workflow its columns
+    satisfy (or the given ones) with their cross-file SKU checks, the stone
+    rollup and, with an image index, the PDP image check. Each step is a
+    profiling stage. Returns (results, image manifest or None, ZIP bytes).
+    """
+    with stage("transform", len(df)):
+        results = run_workflows(df, workflows, max_workers, cache, digest, rules)
+    with stage("rollup"):
+        # stone totals per SKU go into the catalog's Attribute columns
+        rollup = attach_stone_rollup(results)
+    manifest = None
+    if images is not None:
+        with stage("images"):
+            manifest = attach_image_check(results, images)
+    with stage("serialize"):
+        payload = build_zip(results, rollup, manifest)
+    return results, manifest, payload
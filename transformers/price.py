@@ -1,7 +1,11 @@
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import pandas as pd
-from .common import barcode_to_ecomm_sku, validate_price_input
+from .common import normalize_barcodes, validate_price_input
+from .integrity import DatasetIndex, integrity_errors
+from .profiling import stage
+from .templates import meta_frame, register_template
+from .validation import merge_errors
 
 PRICE_HEADERS: List[str] = [
   "CR_EcommSKUCode",
@@ -71,29 +75,39 @@ PRICE_TEMPLATE_ROWS: List[Dict[str, str]] = [
   }
 ]
 
-def transform_price(input_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    df, err = validate_price_input(input_df.copy())
-    out = pd.DataFrame(columns=PRICE_HEADERS)
-    meta = pd.DataFrame(PRICE_TEMPLATE_ROWS)
-    out = pd.concat([meta, out], ignore_index=True)
+register_template("price", "SellerPriceBulkUpload.csv", PRICE_HEADERS, PRICE_TEMPLATE_ROWS)
 
-    mapped_rows = pd.DataFrame({
-        'CR_EcommSKUCode': df['Bar Code'].apply(barcode_to_ecomm_sku),
-        'CR_DiamondCost': df['Diamond Cost'],
-        'CR_GemstoneCost': df['Stone Cost'],
-        'CR_MakingCharges': df['Making'],
-        'CR_WastageCharges': df['Wastage'],
-        'CR_AccessoriesCost': df.get('Accessories Cost'),
-        'CR_MetalCost': df['Metal Cost'],
-        'CR_GSTCharges': df['GST'],
-        'CR_Price_without_Promotion': df['Selling Price w/o Promotion'],
-        'CR_Price_with_Promotion': df['Selling Price with Promotion'],
-        'Price_Group_Code': ""
-    })
-    for c in ['CR_DiamondCost','CR_GemstoneCost','CR_MakingCharges','CR_WastageCharges',
-              'CR_AccessoriesCost','CR_MetalCost','CR_GSTCharges',
-              'CR_Price_without_Promotion','CR_Price_with_Promotion']:
-        mapped_rows[c] = pd.to_numeric(mapped_rows[c], errors='coerce')
-    mapped_rows['Price_Group_Code'] = mapped_rows['Price_Group_Code'].fillna("")
-    out = pd.concat([out, mapped_rows], ignore_index=True)
+def transform_price(input_df: pd.DataFrame, include_template: bool = True,
+                    index: Optional[DatasetIndex] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    n = len(input_df)
+    # read-only use of the input, so the frame can be shared across workflows without a copy
+    with stage("price.validate", n):
+        df, err = validate_price_input(input_df)
+        # duplicate / colliding SKUs (index carries keys across streaming batches)
+        err = merge_errors(err, integrity_errors(df, "price", index))
+
+    with stage("price.map", n):
+        mapped_rows = pd.DataFrame({
+            # invalid barcodes get a blank SKU; validation already reports them
+            'CR_EcommSKUCode': normalize_barcodes(df['Bar Code'])['sku'],
+            'CR_DiamondCost': df['Diamond Cost'],
+            'CR_GemstoneCost': df['Stone Cost'],
+            'CR_MakingCharges': df['Making'],
+            'CR_WastageCharges': df['Wastage'],
+            'CR_AccessoriesCost': df.get('Accessories Cost'),
+            'CR_MetalCost': df['Metal Cost'],
+            'CR_GSTCharges': df['GST'],
+            'CR_Price_without_Promotion': df['Selling Price w/o Promotion'],
+            'CR_Price_with_Promotion': df['Selling Price with Promotion'],
+            'Price_Group_Code': ""
+        })
+        for c in ['CR_DiamondCost','CR_GemstoneCost','CR_MakingCharges','CR_WastageCharges',
+                  'CR_AccessoriesCost','CR_MetalCost','CR_GSTCharges',
+                  'CR_Price_without_Promotion','CR_Price_with_Promotion']:
+            mapped_rows[c] = pd.to_numeric(mapped_rows[c], errors='coerce')
+        mapped_rows['Price_Group_Code'] = mapped_rows['Price_Group_Code'].fillna("")
+    if not include_template:
+        return mapped_rows, err
+    with stage("price.assemble", n):
+        out = pd.concat([meta_frame("price"), mapped_rows], ignore_index=True)
     return out, err
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import pandas as pd
+
+# The active profiler for the current run (per thread / task). When none is
+# active, stage() costs one ContextVar lookup, so the hooks stay in place.
+_ACTIVE: ContextVar[Optional["Profiler"]] = ContextVar("ckc_profiler", default=None)
+
+# ---------------------------------------------------------------------
+# 1. Peak RSS
+# ---------------------------------------------------------------------
+def peak_rss_bytes() -> Optional[int]:
+    """Process peak resident set size so far (high-water mark), if the OS exposes it."""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024   # Linux reports KiB
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)   # Windows
+    except ImportError:
+        return None
+
+# ---------------------------------------------------------------------
+# 2. Profiler
+# ---------------------------------------------------------------------
+RECORD_COLUMNS: List[str] = ["stage", "seconds", "rows", "rows_per_sec", "peak_rss_mb", "peak_rss_growth_mb"]
+
+class Profiler:
+    """Collects one record per stage: wall time, rows, rows/sec, the process
+    peak RSS after the stage and how much the stage raised it.
+
+    Peak RSS is a process-wide high-water mark (ru_maxrss), so
+    peak_rss_growth_mb is not the stage's own allocation: a stage that stays
+    under an earlier peak reads 0, however much it allocates.
+    """
+
+    def __init__(self, **context):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context = context
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        token = _ACTIVE.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE.reset(token)
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        peak0 = peak_rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            peak1 = peak_rss_bytes()
+            rec = {"stage": name, "seconds": round(seconds, 4), "rows": rows,
+                   "rows_per_sec": round(rows / seconds) if rows and seconds > 0 else None,
+                   "peak_rss_mb": round(peak1 / 2**20, 2) if peak1 is not None else None,
+                   "peak_rss_growth_mb": round((peak1 - peak0) / 2**20, 2) if peak0 is not None else None}
+            with self._lock:
+                self.records.append(rec)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=RECORD_COLUMNS)
+
+    def write_jsonl(self, path: str) -> None:
+        """Appends one JSON line per stage record, tagged with the run id and context."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(path, "a", encoding="utf-8") as fh:
+            for rec in self.records:
+                fh.write(json.dumps({"ts": ts, "run_id": self.run_id, **self.context, **rec}, default=str) + "\n")
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None):
+    """Times a stage into the active profiler; does nothing when none is active."""
+    prof = _ACTIVE.get()
+    if prof is None:
+        yield
+        return
+    with prof.stage(name, rows):
+        yield
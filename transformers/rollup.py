@@ -0,0 +1,122 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from .common import normalize_barcodes
+from .stone import transform_stone
+
+# Stone weights are totalled in carats; 1 ct = 0.2 g
+STONE_UNIT_TO_CTS: Dict[str, float] = {
+    "CTS": 1.0, "CT": 1.0, "CARAT": 1.0, "CARATS": 1.0,
+    "GMS": 5.0, "GM": 5.0, "G": 5.0, "GRAM": 5.0, "GRAMS": 5.0,
+    "MG": 0.005,
+}
+
+ROLLUP_FILENAME = "StoneRollup.csv"
+
+ROLLUP_COLUMNS: List[str] = [
+    "SKU Code", "Stone Lines", "Total Stone Pieces", "Total Stone Weight (cts)",
+    "Total Stone Amount", "Stone Types", "Unconverted Weights",
+]
+
+# Catalog output column ← rollup column, filled by fill_attributes (catalog_with_stones)
+ROLLUP_ATTRIBUTES: Dict[str, str] = {
+    "Attribute 1": "Total Stone Pieces",
+    "Attribute 2": "Total Stone Weight (cts)",
+    "Attribute 3": "Total Stone Amount",
+    "Attribute 4": "Stone Types",
+}
+
+# ---------------------------------------------------------------------
+# 1. Stone → SKU rollup
+# ---------------------------------------------------------------------
+def _labels(values: pd.Series):
+    """(codes, normalized uniques) of a low-cardinality text column; missing → code -1."""
+    codes, uniques = pd.factorize(values)
+    norm = pd.Series(uniques, dtype=object).astype(str).str.strip().str.upper()
+    return codes, norm
+
+def stone_weight_cts(weight: pd.Series, units: pd.Series) -> pd.Series:
+    """Stone Weight converted to carats; NaN where the unit is missing or unknown."""
+    codes, norm = _labels(units)
+    factor = np.append(norm.map(STONE_UNIT_TO_CTS).to_numpy(dtype=float), np.nan)[codes]
+    return pd.to_numeric(weight, errors="coerce") * factor
+
+def _group_sum(ids: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    """Per-group sum of values, NaN for groups where every value is missing."""
+    ok = ~np.isnan(values)
+    total = np.bincount(ids[ok], weights=values[ok], minlength=n)
+    return np.where(np.bincount(ids[ok], minlength=n) > 0, total, np.nan)
+
+def rollup_stones(stones: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates stone transform rows (one per stone) into one row per SKU.
+
+    stones are the data rows of transform_stone (include_template=False). The
+    SKU Code is the normalized Main Batch Number, so it joins to the catalog's
+    SKU Code. Weights in unknown units are left out of the total and counted
+    in "Unconverted Weights". Rows without a usable batch number are dropped.
+    Text is normalized once per distinct value and rows are grouped by integer
+    ids, so no per-row strings are built.
+    """
+    batch_codes, batches = pd.factorize(stones["SKU_Code_Bar_Code"])
+    sku = normalize_barcodes(pd.Series(batches, dtype=object))["sku"]
+    sku_ids, skus = pd.factorize(sku)
+    # batch → SKU group id; missing batches and ones without digits → -1
+    group_of_batch = np.where(sku.to_numpy() != "", sku_ids, -1)
+    ids = np.append(group_of_batch, -1)[batch_codes]
+    keep = ids >= 0
+    ids, n = ids[keep], len(skus)
+
+    weight = pd.to_numeric(stones["Stone Weight"], errors="coerce")
+    cts = stone_weight_cts(weight, stones["Stone Units"])
+    pieces = pd.to_numeric(stones["Stone(No. of Pieces)"], errors="coerce").to_numpy(dtype=float)[keep]
+    amount = pd.to_numeric(stones["Stone Price"], errors="coerce").to_numpy(dtype=float)[keep]
+    unconverted = (weight.notna() & cts.isna()).to_numpy()[keep]
+
+    type_codes, type_norm = _labels(stones["Stone Type"])
+    # distinct normalized types get one id each; blanks and missing become -1
+    type_ids = np.append(np.where(type_norm != "", pd.factorize(type_norm)[0], -1), -1)[type_codes][keep]
+    typed = type_ids >= 0
+    width = int(type_ids.max()) + 1 if len(type_ids) else 1
+    pairs = pd.unique(ids[typed].astype(np.int64) * width + type_ids[typed])
+    n_types = np.bincount(pairs // width, minlength=n) if len(pairs) else np.zeros(n, dtype=int)
+
+    out = pd.DataFrame({
+        "SKU Code": np.asarray(skus, dtype=object),
+        "Stone Lines": np.bincount(ids, minlength=n),
+        "Total Stone Pieces": _group_sum(ids, pieces, n),
+        "Total Stone Weight (cts)": np.round(_group_sum(ids, cts.to_numpy(dtype=float)[keep], n), 4),
+        "Total Stone Amount": np.round(_group_sum(ids, amount, n), 2),
+        "Stone Types": n_types,
+        "Unconverted Weights": np.bincount(ids, weights=unconverted, minlength=n).astype(int),
+    })
+    # blank-SKU groups got no rows
+    out = out[out["Stone Lines"] > 0].reset_index(drop=True)
+    totals = out["Total Stone Pieces"]
+    if totals.notna().any() and (totals.dropna() % 1 == 0).all():
+        out["Total Stone Pieces"] = totals.astype("Int64")
+    return out[ROLLUP_COLUMNS]
+
+# ---------------------------------------------------------------------
+# 2. Join into the catalog output
+# ---------------------------------------------------------------------
+def fill_attributes(data: pd.DataFrame, rollup: pd.DataFrame,
+                    attributes: Dict[str, str] = None) -> pd.DataFrame:
+    """Fills catalog data-row columns (default: Attribute 1-4) from the rollup by
+    SKU Code. SKUs without stones get blanks. Returns a new frame."""
+    attributes = ROLLUP_ATTRIBUTES if attributes is None else attributes
+    pos = pd.Index(rollup["SKU Code"]).get_indexer(data["SKU Code"].astype(str).to_numpy())
+    hit = pos >= 0
+    data = data.copy()
+    for col, src in attributes.items():
+        values = np.full(len(data), "", dtype=object)
+        vals = rollup[src].astype(object).to_numpy()[pos[hit]]
+        values[hit] = np.where(pd.isna(vals), "", vals)
+        data[col] = values
+    return data
+
+def catalog_with_stones(catalog_data: pd.DataFrame, stone_input: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Rolls up a stone ERP frame and joins it into catalog data rows → (catalog rows, rollup)."""
+    stones, _ = transform_stone(stone_input, include_template=False)
+    rollup = rollup_stones(stones)
+    return fill_attributes(catalog_data, rollup), rollup
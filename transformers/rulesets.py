@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import string
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Catalog mapping rule sets. rules/builtin.json is the "builtin" set and the
+# default (one rule per catalog column); each other rules/<name>.json (or
+# .yaml / .yml with PyYAML) adds a set that overrides some columns of the set
+# it extends:
+#
+#   {"extends": "builtin", "collections": ["Garnet"],
+#    "columns": {"Tags Keyword": {"const": "garnet ring, ..."},
+#                "Product Name": {"source": "Article Description"},
+#                "Meta Title": {"template": "{Article Description} | CKC"},
+#                "SKU Code": {"derived": "sku_code"}}}
+#
+# A template row is blank when any field it uses is blank. "collections"
+# lists the Collection values the set is picked for in by-collection mode.
+BUILTIN = "builtin"
+BY_COLLECTION = "by-collection"
+RULE_KINDS: Tuple[str, ...] = ("source", "const", "template", "derived")
+SHIPPED_RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")
+BUILTIN_RULES_FILE = os.path.join(SHIPPED_RULES_DIR, f"{BUILTIN}.json")
+RULES_DIR = os.environ.get("CKC_RULES_DIR", SHIPPED_RULES_DIR)
+DEFAULT_RULES = os.environ.get("CKC_CATALOG_RULES", BUILTIN)
+
+# name → {"name", "extends", "collections", "columns", "source", "description"}
+RULE_SETS: Dict[str, Dict] = {}
+# problems found while loading rules/ (files that were skipped)
+RULE_ERRORS: List[str] = []
+
+_HEADERS: List[str] = []
+_FUNCTIONS: Dict[str, Callable] = {}
+_lock = threading.Lock()
+_loaded_dir: Optional[str] = None
+_plans: Dict[str, List[Tuple[str, str, object]]] = {}
+_templates: Dict[str, Callable] = {}
+
+# ---------------------------------------------------------------------
+# 1. Registration (builtin) and loading (rules/)
+# ---------------------------------------------------------------------
+def check_rule(col: str, rule) -> None:
+    if col not in _HEADERS:
+        raise ValueError(f"'{col}' is not a catalog column")
+    if not isinstance(rule, dict) or len(rule) != 1 or next(iter(rule)) not in RULE_KINDS:
+        raise ValueError(f"'{col}': a rule is one of {{{', '.join(RULE_KINDS)}: ...}}, got {rule!r}")
+    kind, arg = next(iter(rule.items()))
+    if kind == "derived" and arg not in _FUNCTIONS:
+        raise ValueError(f"'{col}': unknown derived function '{arg}' (available: {sorted(_FUNCTIONS)})")
+    if kind in ("source", "template") and not isinstance(arg, str):
+        raise ValueError(f"'{col}': {kind} must be a string")
+    if kind == "template":
+        for _, field, spec, conv in string.Formatter().parse(arg):
+            if field is not None and (not field or spec or conv):
+                raise ValueError(f"'{col}': template fields are plain column names, e.g. {{Metal Name}}")
+    if kind == "const" and isinstance(arg, (dict, list)):
+        raise ValueError(f"'{col}': const must be a single value")
+
+def register_builtin(headers: List[str], functions: Dict[str, Callable],
+                     path: str = BUILTIN_RULES_FILE) -> None:
+    """Registers the catalog's derived functions and the builtin rule set read
+    from path (rules/builtin.json); called by catalog.py. A bad file raises
+    ValueError, as nothing can be converted without it."""
+    _HEADERS[:] = headers
+    _FUNCTIONS.clear()
+    _FUNCTIONS.update(functions)
+    try:
+        spec = _read_rules_file(path)
+        columns = _check_spec(spec)
+    except (ValueError, OSError) as e:
+        raise ValueError(f"Builtin catalog rules {path}: {e}") from None
+    RULE_SETS[BUILTIN] = {"name": BUILTIN, "extends": None, "collections": [], "columns": dict(columns),
+                          "source": os.path.abspath(path), "description": spec.get("description", "")}
+    _plans.clear()
+
+def _read_rules_file(path: str) -> Dict:
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".json"):
+            return json.load(fh)
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML rule files need PyYAML (pip install pyyaml)") from None
+        try:
+            return yaml.safe_load(fh)
+        except yaml.YAMLError as e:
+            raise ValueError(f"invalid YAML: {e}") from None
+
+def _check_spec(spec) -> Dict[str, Dict]:
+    """The checked "columns" of a parsed rule file."""
+    if not isinstance(spec, dict) or not isinstance(spec.get("columns"), dict):
+        raise ValueError("expected an object with a 'columns' mapping")
+    for col, rule in spec["columns"].items():
+        check_rule(col, rule)
+    return spec["columns"]
+
+def load_rule_sets(rules_dir: Optional[str] = None, force: bool = False) -> None:
+    """Loads every rule file under rules_dir once (thread-safe); bad files go to RULE_ERRORS."""
+    global _loaded_dir
+    rules_dir = rules_dir or RULES_DIR
+    if BUILTIN not in RULE_SETS:
+        from . import catalog  # noqa: F401  (registers the builtin set and derived functions)
+    with _lock:
+        if _loaded_dir == rules_dir and not force:
+            return
+        for name in [n for n in RULE_SETS if n != BUILTIN]:
+            del RULE_SETS[name]
+        RULE_ERRORS.clear()
+        _plans.clear()
+        pending = {}
+        if os.path.isdir(rules_dir):
+            for entry in sorted(os.scandir(rules_dir), key=lambda e: e.name):
+                stem, ext = os.path.splitext(entry.name)
+                if not entry.is_file() or ext not in (".json", ".yaml", ".yml"):
+                    continue
+                if os.path.abspath(entry.path) == RULE_SETS[BUILTIN]["source"]:
+                    continue  # registered by catalog.py
+                try:
+                    spec = _read_rules_file(entry.path)
+                    _check_spec(spec)
+                    name = str(spec.get("name", stem))
+                    if name in (BUILTIN, BY_COLLECTION) or name in pending:
+                        raise ValueError(f"rule set name '{name}' is reserved or already used")
+                except (ValueError, OSError) as e:
+                    RULE_ERRORS.append(f"{entry.path}: {e}")
+                    continue
+                pending[name] = (entry.path, spec)
+        # resolve "extends" chains; sets whose base is missing (or circular) are skipped
+        while pending:
+            ready = [n for n, (_, spec) in pending.items() if spec.get("extends", BUILTIN) in RULE_SETS]
+            if not ready:
+                for name, (path, spec) in pending.items():
+                    RULE_ERRORS.append(f"{path}: extends unknown rule set '{spec.get('extends')}'")
+                break
+            for name in ready:
+                path, spec = pending.pop(name)
+                base = RULE_SETS[spec.get("extends", BUILTIN)]
+                RULE_SETS[name] = {"name": name, "extends": base["name"],
+                                   "collections": [str(c) for c in spec.get("collections", [])],
+                                   "columns": {**base["columns"], **spec["columns"]},
+                                   "source": path, "description": spec.get("description", "")}
+        _loaded_dir = rules_dir
+
+def rule_set_names() -> List[str]:
+    load_rule_sets()
+    return list(RULE_SETS)
+
+def get_rule_set(name: Optional[str] = None) -> Dict:
+    name = name or DEFAULT_RULES
+    if name != BUILTIN:
+        load_rule_sets()
+    try:
+        return RULE_SETS[name]
+    except KeyError:
+        raise ValueError(f"Unknown catalog rule set '{name}' (available: {rule_set_names()})") from None
+
+def rules_fingerprint(name: Optional[str] = None) -> str:
+    """Hash of the rules a choice resolves to (cache keys; by-collection covers every set)."""
+    name = name or DEFAULT_RULES
+    if name == BY_COLLECTION:
+        load_rule_sets()
+        sets = list(RULE_SETS.values())
+    else:
+        sets = [get_rule_set(name)]
+    payload = json.dumps([name] + [[s["name"], s["collections"], s["columns"]] for s in sets],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+# ---------------------------------------------------------------------
+# 2. Compilation into a column plan
+# ---------------------------------------------------------------------
+# Generated text is formatted once per distinct key and kept as a categorical
+# (one copy of each string + an integer code per row) until it is written;
+# to_csv prints the same text. Long constants get the same treatment.
+CATEGORICAL_MIN_LENGTH = 32
+
+def _field_codes(col: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(code per row, stripped text per code); missing values get the last code, text ""."""
+    codes, uniques = pd.factorize(col)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    return np.where(codes < 0, len(uniques), codes), np.append(text, "")
+
+def text_column(codes: np.ndarray, texts, index: pd.Index) -> pd.Series:
+    """Categorical Series whose row i reads texts[codes[i]] (texts may repeat)."""
+    remap, categories = pd.factorize(np.asarray(texts, dtype=object))
+    return pd.Series(pd.Categorical.from_codes(remap[codes], categories=categories), index=index)
+
+def text_constant(value, index: pd.Index):
+    """A long text constant as a one-category categorical; other values stay scalars."""
+    if isinstance(value, str) and len(value) >= CATEGORICAL_MIN_LENGTH:
+        return text_column(np.zeros(len(index), dtype=np.int8), [value], index)
+    return value
+
+def compile_template(template: str) -> Callable[[pd.DataFrame, Dict], object]:
+    """Template fill: "{Column}" placeholders take the row's stripped text; rows
+    where any placeholder is blank (or its column is absent) get "".
+
+    The fields' distinct values are combined into one integer key per row and
+    the template is formatted once per distinct key, so a handful of metals
+    means a handful of format calls however many rows there are.
+    """
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+    fields = list(dict.fromkeys(f for _, f in parts if f is not None))
+    literal_text = "".join(literal for literal, _ in parts)
+
+    def fill(values: Dict[str, str]) -> str:
+        return "".join(literal + (values[field] if field is not None else "") for literal, field in parts)
+
+    def derive(df: pd.DataFrame, ctx: Dict):
+        if not fields:
+            return text_constant(literal_text, df.index)
+        if any(f not in df.columns for f in fields):
+            return ""
+        per_field = [_field_codes(df[f]) for f in fields]
+        key = per_field[0][0]
+        for codes, text in per_field[1:]:
+            # stays below rows * distinct values, so it cannot overflow
+            key = pd.factorize(key * len(text) + codes)[0]
+        combo, _ = pd.factorize(key)
+        first = np.empty(combo.max() + 1 if len(combo) else 0, dtype=np.int64)
+        first[combo[::-1]] = np.arange(len(combo) - 1, -1, -1)
+        values = [text[codes[first]] for codes, text in per_field]
+        filled = [fill(dict(zip(fields, vals))) if all(vals) else "" for vals in zip(*values)]
+        return text_column(combo, filled, df.index)
+
+    derive.inputs = fields
+    return derive
+
+def compile_rule_set(name: Optional[str] = None) -> List[Tuple[str, str, object]]:
+    """(header, kind, arg) for every catalog column, as build_catalog_rows runs it.
+
+    kind is "source" (arg = ERP column), "const" (arg = value) or "derived"
+    (arg = function of (df, ctx)); templates compile to derived functions.
+    Compiled once per rule set.
+    """
+    rule_set = get_rule_set(name)
+    if rule_set["name"] not in _plans:
+        plan = []
+        for col in _HEADERS:
+            kind, arg = next(iter(rule_set["columns"].get(col, {"const": ""}).items()))
+            if kind == "template":
+                # one function per template text, so sets sharing a rule share its step
+                if arg not in _templates:
+                    _templates[arg] = compile_template(arg)
+                kind, arg = "derived", _templates[arg]
+            elif kind == "derived":
+                arg = _FUNCTIONS[arg]
+            plan.append((col, kind, arg))
+        _plans[rule_set["name"]] = plan
+    return _plans[rule_set["name"]]
+
+def plan_inputs(plan: List[Tuple[str, str, object]]) -> List[str]:
+    """ERP columns a plan reads through source and template steps."""
+    cols = []
+    for _, kind, arg in plan:
+        if kind == "source":
+            cols.append(arg)
+        elif kind == "derived":
+            cols += getattr(arg, "inputs", [])
+    return list(dict.fromkeys(cols))
+
+# ---------------------------------------------------------------------
+# 3. Picking a rule set per row (by-collection)
+# ---------------------------------------------------------------------
+def collection_routing(df: pd.DataFrame, default: Optional[str] = None) -> Tuple[List[str], np.ndarray]:
+    """(rule set names, index into them per row) from each row's Collection.
+
+    A row gets the first set listing its Collection (case-insensitive);
+    other rows, and every row when there is no Collection column, get the
+    default set. Matching is done once per distinct Collection value.
+    """
+    default = get_rule_set(default)["name"]
+    load_rule_sets()
+    by_value = {}
+    for rule_set in RULE_SETS.values():
+        for value in rule_set["collections"]:
+            by_value.setdefault(value.strip().casefold(), rule_set["name"])
+    names = [default] + [n for n in dict.fromkeys(by_value.values()) if n != default]
+    if "Collection" not in df.columns or not by_value:
+        return [default], np.zeros(len(df), dtype=np.int64)
+    codes, uniques = pd.factorize(df["Collection"])
+    pos = {n: i for i, n in enumerate(names)}
+    per_value = [pos[by_value.get(str(u).strip().casefold(), default)] for u in uniques]
+    choice = np.append(np.asarray(per_value, dtype=np.int64), 0)[codes]
+    return names, choice
@@ -1,7 +1,11 @@
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import pandas as pd
 from .common import validate_stone_input
+from .integrity import DatasetIndex, integrity_errors
+from .profiling import stage
+from .templates import meta_frame, register_template
+from .validation import merge_errors
 
 STONE_HEADERS: List[str] = [
   "SKU_Code_Bar_Code",
@@ -91,30 +95,39 @@ STONE_TEMPLATE_ROWS: List[Dict[str, str]] = [
   }
 ]
 
-def transform_stone(input_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    df, err = validate_stone_input(input_df.copy())
-    out = pd.DataFrame(columns=STONE_HEADERS)
-    meta = pd.DataFrame(STONE_TEMPLATE_ROWS)
-    out = pd.concat([meta, out], ignore_index=True)
+register_template("stone", "ProductStoneBulkUpload.csv", STONE_HEADERS, STONE_TEMPLATE_ROWS)
 
-    mapped = pd.DataFrame({
-        'SKU_Code_Bar_Code': df['Main Batch Number'],
-        'Stone Number': df['Stone Batch Number'],
-        'Stone Type': df['Article Type'],
-        'Stone Name': df['Article Description'],
-        'Stone Description': df['Article Description'],
-        'Stone(No. of Pieces)': df['Stone  No. of Pieces'],
-        'Stone Origin': df['Stone Origin'],
-        'Stone Appearance': df['Stone Appearance'],
-        'Stone Shape': df['Stone Shape'],
-        'Stone Weight': df['Stone Weight'],
-        'Stone Units': df['Stone Units'],
-        'Stone Cut': df['Stone Cut'],
-        'Stone Clarity': df['Stone Clarity'],
-        'Stone Color': df['Stone Color'],
-        'Stone Price': df['Stone Amount']
-    })
-    for c in ['Stone(No. of Pieces)', 'Stone Weight', 'Stone Price']:
-        mapped[c] = pd.to_numeric(mapped[c], errors='coerce')
-    out = pd.concat([out, mapped], ignore_index=True)
+def transform_stone(input_df: pd.DataFrame, include_template: bool = True,
+                    index: Optional[DatasetIndex] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    n = len(input_df)
+    # read-only use of the input, so the frame can be shared across workflows without a copy
+    with stage("stone.validate", n):
+        df, err = validate_stone_input(input_df)
+        # duplicate / colliding SKUs (index carries keys across streaming batches)
+        err = merge_errors(err, integrity_errors(df, "stone", index))
+
+    with stage("stone.map", n):
+        mapped = pd.DataFrame({
+            'SKU_Code_Bar_Code': df['Main Batch Number'],
+            'Stone Number': df['Stone Batch Number'],
+            'Stone Type': df['Article Type'],
+            'Stone Name': df['Article Description'],
+            'Stone Description': df['Article Description'],
+            'Stone(No. of Pieces)': df['Stone  No. of Pieces'],
+            'Stone Origin': df['Stone Origin'],
+            'Stone Appearance': df['Stone Appearance'],
+            'Stone Shape': df['Stone Shape'],
+            'Stone Weight': df['Stone Weight'],
+            'Stone Units': df['Stone Units'],
+            'Stone Cut': df['Stone Cut'],
+            'Stone Clarity': df['Stone Clarity'],
+            'Stone Color': df['Stone Color'],
+            'Stone Price': df['Stone Amount']
+        })
+        for c in ['Stone(No. of Pieces)', 'Stone Weight', 'Stone Price']:
+            mapped[c] = pd.to_numeric(mapped[c], errors='coerce')
+    if not include_template:
+        return mapped, err
+    with stage("stone.assemble", n):
+        out = pd.concat([meta_frame("stone"), mapped], ignore_index=True)
     return out, err
@@ -0,0 +1,442 @@
+import html
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+from .common import barcode_width
+from .workflows import dataset_index, get_workflow, transform_options
+from .ingest import column_dtypes, required_columns
+from .templates import header_text, open_output
+from .validation import ERROR_COLUMNS, empty_errors
+
+DEFAULT_BATCH_SIZE = 5000
+
+# ---------------------------------------------------------------------
+# 1. Batched sheet reader
+# ---------------------------------------------------------------------
+def _convert_cell(cell):
+    # Same cell conversion pd.read_excel applies with the openpyxl engine
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC and not isinstance(cell.value, bool):
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _to_frame(header: List, rows: List[List], start: int,
+              columns: Optional[List[str]] = None, dtype: Optional[Dict] = None) -> pd.DataFrame:
+    width = len(header)
+    rows = [r[:width] + [""] * (width - len(r)) for r in rows]
+    # TextParser is what read_excel uses, so dtype inference matches per batch
+    usecols = (lambda c: c in columns) if columns is not None else None
+    df = TextParser([header] + rows, header=0, usecols=usecols, dtype=dtype).read()
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+def _header(rows_iter) -> Optional[List]:
+    # first non-blank row (as read_excel skips leading blank rows), trailing blanks trimmed
+    for row in rows_iter:
+        values = [_convert_cell(c) for c in row]
+        if any(v != "" for v in values):
+            while values and values[-1] == "":
+                values.pop()
+            return values
+    return None
+
+def read_headers(source) -> Dict[str, List]:
+    """{sheet name: header row} for every sheet, reading only the rows up to each header."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        return {ws.title: _header(ws.iter_rows()) or [] for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+def iter_excel_batches(source, sheet_name: Optional[str] = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       columns: Optional[List[str]] = None,
+                       dtype: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+    """Yields the sheet as DataFrames of at most batch_size rows.
+
+    columns limits the batches to those ERP columns (missing ones are ignored)
+    and dtype pins column types, as in the ingestion layer.
+
+    The workbook is opened read-only, so only one batch of rows is held in
+    memory at a time. Batch indexes continue from the previous batch, so
+    validation errors carry the same row numbers as a whole-sheet read.
+
+    Dtypes are inferred per batch; profile_sheet() + DatasetProfile.apply()
+    give the batches the dtypes of the whole sheet.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows_iter = ws.iter_rows()
+        header = _header(rows_iter)
+        if header is None:
+            return
+
+        batch: List[List] = []
+        pending_blank = 0
+        start = 0
+        for row in rows_iter:
+            values = [_convert_cell(c) for c in row]
+            if all(v == "" for v in values):
+                # Blank rows only count when more data follows (read_excel trims trailing ones)
+                pending_blank += 1
+                continue
+            batch.extend([[]] * pending_blank)
+            pending_blank = 0
+            batch.append(values)
+            if len(batch) >= batch_size:
+                yield _to_frame(header, batch, start, columns, dtype)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield _to_frame(header, batch, start, columns, dtype)
+    finally:
+        wb.close()
+
+# ---------------------------------------------------------------------
+# 2. Dataset profile (pre-pass)
+# ---------------------------------------------------------------------
+_ROW = re.compile(rb"<(?:\w+:)?row\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?row>)", re.S)
+_ROW_NUM = re.compile(rb'\br="(\d+)"')
+_CELL = re.compile(rb'<(?:\w+:)?c\b(?=[^>]*\br="([A-Z]+)\d+")([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)', re.S)
+_CELL_NO_REF = re.compile(rb'<(?:\w+:)?c\b(?![^>]*\br=")')
+_CELL_TYPE = re.compile(rb'\bt="(\w+)"')
+_CELL_STYLE = re.compile(rb'\bs="(\d+)"')
+_VALUE = re.compile(rb"<(?:\w+:)?v>(.*?)</(?:\w+:)?v>", re.S)
+_TEXT = re.compile(rb"<(?:\w+:)?t\b[^>]*>(.*?)</(?:\w+:)?t>", re.S)
+_HAS_VALUE = re.compile(rb"<(?:\w+:)?(?:v|is)>")
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_ID_ATTR = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_SCAN_CHUNK = 1 << 22
+
+class _Unsupported(Exception):
+    """The sheet XML is not in the shape the fast scan reads; openpyxl reads it instead."""
+
+def _column_letters(n: int) -> str:
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def _column_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+class _Dates:
+    """Which cell styles openpyxl reads as dates / durations, and the workbook's epoch."""
+    def __init__(self, zf: zipfile.ZipFile, book: ET.Element):
+        self.styles: set = set()
+        self.timedelta_styles: set = set()
+        pr = book.find(f"{_MAIN_NS}workbookPr")
+        self.epoch = (CALENDAR_MAC_1904 if pr is not None and pr.get("date1904") in ("1", "true")
+                      else CALENDAR_WINDOWS_1900)
+        if "xl/styles.xml" in zf.namelist():
+            # openpyxl's own stylesheet parser indexes the date formats exactly as its reader does
+            sheet = Stylesheet.from_tree(ET.fromstring(zf.read("xl/styles.xml")))
+            self.styles, self.timedelta_styles = sheet.date_formats, sheet.timedelta_formats
+
+    def convert(self, attrs: bytes, num):
+        style = _CELL_STYLE.search(attrs) if self.styles else None
+        if style is None or int(style.group(1)) not in self.styles:
+            return num
+        try:
+            return from_excel(num, self.epoch, timedelta=int(style.group(1)) in self.timedelta_styles)
+        except (OverflowError, ValueError):
+            return np.nan  # openpyxl turns an out-of-range date into an error cell
+
+def _scan_value(attrs: bytes, inner: bytes, strings: List[str], dates: _Dates):
+    # the value _convert_cell gives the same cell through openpyxl
+    kind = _CELL_TYPE.search(attrs)
+    kind = kind.group(1) if kind else b"n"
+    if kind == b"inlineStr":
+        return html.unescape(b"".join(_TEXT.findall(inner)).decode("utf-8"))
+    v = _VALUE.search(inner)
+    if v is None or kind == b"e":
+        return "" if v is None else np.nan
+    raw = v.group(1).decode("utf-8")
+    if kind == b"s":
+        return strings[int(raw)]
+    if kind == b"str":
+        return html.unescape(raw)
+    if kind == b"b":
+        return bool(int(raw))
+    if kind == b"d":
+        return from_ISO8601(raw)
+    if kind != b"n":
+        raise _Unsupported(kind)
+    num = float(raw) if any(ch in raw for ch in ".eE") else int(raw)
+    num = dates.convert(attrs, num)
+    if not isinstance(num, (int, float)) or num != num:
+        return num
+    val = int(num)
+    return val if val == num else float(num)
+
+def _sheet_parts(zf: zipfile.ZipFile, sheet_name: Optional[str]) -> Tuple[str, Optional[str], _Dates]:
+    # (worksheet part, shared strings part, date styles) from the workbook and its relationships
+    try:
+        book = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    except KeyError:
+        raise _Unsupported("no xl/workbook.xml")
+    targets, strings = {}, None
+    for rel in rels.iter(f"{_REL_NS}Relationship"):
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+        if rel.get("Type", "").endswith("/sharedStrings"):
+            strings = target
+    sheets = [(s.get("name"), targets.get(s.get(_ID_ATTR))) for s in book.iter(f"{_MAIN_NS}sheet")]
+    if not sheets:
+        raise _Unsupported("no sheets")
+    part = dict(sheets).get(sheet_name) if sheet_name else sheets[0][1]
+    if part is None:
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+    return part, strings, _Dates(zf, book)
+
+def _scan_sheet_batches(source, sheet_name: Optional[str] = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        columns: Optional[List[str]] = None,
+                        dtype: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+    # iter_excel_batches for the pre-pass: the sheet XML is scanned with
+    # regexes for the wanted columns only (openpyxl builds every cell, ~50x
+    # slower). Raises _Unsupported for cells without an r="A1" reference.
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as zf:
+        part, strings_part, dates = _sheet_parts(zf, sheet_name)
+        strings: List[str] = []
+        if strings_part and strings_part in zf.namelist():
+            with zf.open(strings_part) as fh:
+                strings = [str(t) for t in read_string_table(fh)]
+        names: Optional[List] = None
+        cell = None
+        batch: List[List] = []
+        pending_blank = 0
+        start = 0
+        last_row = 0
+        with zf.open(part) as fh:
+            buf = b""
+            while True:
+                data = fh.read(_SCAN_CHUNK)
+                buf += data
+                end = 0
+                for m in _ROW.finditer(buf):
+                    end = m.end()
+                    attrs, body = m.group(1), m.group(2) or b""
+                    num = _ROW_NUM.search(attrs)
+                    row_num = int(num.group(1)) if num else last_row + 1
+                    gap, last_row = row_num - last_row - 1, row_num
+                    if _CELL_NO_REF.search(body):
+                        raise _Unsupported("cell without a reference")
+                    if names is None:
+                        if not _HAS_VALUE.search(body):
+                            continue
+                        header = {}
+                        for c in _CELL.finditer(body):
+                            header[c.group(1).decode()] = _scan_value(c.group(2), c.group(3) or b"", strings, dates)
+                        width = max((_column_index(k) for k, v in header.items() if v != ""), default=0)
+                        row = [header.get(_column_letters(i), "") for i in range(1, width + 1)]
+                        # first occurrence of each wanted name, as read_excel's usecols keeps it
+                        wanted: Dict[str, int] = {}
+                        for i, name in enumerate(row):
+                            if (columns is None or name in columns) and name not in wanted and name != "":
+                                wanted[name] = i
+                        names = list(wanted)
+                        letters = {_column_letters(i + 1).encode(): pos for pos, i in enumerate(wanted.values())}
+                        alternation = b"|".join(letters) or b"(?!)"
+                        cell = re.compile(rb'<(?:\w+:)?c\b(?=[^>]*\br="(' + alternation + rb')\d+")'
+                                          rb"([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)", re.S)
+                        continue
+                    pending_blank += gap
+                    if not _HAS_VALUE.search(body):
+                        pending_blank += 1
+                        continue
+                    values = [""] * len(names)
+                    for c in cell.finditer(body):
+                        values[letters[c.group(1)]] = _scan_value(c.group(2), c.group(3) or b"", strings, dates)
+                    batch.extend([[""] * len(names)] * pending_blank)
+                    pending_blank = 0
+                    batch.append(values)
+                    if len(batch) >= batch_size:
+                        yield _to_frame(names, batch, start, None, dtype)
+                        start += len(batch)
+                        batch = []
+                buf = buf[end:]
+                if not data:
+                    break
+        if batch:
+            yield _to_frame(names, batch, start, None, dtype)
+
+def _combine_dtypes(a, b):
+    # the dtype one read infers for a column whose parts inferred a and b
+    if a == b:
+        return a
+    numeric = [pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in (a, b)]
+    return np.dtype(float) if all(numeric) else np.dtype(object)
+
+def _cast(col: pd.Series, dtype) -> pd.Series:
+    if dtype == object:
+        if pd.api.types.is_datetime64_any_dtype(col):
+            # the reader's datetime objects (printed with their time), blanks as NaN
+            out = pd.Series(np.asarray(col.dt.to_pydatetime(), dtype=object), index=col.index, dtype=object)
+            return out.where(col.notna(), np.nan)
+        out = col.astype(object)
+        if pd.api.types.is_float_dtype(col):
+            # an object column from one read keeps whole numbers as int, as the readers give them
+            whole = col.notna() & (col % 1 == 0) & (col.abs() < 2 ** 53)
+            out[whole] = pd.Series(col[whole].astype(np.int64).tolist(), index=col.index[whole], dtype=object)
+        return out
+    try:
+        return col.astype(dtype)
+    except (TypeError, ValueError):
+        return col
+
+class DatasetProfile:
+    """Dtypes and barcode pad width of a whole dataset, gathered batch by batch.
+
+    A whole-sheet read infers each column's dtype from all of its values and
+    pads exact barcodes to the longest one; a batch only sees its own rows
+    (an all-integer batch reads as int64 where the sheet is float64). add()
+    combines batches as one read would, apply() casts a batch to the result.
+    """
+    def __init__(self):
+        self.dtypes: Dict[str, object] = {}
+        self.barcode_width: Optional[int] = None
+        # data rows of the sheets profiled so far (counted by profile_sheet)
+        self.rows = 0
+        self._na: set = set()
+
+    def add(self, df: pd.DataFrame) -> None:
+        for c in df.columns:
+            col = df[c]
+            if col.isna().all():
+                # an all-blank batch says nothing about the type, only that blanks occur
+                self._na.add(c)
+                self.dtypes.setdefault(c, None)
+                continue
+            if col.hasnans:
+                self._na.add(c)
+            prev = self.dtypes.get(c)
+            self.dtypes[c] = col.dtype if prev is None else _combine_dtypes(prev, col.dtype)
+        if "Bar Code" in df.columns:
+            width = barcode_width(df["Bar Code"])
+            self.barcode_width = max(width, self.barcode_width or 0)
+
+    def dtype(self, column: str):
+        """The dtype one read of the whole dataset gives column (None if never seen with values)."""
+        dtype = self.dtypes.get(column)
+        if dtype is None or column not in self._na:
+            return dtype
+        if pd.api.types.is_integer_dtype(dtype):
+            return np.dtype(float)
+        return np.dtype(object) if pd.api.types.is_bool_dtype(dtype) else dtype
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Casts each column of a batch to the dataset's dtype."""
+        for c in df.columns:
+            dtype = self.dtype(c)
+            if dtype is not None and df[c].dtype != dtype:
+                df[c] = _cast(df[c], dtype)
+        return df
+
+def profile_sheet(source, sheet_name: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                  columns: Optional[List[str]] = None, dtype: Optional[Dict] = None,
+                  profile: Optional[DatasetProfile] = None,
+                  rename: Optional[Dict[str, str]] = None) -> DatasetProfile:
+    """Pre-pass over one sheet: adds its batches to profile (a new one if None) and returns it.
+
+    The sheet XML is scanned directly for the wanted columns, a fraction of
+    the time openpyxl takes; workbooks the scan does not support are read
+    with iter_excel_batches instead. rename maps sheet column names to the
+    names the profile records (merge.py profiles several sheets as one).
+    """
+    profile = profile if profile is not None else DatasetProfile()
+    rows = 0
+    try:
+        for df in _scan_sheet_batches(source, sheet_name, batch_size, columns, dtype):
+            profile.add(df.rename(columns=rename) if rename else df)
+            rows = df.index[-1] + 1 if len(df) else rows
+    except (_Unsupported, zipfile.BadZipFile, ET.ParseError):
+        # re-adding batches the scan already gave is harmless: add() is idempotent
+        for df in iter_excel_batches(source, sheet_name, batch_size, columns, dtype):
+            profile.add(df.rename(columns=rename) if rename else df)
+            rows = df.index[-1] + 1 if len(df) else rows
+    profile.rows += rows
+    return profile
+
+# ---------------------------------------------------------------------
+# 3. Streaming transform → incremental CSV
+# ---------------------------------------------------------------------
+def stream_transform(source, workflow: str, out, sheet_name: Optional[str] = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     template_version: Optional[str] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     rules: Optional[str] = None,
+                     references: Optional[Dict[str, pd.Index]] = None) -> Tuple[int, pd.DataFrame]:
+    """Reads source in batches, transforms each and appends it to the CSV at out.
+
+    out is a path (gzip when it ends in .gz) or a text file object. The
+    pre-serialized template header block is written once up front; every
+    batch after that is data rows only. Returns the number of data rows
+    written and the combined validation error frame; progress, if given, is
+    called with the running row count and the sheet's total (from the
+    pre-pass) after every batch. rules picks the
+    catalog rule set; references ({workflow key: SKU codes}) the datasets
+    rows are checked against (workflows.dataset_index).
+
+    A cheap pre-pass over the sheet (profile_sheet) fixes column dtypes and
+    the barcode pad width first, so the CSV equals a whole-sheet conversion.
+    """
+    wf = get_workflow(workflow)
+    columns = required_columns(workflow)
+    dtypes = column_dtypes(columns)
+    # pre-pass: whole-sheet dtypes and barcode pad width, so batches print as one read would
+    profile = profile_sheet(source, sheet_name, batch_size, columns, dtypes)
+    options = transform_options(workflow, rules, profile.barcode_width)
+    close = False
+    if isinstance(out, str):
+        out = open_output(out)
+        close = True
+    errors = []
+    n_rows = 0
+    try:
+        out.write(header_text(wf["key"], template_version))
+        # one SKU index for the whole file, so duplicates across batches are found too
+        index = dataset_index(workflow, references)
+        for batch in iter_excel_batches(source, sheet_name=sheet_name, batch_size=batch_size,
+                                        columns=columns, dtype=dtypes):
+            mapped, err = wf["transform"](profile.apply(batch), include_template=False, index=index, **options)
+            mapped.to_csv(out, index=False, header=False)
+            n_rows += len(mapped)
+            if progress is not None:
+                progress(n_rows, profile.rows)
+            if not err.empty:
+                errors.append(err)
+    finally:
+        if close:
+            out.close()
+    err_df = pd.concat(errors, ignore_index=True)[ERROR_COLUMNS] if errors else empty_errors()
+    return n_rows, err_df
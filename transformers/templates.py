@@ -0,0 +1,199 @@
+import csv
+import gzip
+import os
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+
+# The Python constants in price.py / stone.py / catalog.py are the "builtin"
+# version and the default. CSVs under templates/ add more versions: files in
+# templates/ itself are version "disk", files in templates/<name>/ are version
+# <name>. Pick one with CKC_TEMPLATE_VERSION or per call.
+BUILTIN = "builtin"
+ROOT_VERSION = "disk"
+TEMPLATE_DIR = os.environ.get(
+    "CKC_TEMPLATE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"))
+DEFAULT_VERSION = os.environ.get("CKC_TEMPLATE_VERSION", BUILTIN)
+
+# version → workflow key → {"key", "version", "filename", "headers", "rows", "source", "notes"}
+TEMPLATES: Dict[str, Dict[str, Dict]] = {BUILTIN: {}}
+# problems found while loading templates/ (files that were skipped)
+TEMPLATE_ERRORS: List[str] = []
+
+_lock = threading.Lock()
+_loaded_dir: Optional[str] = None
+_serialized: Dict[tuple, Dict] = {}
+
+# ---------------------------------------------------------------------
+# 1. Registration (builtin) and loading (templates/)
+# ---------------------------------------------------------------------
+def register_template(key: str, filename: str, headers: List[str], rows: List[Dict]) -> None:
+    """Registers a workflow's builtin headers and metadata rows; called by each transform module."""
+    TEMPLATES[BUILTIN][key] = {"key": key, "version": BUILTIN, "filename": filename,
+                               "headers": list(headers), "rows": rows, "source": "builtin", "notes": []}
+
+def read_template_csv(path: str, builtin: Dict) -> Dict:
+    """Reads header + metadata rows from a template CSV and checks them against builtin.
+
+    The header must match the builtin headers exactly (the transforms produce
+    those columns). The metadata block has the builtin number of rows; any
+    further rows in the file (e.g. sample products) are ignored and noted.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        lines = list(csv.reader(fh))
+    if not lines:
+        raise ValueError(f"{path}: empty template")
+    headers, body = lines[0], lines[1:]
+    if headers != builtin["headers"]:
+        missing = [h for h in builtin["headers"] if h not in headers]
+        extra = [h for h in headers if h not in builtin["headers"]]
+        raise ValueError(f"{path}: headers differ from the builtin template "
+                         f"(missing {missing}, unexpected {extra}, or reordered)")
+    n = len(builtin["rows"])
+    if len(body) < n:
+        raise ValueError(f"{path}: expected {n} metadata rows, found {len(body)}")
+    for i, row in enumerate(body[:n]):
+        if len(row) != len(headers):
+            raise ValueError(f"{path}: metadata row {i + 1} has {len(row)} cells, expected {len(headers)}")
+    rows = [dict(zip(headers, row)) for row in body[:n]]
+    notes = []
+    if len(body) > n:
+        notes.append(f"{len(body) - n} row(s) after the {n} metadata rows ignored")
+    changed = sum(1 for a, b in zip(rows, builtin["rows"])
+                  if any(str(a[h]) != str(b.get(h, "")) for h in headers))
+    if changed:
+        notes.append(f"{changed} of {n} metadata rows differ from builtin")
+    return {"key": builtin["key"], "filename": builtin["filename"], "headers": headers,
+            "rows": rows, "source": path, "notes": notes}
+
+def load_templates(template_dir: Optional[str] = None, force: bool = False) -> None:
+    """Loads every template version under template_dir once (thread-safe)."""
+    global _loaded_dir
+    template_dir = template_dir or TEMPLATE_DIR
+    if not TEMPLATES[BUILTIN]:
+        from . import workflows  # noqa: F401  (each transform module registers its builtin template)
+    with _lock:
+        if _loaded_dir == template_dir and not force:
+            return
+        for version in [v for v in TEMPLATES if v != BUILTIN]:
+            del TEMPLATES[version]
+        TEMPLATE_ERRORS.clear()
+        _serialized.clear()
+        if os.path.isdir(template_dir):
+            dirs = [(ROOT_VERSION, template_dir)] + sorted(
+                (e.name, e.path) for e in os.scandir(template_dir) if e.is_dir() and not e.name.startswith("."))
+            for version, path in dirs:
+                for key, builtin in TEMPLATES[BUILTIN].items():
+                    fpath = os.path.join(path, builtin["filename"])
+                    if not os.path.isfile(fpath):
+                        continue
+                    try:
+                        tpl = read_template_csv(fpath, builtin)
+                    except (ValueError, OSError, csv.Error) as e:
+                        TEMPLATE_ERRORS.append(str(e))
+                        continue
+                    TEMPLATES.setdefault(version, {})[key] = dict(tpl, version=version)
+        _loaded_dir = template_dir
+
+# ---------------------------------------------------------------------
+# 2. Lookup and pre-serialized header blocks
+# ---------------------------------------------------------------------
+def template_versions(key: Optional[str] = None) -> List[str]:
+    load_templates()
+    return [v for v, tpls in TEMPLATES.items() if key is None or key in tpls]
+
+def template_notes(version: Optional[str] = None) -> List[str]:
+    """"<file>: <note>" for each template of a version (default CKC_TEMPLATE_VERSION)
+    that was loaded but differs from builtin, e.g. in its metadata rows."""
+    version = version or DEFAULT_VERSION
+    if version != BUILTIN:
+        load_templates()
+    return [f"{tpl['source']}: {note}" for tpl in TEMPLATES.get(version, {}).values() for note in tpl["notes"]]
+
+def get_template(key: str, version: Optional[str] = None) -> Dict:
+    """Template for a workflow key; version defaults to CKC_TEMPLATE_VERSION (builtin)."""
+    version = version or DEFAULT_VERSION
+    if version != BUILTIN:
+        load_templates()
+    try:
+        return TEMPLATES[version][key]
+    except KeyError:
+        raise ValueError(f"No '{version}' template for workflow '{key}' "
+                         f"(available: {template_versions(key)})") from None
+
+def _serialize(key: str, version: Optional[str]) -> Dict:
+    tpl = get_template(key, version)
+    cache_key = (key, tpl["version"])
+    if cache_key not in _serialized:
+        meta = pd.DataFrame(tpl["rows"], columns=tpl["headers"])
+        text = meta.to_csv(index=False)
+        _serialized[cache_key] = {"meta": meta, "text": text, "bytes": text.encode("utf-8")}
+    return _serialized[cache_key]
+
+def meta_frame(key: str, version: Optional[str] = None) -> pd.DataFrame:
+    """The metadata rows as a DataFrame, built once per template version (treat as read-only)."""
+    return _serialize(key, version)["meta"]
+
+def header_text(key: str, version: Optional[str] = None) -> str:
+    """CSV text of the column header plus metadata rows, exactly as to_csv writes them."""
+    return _serialize(key, version)["text"]
+
+def header_bytes(key: str, version: Optional[str] = None) -> bytes:
+    return _serialize(key, version)["bytes"]
+
+# ---------------------------------------------------------------------
+# 3. Output writing
+# ---------------------------------------------------------------------
+# Data rows stay typed (numeric columns are formatted by pandas' C writer);
+# the header block is prepended as pre-serialized text/bytes and the rows are
+# written in chunks, so no combined meta + data frame is ever built.
+DEFAULT_CHUNK_ROWS = 50_000
+
+def open_output(path: str, compression: Optional[str] = None):
+    """Text handle for an output CSV; gzip when asked for or when path ends in .gz."""
+    if compression is None and path.endswith(".gz"):
+        compression = "gzip"
+    if compression == "gzip":
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    if compression:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return open(path, "w", newline="", encoding="utf-8")
+
+def write_output(data: pd.DataFrame, key: str, out, version: Optional[str] = None,
+                 compression: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    """Writes header block + data rows (no template rows) as the upload CSV.
+
+    out is a path (gzip if compression="gzip" or it ends in .gz) or a text
+    file object. The output is byte-identical to to_csv of the full
+    transform result.
+    """
+    close = False
+    if isinstance(out, str):
+        out = open_output(out, compression)
+        close = True
+    try:
+        out.write(header_text(key, version))
+        data.to_csv(out, index=False, header=False, chunksize=chunk_rows)
+    finally:
+        if close:
+            out.close()
+
+def iter_output(data: pd.DataFrame, key: str, version: Optional[str] = None,
+                compression: Optional[str] = None,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """The upload CSV as a stream of byte chunks (header block, then chunk_rows rows at a time)."""
+    gz = zlib.compressobj(wbits=31) if compression == "gzip" else None
+    if compression not in (None, "gzip"):
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    def emit(chunk: bytes) -> bytes:
+        return gz.compress(chunk) if gz else chunk
+
+    yield emit(header_bytes(key, version))
+    for start in range(0, len(data), chunk_rows):
+        text = data.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+        yield emit(text.encode("utf-8"))
+    if gz:
+        yield gz.flush()
@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+ERROR_COLUMNS: List[str] = ['row', 'field', 'issue']
+
+# ---------------------------------------------------------------------
+# 1. Column checks
+# ---------------------------------------------------------------------
+# Each check takes a whole column and returns a boolean mask that is True
+# for the rows that FAIL the check. No per-row Python on the hot path.
+
+def _as_text(col: pd.Series) -> pd.Series:
+    # Same text the old per-row code saw via str(value); newer pandas keeps
+    # missing values as NA in astype(str), so spell them out ('nan', 'None').
+    text = col.astype(str).astype(object)
+    na = col.isna()
+    if na.any():
+        text[na] = col[na].map(str)
+    return text
+
+def check_missing(col: pd.Series) -> pd.Series:
+    return col.isna()
+
+def check_barcode8(col: pd.Series) -> pd.Series:
+    # Bar Code should resolve to 8 digits: the last 8 digits of the value must
+    # exist, i.e. the value carries at least 8 digits once non-digits are dropped.
+    digits = _as_text(col).str.replace(r"\D", "", regex=True)
+    return digits.str.len() < 8
+
+def check_no_digits(col: pd.Series) -> pd.Series:
+    # Present but without a single digit (missing values are left to check_missing)
+    digits = _as_text(col).str.replace(r"\D", "", regex=True)
+    return col.notna() & (digits.str.len() == 0)
+
+def check_numeric(col: pd.Series) -> pd.Series:
+    # Equivalent of float(str(val).replace(',', '')) succeeding.
+    if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+        return pd.Series(False, index=col.index)
+    text = _as_text(col).str.replace(",", "", regex=False)
+    parsed = pd.to_numeric(text, errors='coerce')
+    suspect = parsed.isna()
+    if not suspect.any():
+        return suspect
+    # Only the (few) values pandas could not parse are re-checked with float(),
+    # so edge cases like 'nan', 'inf' or '1_000' keep their old verdict.
+    def _fails(s: str) -> bool:
+        try:
+            float(s)
+            return False
+        except Exception:
+            return True
+    fails = pd.Series(False, index=col.index)
+    fails[suspect] = [_fails(s) for s in text[suspect]]
+    return fails
+
+CHECKS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    'missing': check_missing,
+    'barcode8': check_barcode8,
+    'no_digits': check_no_digits,
+    'numeric': check_numeric,
+}
+
+# ---------------------------------------------------------------------
+# 2. Rule registry
+# ---------------------------------------------------------------------
+# A rule is a plain dict: {'field', 'check', 'issue'} plus optional
+# 'optional': True to skip the rule when the column is absent.
+
+RULES: Dict[str, List[Dict]] = {}
+
+def register_rules(workflow: str, rules: List[Dict]) -> None:
+    for r in rules:
+        if r['check'] not in CHECKS:
+            raise ValueError(f"Unknown check '{r['check']}' for field '{r['field']}'")
+    RULES.setdefault(workflow, []).extend(rules)
+
+def empty_errors() -> pd.DataFrame:
+    return pd.DataFrame(columns=ERROR_COLUMNS)
+
+def run_rules(df: pd.DataFrame, rules: List[Dict]) -> pd.DataFrame:
+    """Applies column rules to df; returns the row/field/issue error frame in row order."""
+    parts = []
+    for order, r in enumerate(rules):
+        if r['field'] not in df.columns:
+            if r.get('optional'):
+                continue
+            raise ValueError(f"Missing required columns: {[r['field']]}")
+        mask = CHECKS[r['check']](df[r['field']])
+        pos = np.flatnonzero(mask.to_numpy())
+        if len(pos):
+            parts.append(pd.DataFrame({'row': df.index[pos], 'field': r['field'],
+                                       'issue': r['issue'], '_pos': pos, '_order': order}))
+    if not parts:
+        return empty_errors()
+    err = pd.concat(parts, ignore_index=True)
+    # Row-major like the old iterrows loops: by row, then by rule order
+    err = err.sort_values(['_pos', '_order'], kind='stable')
+    return err[ERROR_COLUMNS].reset_index(drop=True)
+
+def validate(df: pd.DataFrame, workflow: str, required: List[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    if required:
+        missing_cols = [c for c in required if c not in df.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+    return df, run_rules(df, RULES.get(workflow, []))
+
+def merge_errors(*frames: pd.DataFrame) -> pd.DataFrame:
+    """Combines error frames for the same rows in row order (stable: each frame's order within a row is kept)."""
+    parts = [f for f in frames if not f.empty]
+    if not parts:
+        return empty_errors()
+    if len(parts) == 1:
+        return parts[0]
+    err = pd.concat(parts, ignore_index=True).sort_values('row', kind='stable')
+    return err[ERROR_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+from .common import PRICE_REQUIRED, STONE_REQUIRED
+from .integrity import REFERENCES, DatasetIndex
+from .price import PRICE_HEADERS, PRICE_TEMPLATE_ROWS, transform_price
+from .stone import STONE_HEADERS, STONE_TEMPLATE_ROWS, transform_stone
+from .catalog import CATALOG_HEADERS, CATALOG_TEMPLATE_ROWS, transform_catalog
+
+# ---------------------------------------------------------------------
+# Workflow registry — one entry per output template, keyed by the label
+# shown in the app's workflow selectbox.
+# ---------------------------------------------------------------------
+WORKFLOWS: Dict[str, Dict] = {
+    "Seller Price": {
+        "key": "price",
+        "transform": transform_price,
+        "filename": "SellerPriceBulkUpload.csv",
+        "headers": PRICE_HEADERS,
+        "template_rows": PRICE_TEMPLATE_ROWS,
+        "signature": PRICE_REQUIRED,
+    },
+    "Product Stone": {
+        "key": "stone",
+        "transform": transform_stone,
+        "filename": "ProductStoneBulkUpload.csv",
+        "headers": STONE_HEADERS,
+        "template_rows": STONE_TEMPLATE_ROWS,
+        "signature": STONE_REQUIRED,
+    },
+    "Catalog Creation": {
+        "key": "catalog",
+        "transform": transform_catalog,
+        "filename": "CatalogUpload.csv",
+        "headers": CATALOG_HEADERS,
+        "template_rows": CATALOG_TEMPLATE_ROWS,
+        # catalog validation has no hard requirements; these identify a catalog export
+        "signature": ["Bar Code", "Article Description", "Article Number", "Metal Name"],
+    },
+}
+
+def get_workflow(name: str) -> Dict:
+    """Looks a workflow up by its label ("Seller Price") or key ("price")."""
+    if name in WORKFLOWS:
+        return WORKFLOWS[name]
+    for wf in WORKFLOWS.values():
+        if wf["key"] == name:
+            return wf
+    raise ValueError(f"Unknown workflow: {name}")
+
+def workflow_label(name: str) -> str:
+    """Display label for a workflow given by label or key."""
+    wf = get_workflow(name)
+    return next(label for label, v in WORKFLOWS.items() if v is wf)
+
+def transform_options(name: str, rules: Optional[str] = None, barcode_width: Optional[int] = None) -> Dict:
+    """Keyword options for a workflow's transform: the catalog rule set and the
+    dataset-wide image-name padding, when given."""
+    if get_workflow(name)["key"] != "catalog":
+        return {}
+    options = {"rules": rules} if rules else {}
+    if barcode_width is not None:
+        options["barcode_width"] = barcode_width
+    return options
+
+def dataset_index(name: str, skus: Optional[Dict[str, pd.Index]] = None) -> DatasetIndex:
+    """The DatasetIndex a workflow's transform checks its rows with. skus
+    ({workflow key: SKU codes}) supplies the datasets the rows must exist in
+    (integrity.REFERENCES); the others are ignored."""
+    key = get_workflow(name)["key"]
+    skus = skus or {}
+    return DatasetIndex(key, {workflow_label(t): skus[t] for t in REFERENCES.get(key, []) if t in skus})
+
+def detect_workflows(columns: Iterable[str]) -> List[str]:
+    """Returns the labels of every workflow whose signature columns are all present."""
+    cols = set(columns)
+    return [name for name, wf in WORKFLOWS.items() if set(wf["signature"]) <= cols]